@@ -2,7 +2,8 @@ from django.contrib import admin
 from django.urls import reverse
 from django.utils.html import format_html
 from .admin_views import currency_converter_view
-from .models import Currency, CurrencyExchangeRate, Provider
+from .circuit_breaker import get_shared_state
+from .models import Currency, CurrencyExchangeRate, DailyRateSnapshot, Provider, RateAggregate
 
 @admin.register(Currency)
 class CurrencyAdmin(admin.ModelAdmin):
@@ -26,8 +27,24 @@ class CurrencyExchangeRateAdmin(admin.ModelAdmin):
     list_filter = ['source_currency', 'exchanged_currency']
     search_fields = ['source_currency__code', 'exchanged_currency__code']
 
+@admin.register(DailyRateSnapshot)
+class DailyRateSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['base_currency', 'valuation_date']
+    list_filter = ['base_currency']
+    date_hierarchy = 'valuation_date'
+
+@admin.register(RateAggregate)
+class RateAggregateAdmin(admin.ModelAdmin):
+    list_display = ['source_currency', 'exchanged_currency', 'resolution', 'period_start', 'open_rate', 'close_rate', 'rate_count']
+    list_filter = ['resolution', 'source_currency', 'exchanged_currency']
+    date_hierarchy = 'period_start'
+
 @admin.register(Provider)
 class ProviderAdmin(admin.ModelAdmin):
-    list_display = ['name', 'is_active', 'priority']
+    list_display = ['name', 'is_active', 'priority', 'circuit_state']
     list_editable = ['is_active', 'priority']
     ordering = ['priority']
+
+    @admin.display(description='Circuit breaker')
+    def circuit_state(self, obj):
+        return get_shared_state(obj.name)
@@ -1,12 +1,19 @@
 from django.shortcuts import render
 from django import forms
+from .money import convert
 from .providers import ProviderFactory
-from .models import Currency
+from .catalogue import catalogue
+
+def currency_choices():
+    # A plain function: forms deep-copy their choices, and the catalogue holds a lock
+    return catalogue.choices()
 
 class CurrencyConversionForm(forms.Form):
-    source_currency = forms.ModelChoiceField(queryset=Currency.objects.all(), label="Source Currency")
+    # Choices and cleaned Currency instances come from the catalogue, not a query per render and per clean
+    source_currency = forms.TypedChoiceField(choices=currency_choices, coerce=catalogue.get_by_pk, label="Source Currency")
     amount = forms.DecimalField(decimal_places=2, max_digits=18, label="Amount")
-    target_currencies = forms.ModelMultipleChoiceField(queryset=Currency.objects.all(), label="Target Currencies")
+    target_currencies = forms.TypedMultipleChoiceField(choices=currency_choices, coerce=catalogue.get_by_pk, label="Target Currencies")
+    valuation_date = forms.DateField(required=False, label="Date (leave empty for latest)")
 
 def currency_converter_view(request):
     conversion_results = None
@@ -16,14 +23,20 @@ def currency_converter_view(request):
             source_currency = form.cleaned_data['source_currency']
             amount = form.cleaned_data['amount']
             target_currencies = form.cleaned_data['target_currencies']
+            valuation_date = form.cleaned_data['valuation_date']
 
             provider = ProviderFactory()
+            # One snapshot covers every target; each cross rate is derived from it
+            rate_matrix = provider.get_rate_matrix(
+                [source_currency.code] + [target_currency.code for target_currency in target_currencies],
+                valuation_date=valuation_date
+            )
             conversion_results = []
             for target_currency in target_currencies:
                 if source_currency == target_currency:
                     continue
-                rate = provider.get_exchange_rate(source_currency.code, target_currency.code)
-                converted_amount = amount * rate
+                rate = rate_matrix.get_rate(source_currency.code, target_currency.code)
+                converted_amount = convert(amount, rate, target_currency.code)
                 conversion_results.append({
                     "source": source_currency.code,
                     "target": target_currency.code,
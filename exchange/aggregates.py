@@ -0,0 +1,187 @@
+from datetime import timedelta
+from decimal import ROUND_HALF_EVEN, Decimal
+from django.db import transaction
+from .models import CurrencyExchangeRate, RateAggregate
+
+RESOLUTIONS = [RateAggregate.WEEK, RateAggregate.MONTH]
+
+# Daily rates are stored with 6 decimal places, rounded half-even like the DecimalField;
+# aggregates fold in the stored value
+RATE_QUANTUM = Decimal("0.000001")
+
+AGGREGATE_FIELDS = ['first_date', 'last_date', 'open_rate', 'high_rate', 'low_rate', 'close_rate', 'rate_sum', 'rate_count']
+
+def period_start(resolution, day):
+    if resolution == RateAggregate.WEEK:
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+def period_end(resolution, start):
+    if resolution == RateAggregate.WEEK:
+        return start + timedelta(days=6)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+def fold(aggregate, day, rate):
+    """Add one daily rate to an aggregate."""
+    if not aggregate.rate_count:
+        aggregate.first_date = aggregate.last_date = day
+        aggregate.open_rate = aggregate.high_rate = aggregate.low_rate = aggregate.close_rate = rate
+    else:
+        if day < aggregate.first_date:
+            aggregate.first_date, aggregate.open_rate = day, rate
+        if day > aggregate.last_date:
+            aggregate.last_date, aggregate.close_rate = day, rate
+        aggregate.high_rate = max(aggregate.high_rate, rate)
+        aggregate.low_rate = min(aggregate.low_rate, rate)
+    aggregate.rate_sum += rate
+    aggregate.rate_count += 1
+
+def reset(aggregate):
+    for field in AGGREGATE_FIELDS:
+        setattr(aggregate, field, None)
+    aggregate.rate_sum, aggregate.rate_count = Decimal(0), 0
+
+def update_aggregates(source_currency, target_currency, rates, previous):
+    """
+    Fold daily rates just stored for a pair (Currency instances) into its weekly and monthly aggregates.
+
+    `previous` holds the stored rates of those dates before the write. New dates are added to their
+    periods; a period where an already stored rate changed is recomputed from its daily rows. Call it
+    in the transaction that stored the rates. Rows saved or deleted one by one are handled by recompute_periods().
+    """
+    added = {}
+    changed = []
+    for day, rate in rates.items():
+        rate = Decimal(rate).quantize(RATE_QUANTUM, rounding=ROUND_HALF_EVEN)
+        if day not in previous:
+            added[day] = rate
+        elif previous[day] != rate:
+            changed.append(day)
+    if not added and not changed:
+        return
+
+    for resolution in RESOLUTIONS:
+        periods = {period_start(resolution, day) for day in [*added, *changed]}
+        pair_aggregates = RateAggregate.objects.filter(source_currency=source_currency, exchanged_currency=target_currency, resolution=resolution)
+        # Empty rows first, so concurrent writers of a period lock and update the same row
+        RateAggregate.objects.bulk_create(
+            [
+                RateAggregate(source_currency=source_currency, exchanged_currency=target_currency, resolution=resolution, period_start=start)
+                for start in periods
+            ],
+            ignore_conflicts=True,
+        )
+        aggregates = {aggregate.period_start: aggregate for aggregate in pair_aggregates.select_for_update().filter(period_start__in=periods)}
+
+        recomputed = {period_start(resolution, day) for day in changed}
+        for start in recomputed:
+            reset(aggregates[start])
+            daily_rows = CurrencyExchangeRate.objects.filter(source_currency=source_currency, exchanged_currency=target_currency) \
+                .between(start, period_end(resolution, start)).series()
+            for day, rate in daily_rows:
+                fold(aggregates[start], day, rate)
+        for day, rate in added.items():
+            start = period_start(resolution, day)
+            if start not in recomputed:
+                fold(aggregates[start], day, rate)
+
+        RateAggregate.objects.bulk_update(aggregates.values(), AGGREGATE_FIELDS)
+
+def recompute_periods(source_currency_id, exchanged_currency_id, day):
+    """
+    Recompute the week and month aggregates containing day from a pair's daily rows, after a
+    daily row was saved or deleted outside store_rates(). Periods left without rows are dropped.
+    """
+    pair_aggregates = RateAggregate.objects.filter(source_currency_id=source_currency_id, exchanged_currency_id=exchanged_currency_id)
+    with transaction.atomic():
+        for resolution in RESOLUTIONS:
+            start = period_start(resolution, day)
+            aggregate = RateAggregate(
+                source_currency_id=source_currency_id, exchanged_currency_id=exchanged_currency_id, resolution=resolution, period_start=start
+            )
+            daily_rows = CurrencyExchangeRate.objects.filter(source_currency_id=source_currency_id, exchanged_currency_id=exchanged_currency_id) \
+                .between(start, period_end(resolution, start)).series()
+            for row_day, rate in daily_rows:
+                fold(aggregate, row_day, rate)
+            if not aggregate.rate_count:
+                pair_aggregates.filter(resolution=resolution, period_start=start).delete()
+                continue
+            RateAggregate.objects.bulk_create(
+                [aggregate],
+                update_conflicts=True,
+                unique_fields=['source_currency', 'exchanged_currency', 'resolution', 'period_start'],
+                update_fields=AGGREGATE_FIELDS,
+            )
+
+def aggregate_rows(daily_rows, new_aggregate) -> dict:
+    """
+    {(resolution, period_start): aggregate} of every period of (date, rate) rows.
+    new_aggregate(resolution, period_start) returns an empty, unsaved aggregate for a period.
+    """
+    aggregates = {}
+    for day, rate in daily_rows:
+        for resolution in RESOLUTIONS:
+            start = period_start(resolution, day)
+            aggregate = aggregates.get((resolution, start))
+            if aggregate is None:
+                aggregate = aggregates[(resolution, start)] = new_aggregate(resolution, start)
+            fold(aggregate, day, rate)
+    return aggregates
+
+def rebuild_aggregates(source_currency, target_currency):
+    """Recompute every aggregate of a pair (Currency instances) from its daily rows, e.g. after deleting rows."""
+    daily_rows = CurrencyExchangeRate.objects.filter(source_currency=source_currency, exchanged_currency=target_currency) \
+        .series().iterator(chunk_size=10000)
+    aggregates = aggregate_rows(daily_rows, lambda resolution, start: RateAggregate(
+        source_currency=source_currency, exchanged_currency=target_currency, resolution=resolution, period_start=start
+    ))
+
+    with transaction.atomic():
+        RateAggregate.objects.filter(source_currency=source_currency, exchanged_currency=target_currency).delete()
+        RateAggregate.objects.bulk_create(aggregates.values(), batch_size=1000)
+    return len(aggregates)
+
+def to_point(aggregate) -> dict:
+    return {
+        "period_start": aggregate.period_start,
+        "open": float(aggregate.open_rate),
+        "high": float(aggregate.high_rate),
+        "low": float(aggregate.low_rate),
+        "close": float(aggregate.close_rate),
+        "mean": float((aggregate.rate_sum / aggregate.rate_count).quantize(RATE_QUANTUM)),
+        "days": aggregate.rate_count,
+    }
+
+def summarize_days(source_currency, target_currency, resolution, date_from, date_to) -> list:
+    """Aggregates of the stored daily rows from date_from to date_to, for periods the range only partly covers."""
+    if date_from > date_to:
+        return []
+    aggregates = {}
+    for day, rate in CurrencyExchangeRate.objects.for_pair(source_currency, target_currency).between(date_from, date_to).series():
+        start = period_start(resolution, day)
+        fold(aggregates.setdefault(start, RateAggregate(resolution=resolution, period_start=start)), day, rate)
+    return [to_point(aggregate) for aggregate in aggregates.values()]
+
+def get_aggregated_series(source_currency, target_currency, date_from, date_to, resolution) -> list:
+    """
+    One OHLC/mean point per week or month from date_from to date_to, in date order.
+    Periods inside the range are read from the aggregate table; the partly covered periods at
+    either end are computed from their daily rows, so every point only reflects days in the range.
+    """
+    first_start = period_start(resolution, date_from)
+    if first_start < date_from:
+        first_start = period_end(resolution, first_start) + timedelta(days=1)
+    last_start = period_start(resolution, date_to)
+    if period_end(resolution, last_start) > date_to:
+        last_start = period_start(resolution, last_start - timedelta(days=1))
+
+    if first_start > last_start:
+        return summarize_days(source_currency, target_currency, resolution, date_from, date_to)
+
+    aggregates = RateAggregate.objects.for_pair(source_currency, target_currency).at(resolution) \
+        .between(first_start, last_start).filter(rate_count__gt=0).order_by('period_start')
+    return [
+        *summarize_days(source_currency, target_currency, resolution, date_from, first_start - timedelta(days=1)),
+        *(to_point(aggregate) for aggregate in aggregates),
+        *summarize_days(source_currency, target_currency, resolution, period_end(resolution, last_start) + timedelta(days=1), date_to),
+    ]
@@ -0,0 +1,64 @@
+import numpy as np
+from django.conf import settings
+from .models import CurrencyExchangeRate
+
+def load_series(source_currency, target_currency, date_from=None, date_to=None):
+    """
+    Load a pair's stored series with one values_list query.
+    Returns (dates, rates) as NumPy arrays of datetime64[D] and float64, in date order.
+    """
+    queryset = CurrencyExchangeRate.objects.for_pair(source_currency, target_currency)
+    if date_from:
+        queryset = queryset.filter(valuation_date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(valuation_date__lte=date_to)
+
+    rows = list(queryset.series())
+    dates = np.array([valuation_date for valuation_date, _ in rows], dtype='datetime64[D]')
+    rates = np.fromiter((rate_value for _, rate_value in rows), dtype=np.float64, count=len(rows))
+    return dates, rates
+
+def moving_average(values, window):
+    """Trailing moving average over `window` points; one value per complete window."""
+    cumulative = np.cumsum(np.insert(values, 0, 0.0))
+    return (cumulative[window:] - cumulative[:-window]) / window
+
+def series_statistics(dates, rates, windows=()):
+    """
+    Aggregate statistics of a rate series: range, mean, daily log returns, volatility and,
+    for each window, the latest moving average and rolling volatility.
+    Windows longer than the series are reported as None.
+    """
+    annualization_days = getattr(settings, 'EXCHANGE_ANALYTICS_ANNUALIZATION_DAYS', 365)
+    returns = np.diff(np.log(rates))
+    volatility = float(returns.std(ddof=1)) if returns.size > 1 else None
+
+    statistics = {
+        "count": int(rates.size),
+        "date_from": str(dates[0]),
+        "date_to": str(dates[-1]),
+        "first": float(rates[0]),
+        "last": float(rates[-1]),
+        "min": float(rates.min()),
+        "max": float(rates.max()),
+        "mean": float(rates.mean()),
+        "std": float(rates.std(ddof=1)) if rates.size > 1 else None,
+        "change": float(rates[-1] / rates[0] - 1),
+        "returns": {
+            "mean": float(returns.mean()) if returns.size else None,
+            "min": float(returns.min()) if returns.size else None,
+            "max": float(returns.max()) if returns.size else None,
+        },
+        "volatility": volatility,
+        "annualized_volatility": float(volatility * np.sqrt(annualization_days)) if volatility is not None else None,
+        "windows": {},
+    }
+
+    for window in windows:
+        window_returns = returns[-window:]
+        statistics["windows"][str(window)] = {
+            "moving_average": float(moving_average(rates, window)[-1]) if rates.size >= window else None,
+            "volatility": float(window_returns.std(ddof=1)) if returns.size >= window else None,
+        }
+
+    return statistics
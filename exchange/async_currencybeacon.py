@@ -0,0 +1,64 @@
+from datetime import date
+from decimal import Decimal
+import httpx
+from django.conf import settings
+from .async_providers import AsyncCurrencyProviderInterface
+from .currencybeacon import CurrencyBeaconProvider
+
+# Async CurrencyBeacon Provider
+class AsyncCurrencyBeaconProvider(AsyncCurrencyProviderInterface):
+    def __init__(self):
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            pool_size = getattr(settings, 'EXCHANGE_HTTP_POOL_SIZE', 10)
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+                timeout=httpx.Timeout(
+                    getattr(settings, 'EXCHANGE_HTTP_READ_TIMEOUT', 10),
+                    connect=getattr(settings, 'EXCHANGE_HTTP_CONNECT_TIMEOUT', 3.05),
+                ),
+                # httpx only retries failed connection attempts
+                transport=httpx.AsyncHTTPTransport(retries=getattr(settings, 'EXCHANGE_HTTP_MAX_RETRIES', 2)),
+            )
+        return self._client
+
+    async def request(self, path: str, params: dict) -> dict:
+        response = await self.client.get(
+            f"{settings.CURRENCY_BEACON_API_URL}/{path}",
+            params={"api_key": settings.CURRENCY_BEACON_API_KEY, **params},
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def get_exchange_rate(self, source_currency: str, target_currency: str, valuation_date: date = None) -> Decimal:
+        params = {"base": source_currency, "symbols": target_currency}
+        if valuation_date is not None:
+            params["date"] = valuation_date.strftime("%Y-%m-%d")
+        try:
+            data = await self.request("latest" if valuation_date is None else "historical", params)
+            rate = data.get("rates", {}).get(target_currency)
+            return Decimal(str(rate)) if rate else Decimal("0.0")
+        except Exception as e:
+            print(f"Error fetching rate from CurrencyBeacon: {e}")
+            return Decimal("0.0")
+
+    async def get_timeseries(self, source_currency: str, target_currency: str, start_date: date, end_date: date) -> dict:
+        try:
+            data = await self.request("timeseries", {
+                "base": source_currency,
+                "symbols": target_currency,
+                "start_date": start_date.strftime("%Y-%m-%d"),
+                "end_date": end_date.strftime("%Y-%m-%d")
+            })
+            return CurrencyBeaconProvider.parse_timeseries(data, target_currency)
+        except Exception as e:
+            print(f"Error fetching timeseries from CurrencyBeacon: {e}")
+            return None
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
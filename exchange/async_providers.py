@@ -0,0 +1,172 @@
+import asyncio
+import random
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from datetime import date, timedelta
+from decimal import Decimal
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .cache import rate_cache
+from .circuit_breaker import call_succeeded, get_breaker, order_by_latency
+from .hot_pairs import hot_pairs
+from .metrics import observe_provider_call
+from .provider_chain import provider_chain
+from .provider_registry import register_async_provider, get_async_provider
+from .rate_limiter import rate_limiter
+
+# Abstract Interface for Async Currency Providers
+class AsyncCurrencyProviderInterface(ABC):
+    @abstractmethod
+    async def get_exchange_rate(self, source_currency: str, target_currency: str, valuation_date: date = None) -> Decimal:
+        """Retrieve the exchange rate from source to target currency for a specific date or latest."""
+        pass
+
+    async def get_timeseries(self, source_currency: str, target_currency: str, start_date: date, end_date: date) -> dict:
+        """
+        Retrieve {date: rate} for every date from start_date to end_date (inclusive), or None if the provider failed.
+        This fallback fetches the days concurrently, at most EXCHANGE_ASYNC_CONCURRENCY at a time.
+        """
+        semaphore = asyncio.Semaphore(getattr(settings, 'EXCHANGE_ASYNC_CONCURRENCY', 10))
+        dates = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+        async def fetch(valuation_date):
+            async with semaphore:
+                return await self.get_exchange_rate(source_currency, target_currency, valuation_date)
+
+        fetched = await asyncio.gather(*(fetch(valuation_date) for valuation_date in dates))
+        return {valuation_date: rate for valuation_date, rate in zip(dates, fetched) if rate > 0}
+
+    async def aclose(self):
+        """Release any connections held by the provider."""
+        pass
+
+# Async Mock Provider for Testing
+class AsyncMockCurrencyProvider(AsyncCurrencyProviderInterface):
+    async def get_exchange_rate(self, source_currency: str, target_currency: str, valuation_date: date = None) -> Decimal:
+        return Decimal(random.uniform(0.5, 1.5))
+
+# Register the built-in async providers; their modules are imported on first use
+register_async_provider('currencybeacon', 'exchange.async_currencybeacon.AsyncCurrencyBeaconProvider')
+register_async_provider('mock', AsyncMockCurrencyProvider)
+
+# Async Provider Factory
+class AsyncProviderFactory:
+    """
+    Async counterpart of ProviderFactory, used as `async with AsyncProviderFactory() as provider:`.
+
+    Async HTTP clients are bound to the event loop that opened them, so provider instances are
+    kept per running loop and reused by every request it serves, keeping their connections alive.
+    close_async_providers() closes them when the server shuts down.
+    """
+    # {event loop: {name: provider instance}}
+    _instances = weakref.WeakKeyDictionary()
+    _instances_lock = threading.Lock()
+
+    def __init__(self):
+        self.providers = []
+
+    async def __aenter__(self):
+        self.providers = await sync_to_async(self.load_providers)(asyncio.get_running_loop())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # Clients stay open for the loop's later requests
+        pass
+
+    def load_providers(self, loop):
+        providers = []
+
+        for name in provider_chain.get_names():
+            try:
+                providers.append((name, self.get_instance(loop, name)))
+            except ValueError as e:
+                print(f"Error: {e}")
+
+        return providers
+
+    @classmethod
+    def get_instance(cls, loop, name):
+        with cls._instances_lock:
+            instances = cls._instances.setdefault(loop, {})
+            instance = instances.get(name)
+            if instance is None:
+                instance = instances[name] = get_async_provider(name)()
+        return instance
+
+    def available_providers(self):
+        """Yield (name, provider) in call order, skipping providers whose circuit breaker is open."""
+        providers = self.providers
+        if getattr(settings, 'EXCHANGE_PROVIDER_LATENCY_ORDERING', False):
+            instances = dict(providers)
+            providers = [(name, instances[name]) for name in order_by_latency(list(instances))]
+
+        for name, provider in providers:
+            if get_breaker(name).allow_request():
+                yield name, provider
+
+    async def call_provider(self, name, provider, method, *args):
+        """Await a provider method, recording its outcome and latency on the provider's circuit breaker."""
+        # Waiting for a token sleeps, so keep it off the shared sync thread
+        started = time.monotonic()
+        if not await sync_to_async(rate_limiter.acquire, thread_sensitive=False)(name):
+            print(f"Rate limit reached for provider '{name}'")
+            # The provider wasn't called, so this tells nothing about its health
+            get_breaker(name).release_probe()
+            observe_provider_call(name, method, 'rate_limited', time.monotonic() - started)
+            return None
+
+        started = time.monotonic()
+        try:
+            result = await getattr(provider, method)(*args)
+        except Exception as e:
+            print(f"Error calling provider '{name}': {e}")
+            result = None
+        latency = time.monotonic() - started
+        success = call_succeeded(result)
+        get_breaker(name).record(success, latency)
+        observe_provider_call(name, method, 'success' if success else 'failure', latency)
+        return result
+
+    async def get_exchange_rate(self, source_currency: str, target_currency: str, valuation_date: date = None) -> Decimal:
+        if valuation_date is None:
+            await sync_to_async(hot_pairs.record)(source_currency, target_currency)
+
+        cached_rate = await sync_to_async(rate_cache.get)(source_currency, target_currency, valuation_date)
+        if cached_rate is not None:
+            return cached_rate
+
+        for name, provider in self.available_providers():
+            rate = await self.call_provider(name, provider, 'get_exchange_rate', source_currency, target_currency, valuation_date)
+            if rate and rate > 0:
+                await sync_to_async(rate_cache.set)(source_currency, target_currency, rate, valuation_date)
+                return rate
+        raise ValueError("No valid exchange rate found from available providers")
+
+    async def get_timeseries(self, source_currency: str, target_currency: str, start_date: date, end_date: date) -> dict:
+        """Fetch {date: rate} for a range, asking lower-priority providers only for the dates still missing."""
+        rates = {}
+        missing_from, missing_to = start_date, end_date
+        for name, provider in self.available_providers():
+            fetched = await self.call_provider(name, provider, 'get_timeseries', source_currency, target_currency, missing_from, missing_to) or {}
+            for valuation_date, rate in fetched.items():
+                if rate > 0 and start_date <= valuation_date <= end_date:
+                    rates.setdefault(valuation_date, rate)
+
+            missing = [
+                start_date + timedelta(days=offset)
+                for offset in range((end_date - start_date).days + 1)
+                if start_date + timedelta(days=offset) not in rates
+            ]
+            if not missing:
+                break
+            missing_from, missing_to = missing[0], missing[-1]
+        return rates
+
+async def close_async_providers():
+    """Close the HTTP clients of the running event loop's provider instances, e.g. on ASGI shutdown."""
+    with AsyncProviderFactory._instances_lock:
+        instances = AsyncProviderFactory._instances.pop(asyncio.get_running_loop(), {})
+    for provider in instances.values():
+        await provider.aclose()
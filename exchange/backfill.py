@@ -0,0 +1,68 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+def progress_key(backfill_id, field=None):
+    key = f"exchange:backfill:{backfill_id}"
+    return f"{key}:{field}" if field else key
+
+def start_progress(backfill_id, pairs, date_from, date_to, total_chunks, skipped_days):
+    """Record a new backfill and zero its counters; workers update the counters as chunks finish."""
+    timeout = getattr(settings, 'EXCHANGE_BACKFILL_PROGRESS_TTL', 7 * 24 * 3600)
+    cache.set(progress_key(backfill_id), {
+        "pairs": [list(pair) for pair in pairs],
+        "date_from": str(date_from),
+        "date_to": str(date_to),
+        "total_chunks": total_chunks,
+        "skipped_days": skipped_days,
+        "started_at": time.time(),
+        "finished_at": None,
+    }, timeout=timeout)
+    cache.set_many({progress_key(backfill_id, field): 0 for field in ('done', 'failed', 'stored')}, timeout=timeout)
+
+def record_chunk(backfill_id, stored=0, failed=False):
+    # incr is atomic on Redis, so concurrent workers don't lose updates
+    try:
+        cache.incr(progress_key(backfill_id, 'failed' if failed else 'done'))
+        if stored:
+            cache.incr(progress_key(backfill_id, 'stored'), stored)
+    except ValueError:
+        print(f"Progress of backfill {backfill_id} expired")
+
+def finish_progress(backfill_id):
+    progress = cache.get(progress_key(backfill_id))
+    if progress is not None:
+        progress["finished_at"] = time.time()
+        cache.set(progress_key(backfill_id), progress, timeout=getattr(settings, 'EXCHANGE_BACKFILL_PROGRESS_TTL', 7 * 24 * 3600))
+
+def get_progress(backfill_id):
+    """Current state of a backfill, or None if it is unknown or expired."""
+    progress = cache.get(progress_key(backfill_id))
+    if progress is None:
+        return None
+    progress["done_chunks"] = cache.get(progress_key(backfill_id, 'done'), 0)
+    progress["failed_chunks"] = cache.get(progress_key(backfill_id, 'failed'), 0)
+    progress["stored_rates"] = cache.get(progress_key(backfill_id, 'stored'), 0)
+
+    finished = progress["done_chunks"] + progress["failed_chunks"]
+    progress["status"] = "finished" if progress["finished_at"] else "running"
+    progress["percent"] = round(100 * finished / progress["total_chunks"], 1) if progress["total_chunks"] else 100.0
+    return {"id": backfill_id, **progress}
+
+def acquire_provider_slot(name):
+    """
+    Take one of the EXCHANGE_BACKFILL_PROVIDER_CONCURRENCY slots of a provider, shared by every worker.
+    Returns the slot key to release, or None when all slots are busy. Slots expire on their own
+    after EXCHANGE_BACKFILL_SLOT_TIMEOUT seconds so a crashed worker can't hold one forever.
+    """
+    limits = getattr(settings, 'EXCHANGE_BACKFILL_PROVIDER_CONCURRENCY', {})
+    limit = limits.get(name, limits.get('default', 4))
+    timeout = getattr(settings, 'EXCHANGE_BACKFILL_SLOT_TIMEOUT', 300)
+    for slot in range(limit):
+        key = f"exchange:backfill:slot:{name}:{slot}"
+        if cache.add(key, 1, timeout=timeout):
+            return key
+    return None
+
+def release_provider_slot(key):
+    cache.delete(key)
@@ -0,0 +1,18 @@
+def percentile(values, percent):
+    """Nearest-rank percentile (0-100) of a list of numbers."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def summarize(latencies):
+    """Summary of latencies in seconds, reported in milliseconds."""
+    count = len(latencies)
+    return {
+        "count": count,
+        "mean_ms": sum(latencies) / count * 1000 if count else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
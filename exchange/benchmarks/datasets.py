@@ -0,0 +1,66 @@
+import itertools
+import random
+import string
+from datetime import date, timedelta
+from decimal import Decimal
+from ..aggregates import rebuild_aggregates
+from ..catalogue import invalidate_catalogue
+from ..models import Currency, CurrencyExchangeRate
+
+# Generated currencies get codes '9AA'..'9ZZ', which no ISO 4217 currency uses
+GENERATED_CODE_PREFIX = '9'
+
+def generated_codes(count):
+    letters = (''.join(pair) for pair in itertools.product(string.ascii_uppercase, repeat=2))
+    return [GENERATED_CODE_PREFIX + suffix for suffix in itertools.islice(letters, count)]
+
+def create_currencies(count):
+    codes = generated_codes(count)
+    Currency.objects.bulk_create(
+        [Currency(code=code, name=f"Benchmark {code}", symbol=code) for code in codes],
+        ignore_conflicts=True,
+    )
+    invalidate_catalogue()
+    return list(Currency.objects.filter(code__in=codes).order_by('code'))
+
+def generate_rates(currency_count, days, start_date=date(2000, 1, 1), batch_size=10000, seed=0, progress=None):
+    """
+    Fill CurrencyExchangeRate with a random walk for every ordered pair of currency_count
+    generated currencies over `days` days, i.e. currency_count * (currency_count - 1) * days rows.
+    Returns the number of rows written.
+    """
+    currencies = create_currencies(currency_count)
+    rng = random.Random(seed)
+    dates = [start_date + timedelta(days=offset) for offset in range(days)]
+    batch = []
+    written = 0
+
+    for source_currency, target_currency in itertools.permutations(currencies, 2):
+        rate = rng.uniform(0.1, 10)
+        for valuation_date in dates:
+            rate *= 1 + rng.gauss(0, 0.005)
+            batch.append(CurrencyExchangeRate(
+                source_currency=source_currency,
+                exchanged_currency=target_currency,
+                valuation_date=valuation_date,
+                rate_value=Decimal(f"{rate:.6f}"),
+            ))
+            if len(batch) >= batch_size:
+                CurrencyExchangeRate.objects.bulk_create(batch, ignore_conflicts=True)
+                written += len(batch)
+                batch = []
+                if progress:
+                    progress(written)
+
+    if batch:
+        CurrencyExchangeRate.objects.bulk_create(batch, ignore_conflicts=True)
+        written += len(batch)
+    return written
+
+def aggregate_generated(currencies):
+    """Build the weekly and monthly aggregates of generated rates, which bulk generation bypasses."""
+    return sum(rebuild_aggregates(source_currency, target_currency) for source_currency, target_currency in itertools.permutations(currencies, 2))
+
+def drop_generated():
+    """Delete the generated currencies and, through the cascade, their rates."""
+    Currency.objects.filter(code__startswith=GENERATED_CODE_PREFIX).delete()
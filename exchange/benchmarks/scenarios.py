@@ -0,0 +1,160 @@
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from . import summarize
+from ..backfill import start_progress
+from ..circuit_breaker import reset_breakers
+from ..models import CurrencyExchangeRate, Provider, RateAggregate
+from ..provider_chain import provider_chain
+from ..currencybeacon import CurrencyBeaconProvider
+from ..rates import chunked_ranges
+from ..tasks import load_rate_chunk
+
+class QueryCounter:
+    """Database execute wrapper counting the queries run on one connection."""
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+def run_requests(make_request, count, concurrency):
+    """
+    Call make_request(client, index) `count` times spread over `concurrency` threads, each with its
+    own test client and database connection. make_request returns whether the call succeeded.
+    Returns throughput, latency percentiles, errors and queries per request.
+    """
+    latencies = [0.0] * count
+    queries = [0] * count
+    failures = [0] * count
+
+    def worker(indices):
+        client = Client(SERVER_NAME='localhost', raise_request_exception=False)
+        try:
+            for index in indices:
+                counter = QueryCounter()
+                started = time.perf_counter()
+                with connection.execute_wrapper(counter):
+                    succeeded = make_request(client, index)
+                latencies[index] = time.perf_counter() - started
+                queries[index] = counter.count
+                failures[index] = 0 if succeeded else 1
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(range(offset, count, concurrency),)) for offset in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        **summarize(latencies),
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "requests_per_second": count / elapsed if elapsed else 0.0,
+        "errors": sum(failures),
+        "queries_per_request": sum(queries) / count if count else 0.0,
+    }
+
+@contextmanager
+def stub_provider_chain(stub):
+    """Point the provider chain at the stub only (CurrencyBeacon on its URL) and restore it afterwards."""
+    active = list(Provider.objects.filter(is_active=True).values_list('pk', flat=True))
+    Provider.objects.filter(is_active=True).update(is_active=False)
+    provider = Provider.objects.create(name='currencybeacon', is_active=True, priority=0)
+
+    CurrencyBeaconProvider.close_session()
+    reset_breakers()
+    provider_chain.invalidate()
+    try:
+        with override_settings(CURRENCY_BEACON_API_URL=stub.url):
+            yield
+    finally:
+        provider.delete()
+        Provider.objects.filter(pk__in=active).update(is_active=True)
+        CurrencyBeaconProvider.close_session()
+        reset_breakers()
+        provider_chain.invalidate()
+
+def convert_hot_pairs(codes):
+    """/convert/ over three hot pairs: after the first few misses every request should be a cache hit."""
+    pairs = [(codes[0], codes[1]), (codes[0], codes[2]), (codes[1], codes[2])]
+    url = reverse('currency-convert')
+
+    def request(client, index):
+        source_currency, target_currency = pairs[index % len(pairs)]
+        response = client.get(url, {"source_currency": source_currency, "target_currency": target_currency, "amount": "100"})
+        return response.status_code == 200
+    return request
+
+def rates_long_range(codes, start_date, days, range_days, seed=0, resolution='day'):
+    """/rates/ over random pairs and `range_days`-day ranges inside the generated history, at a given resolution."""
+    rng = random.Random(seed)
+    url = reverse('currency-rates')
+    lookups = []
+    for _ in range(1000):
+        source_currency, target_currency = rng.sample(codes, 2)
+        date_from = start_date + timedelta(days=rng.randrange(max(1, days - range_days)))
+        lookups.append((source_currency, target_currency, date_from, date_from + timedelta(days=range_days - 1)))
+
+    def request(client, index):
+        source_currency, target_currency, date_from, date_to = lookups[index % len(lookups)]
+        response = client.get(url, {
+            "source_currency": source_currency, "target_currency": target_currency,
+            "date_from": date_from.isoformat(), "date_to": date_to.isoformat(), "resolution": resolution,
+        })
+        return response.status_code == 200
+    return request
+
+def admin_multi_target(currencies, start_date, days, seed=0):
+    """The admin converter from one source into every other currency, on random historical dates."""
+    rng = random.Random(seed)
+    url = reverse('currency_converter')
+    source, targets = currencies[0], currencies[1:]
+    valuation_dates = [start_date + timedelta(days=rng.randrange(days)) for _ in range(1000)]
+
+    def request(client, index):
+        response = client.post(url, {
+            "source_currency": source.pk,
+            "amount": "100",
+            "target_currencies": [target.pk for target in targets],
+            "valuation_date": valuation_dates[index % len(valuation_dates)].isoformat(),
+        })
+        return response.status_code == 200
+    return request
+
+def backfill_chunks(codes, start_date, days, pair_count):
+    """
+    Backfill chunks as a Celery worker runs them, `days` days for `pair_count` pairs starting at start_date.
+    Existing rows in the range are deleted first so every run loads the same chunks.
+    Returns (request function, number of chunks).
+    """
+    pairs = [(source, target) for source in codes for target in codes if source != target][:pair_count]
+    end_date = start_date + timedelta(days=days - 1)
+    for source_currency, target_currency in pairs:
+        CurrencyExchangeRate.objects.for_pair(source_currency, target_currency).between(start_date, end_date).delete()
+        # The reloaded days would otherwise be added to aggregates still counting the deleted ones
+        RateAggregate.objects.for_pair(source_currency, target_currency).delete()
+
+    chunks = [
+        (source_currency, target_currency, chunk_start.isoformat(), chunk_end.isoformat())
+        for source_currency, target_currency in pairs
+        for chunk_start, chunk_end in chunked_ranges(start_date, end_date)
+    ]
+    backfill_id = f"benchmark-{uuid.uuid4().hex}"
+    start_progress(backfill_id, pairs, start_date, end_date, len(chunks), 0)
+
+    def request(client, index):
+        return load_rate_chunk.apply(args=(backfill_id, *chunks[index])).get() > 0
+    return request, len(chunks)
@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+import time
+from django.conf import settings
+
+# Code run in a fresh interpreter for each cold start measured
+TARGETS = {
+    # What `manage.py runserver` / `check` loads before serving: apps, models, admin and the URLconf
+    'manage': (
+        "import django; django.setup(); "
+        "from django.urls import get_resolver; get_resolver().url_patterns"
+    ),
+    # What a Celery worker loads before consuming: the app, Django and every tasks module
+    'celery': (
+        "from mycurrency.celery import app; app.loader.import_default_modules(); "
+        "from django.urls import get_resolver; get_resolver().url_patterns"
+    ),
+}
+
+def parse_importtime(output):
+    """{module: (self µs, cumulative µs)} from the stderr of `python -X importtime`."""
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        modules[module.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+def measure(target, runs):
+    """
+    Start `runs` fresh interpreters running the target's code and time them.
+    Returns wall times in seconds and the module import times of the last run.
+    """
+    environment = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'mycurrency.settings')}
+    wall_times = []
+    modules = {}
+    for _ in range(runs):
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', TARGETS[target]],
+            cwd=settings.BASE_DIR, env=environment, capture_output=True, text=True, check=True,
+        )
+        wall_times.append(time.perf_counter() - started)
+        modules = parse_importtime(completed.stderr)
+    return wall_times, modules
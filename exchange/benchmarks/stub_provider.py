@@ -0,0 +1,138 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Symbols returned by /latest and /historical when none are requested
+DEFAULT_SYMBOLS = ['USD', 'EUR', 'GBP', 'JPY', 'CHF', 'AUD', 'CAD', 'CNY', 'INR', 'SEK']
+
+class StubCurrencyBeaconHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        stub = self.server.stub
+        url = urlparse(self.path)
+        endpoint = url.path.rstrip('/').rsplit('/', 1)[-1]
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+
+        status_code, body = stub.respond(endpoint, params)
+        payload = json.dumps(body).encode()
+        try:
+            self.send_response(status_code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up waiting, e.g. on a timeout or an abandoned hedge
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+class StubCurrencyBeacon:
+    """
+    Local stand-in for the CurrencyBeacon /latest, /historical and /timeseries endpoints.
+
+    Rates are derived from hashes of the currency codes and the date, so every run sees the
+    same numbers. `latency` and `jitter` (seconds) delay each response; `error_rate` answers
+    that share of requests with `error_status`. Status codes queued with fail_next() are used
+    first, in order. Use it as a context manager or call start() and stop().
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503, rates=None, symbols=None, seed=0, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        # Fixed {code: rate against USD} overriding the generated ones
+        self.rates = rates or {}
+        # Every currency the stub "knows", returned when a request names no symbols
+        self.symbols = list(symbols or DEFAULT_SYMBOLS)
+        self.requests = Counter()
+        self._statuses = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), StubCurrencyBeaconHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def fail_next(self, *statuses):
+        with self._lock:
+            self._statuses.extend(statuses)
+
+    def value(self, code, day=None):
+        """Value of one unit of `code` in USD on `day` (None for latest)."""
+        if code == 'USD':
+            return 1.0
+        if code in self.rates:
+            return 1 / self.rates[code]
+        digest = hashlib.sha1(f"{code}:{day or 'latest'}".encode()).digest()
+        base = 0.1 + int.from_bytes(hashlib.sha1(code.encode()).digest()[:4], 'big') / 2 ** 32 * 10
+        # Up to +-1% drift per day around the currency's base value
+        return base * (1 + (digest[0] - 128) / 12800)
+
+    def rate(self, base, symbol, day=None):
+        return round(self.value(base, day) / self.value(symbol, day), 6)
+
+    def rates_for(self, base, symbols, day=None):
+        codes = symbols.split(',') if symbols else self.symbols
+        return {code: self.rate(base, code, day) for code in codes if code != base}
+
+    def respond(self, endpoint, params):
+        with self._lock:
+            self.requests[endpoint] += 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+            if self._statuses:
+                status_code = self._statuses.pop(0)
+            elif self.error_rate and self._random.random() < self.error_rate:
+                status_code = self.error_status
+            else:
+                status_code = 200
+
+        if delay:
+            time.sleep(delay)
+        if status_code != 200:
+            return status_code, {"error": "injected failure"}
+
+        base = params.get("base", "USD")
+        symbols = params.get("symbols")
+        if endpoint == "latest":
+            return 200, {"base": base, "rates": self.rates_for(base, symbols)}
+        if endpoint == "historical":
+            return 200, {"base": base, "date": params.get("date"), "rates": self.rates_for(base, symbols, params.get("date"))}
+        if endpoint == "timeseries":
+            start_date = datetime.strptime(params["start_date"], "%Y-%m-%d").date()
+            end_date = datetime.strptime(params["end_date"], "%Y-%m-%d").date()
+            response = {}
+            while start_date <= end_date:
+                day = start_date.isoformat()
+                response[day] = self.rates_for(base, symbols, day)
+                start_date += timedelta(days=1)
+            return 200, {"base": base, "response": response}
+        return 404, {"error": f"unknown endpoint '{endpoint}'"}
@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from .metrics import cache_lookup_seconds, record_phase
+
+class RateCache:
+    """
+    Two-tier cache for exchange rates keyed by (source, target, date or latest),
+    and for whole base-currency snapshots keyed by (base, date or latest).
+
+    The first tier is an in-process LRU dict, the second is Django's cache framework
+    (locmem or Redis) shared by every worker. Historical rates never change and are
+    kept until evicted; latest rates expire after EXCHANGE_LATEST_RATE_TTL seconds.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def max_entries(self):
+        return getattr(settings, 'EXCHANGE_LOCAL_CACHE_MAX_ENTRIES', 1024)
+
+    @property
+    def local_ttl(self):
+        return getattr(settings, 'EXCHANGE_LOCAL_CACHE_TTL', 5)
+
+    @property
+    def latest_ttl(self):
+        return getattr(settings, 'EXCHANGE_LATEST_RATE_TTL', 60)
+
+    @staticmethod
+    def make_key(source_currency: str, target_currency: str, valuation_date: date = None) -> str:
+        period = valuation_date.isoformat() if valuation_date else 'latest'
+        return f"exchange:rate:{source_currency}:{target_currency}:{period}"
+
+    @staticmethod
+    def make_snapshot_key(base_currency: str, valuation_date: date = None) -> str:
+        period = valuation_date.isoformat() if valuation_date else 'latest'
+        return f"exchange:snapshot:{base_currency}:{period}"
+
+    def get_entry(self, source_currency: str, target_currency: str, valuation_date: date = None):
+        """Return (rate, fetched_at) from the nearest tier holding it, or None on a miss."""
+        return self._get(self.make_key(source_currency, target_currency, valuation_date), valuation_date)
+
+    def peek_entry(self, source_currency: str, target_currency: str, valuation_date: date = None):
+        """Like get_entry, but not counted as a lookup; used to build response validators."""
+        key = self.make_key(source_currency, target_currency, valuation_date)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[2] is None or entry[2] > time.time()):
+                return entry[0], entry[1]
+        return cache.get(key)
+
+    def get(self, source_currency: str, target_currency: str, valuation_date: date = None) -> Decimal:
+        entry = self.get_entry(source_currency, target_currency, valuation_date)
+        return entry[0] if entry else None
+
+    def set(self, source_currency: str, target_currency: str, rate: Decimal, valuation_date: date = None):
+        self._set(self.make_key(source_currency, target_currency, valuation_date), rate, valuation_date)
+
+    def get_snapshot(self, base_currency: str, valuation_date: date = None) -> dict:
+        """Return the cached {code: rate} snapshot for a base currency, or None on a miss."""
+        entry = self._get(self.make_snapshot_key(base_currency, valuation_date), valuation_date)
+        return entry[0] if entry else None
+
+    def set_snapshot(self, base_currency: str, rates: dict, valuation_date: date = None):
+        self._set(self.make_snapshot_key(base_currency, valuation_date), rates, valuation_date)
+
+    def _get(self, key, valuation_date):
+        started = time.perf_counter()
+        entry, result = self._lookup(key, valuation_date)
+        elapsed = time.perf_counter() - started
+        cache_lookup_seconds.observe(elapsed, result=result)
+        record_phase('cache', elapsed)
+        return entry
+
+    def _lookup(self, key, valuation_date):
+        """Return (entry or None, 'local_hit' | 'shared_hit' | 'miss')."""
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, fetched_at, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.local_hits += 1
+                    return (value, fetched_at), 'local_hit'
+                del self._entries[key]
+
+        entry = cache.get(key)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None, 'miss'
+
+        value, fetched_at = entry
+        self._store_local(key, value, fetched_at, valuation_date)
+        with self._lock:
+            self.shared_hits += 1
+        return (value, fetched_at), 'shared_hit'
+
+    def _set(self, key, value, valuation_date):
+        fetched_at = time.time()
+        cache.set(key, (value, fetched_at), timeout=None if valuation_date else self.latest_ttl)
+        self._store_local(key, value, fetched_at, valuation_date)
+
+    def _store_local(self, key, value, fetched_at, valuation_date):
+        expires_at = None
+        if valuation_date is None:
+            # Never serve a latest rate locally past the point the shared tier would drop it
+            expires_at = min(time.time() + self.local_ttl, fetched_at + self.latest_ttl)
+
+        with self._lock:
+            self._entries[key] = (value, fetched_at, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop the local tier and reset the counters (the shared tier is left alone)."""
+        with self._lock:
+            self._entries.clear()
+            self.local_hits = self.shared_hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.local_hits + self.shared_hits + self.misses
+            return {
+                "local_hits": self.local_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.local_hits + self.shared_hits) / lookups if lookups else 0.0,
+                "local_entries": len(self._entries),
+                "local_max_entries": self.max_entries,
+            }
+
+# Process-wide rate cache shared by every ProviderFactory
+rate_cache = RateCache()
@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+from bisect import bisect_right
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .models import Currency
+
+CATALOGUE_VERSION_KEY = 'exchange:currency_catalogue_version'
+
+class CurrencyCatalogue:
+    """
+    Process-level copy of the Currency table: code and pk lookups, admin form choices, and the
+    JSON rendering of every currency in code order for the list endpoint.
+
+    Like the provider chain, the table is only read again when the shared version key changes,
+    which happens on every Currency write. Each process checks the key at most once every
+    EXCHANGE_CURRENCY_CATALOGUE_CHECK_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self._state = None
+        self._version = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    @property
+    def check_interval(self):
+        return getattr(settings, 'EXCHANGE_CURRENCY_CATALOGUE_CHECK_INTERVAL', 1)
+
+    def _get_state(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            if self._state is not None and now - self._checked_at < self.check_interval:
+                return self._state
+
+            version = cache.get(CATALOGUE_VERSION_KEY)
+            if self._state is None or version != self._version:
+                self._state = self._load()
+                self._version = version
+            self._checked_at = now
+            return self._state
+
+    @staticmethod
+    def _load() -> dict:
+        # Imported here so loading the app (and these signals) doesn't import DRF
+        from .serializers import CurrencySerializer
+
+        currencies = list(Currency.objects.order_by('code'))
+        return {
+            "codes": [currency.code for currency in currencies],
+            "by_code": {currency.code: currency for currency in currencies},
+            "by_pk": {currency.pk: currency for currency in currencies},
+            # Rendered the way the API's JSON renderer would, once per load
+            "json": {
+                currency.code: json.dumps(CurrencySerializer(currency).data, ensure_ascii=False, separators=(',', ':'))
+                for currency in currencies
+            },
+        }
+
+    def get(self, code) -> Currency:
+        """The currency with this code, or None."""
+        return self._get_state()["by_code"].get(code)
+
+    def get_by_pk(self, pk) -> Currency:
+        try:
+            return self._get_state()["by_pk"].get(int(pk))
+        except (TypeError, ValueError):
+            return None
+
+    def choices(self) -> list:
+        """(pk, label) choices in code order."""
+        return [(currency.pk, str(currency)) for currency in self._get_state()["by_code"].values()]
+
+    def page(self, after=None, limit=None):
+        """
+        Keyset page of currencies in code order: up to `limit` rendered currencies with codes after
+        `after`, and the code to continue after, or None on the last page.
+        """
+        state = self._get_state()
+        limit = limit or getattr(settings, 'EXCHANGE_CURRENCY_PAGE_SIZE', 200)
+        start = bisect_right(state["codes"], after) if after else 0
+        end = start + limit
+        next_after = state["codes"][end - 1] if end < len(state["codes"]) else None
+        return [state["json"][code] for code in state["codes"][start:end]], next_after
+
+    def invalidate(self):
+        """Bump the shared version so every process reloads the catalogue, this one immediately."""
+        cache.add(CATALOGUE_VERSION_KEY, 0, timeout=None)
+        try:
+            cache.incr(CATALOGUE_VERSION_KEY)
+        except ValueError:
+            # The key was evicted between add() and incr()
+            cache.set(CATALOGUE_VERSION_KEY, 1, timeout=None)
+        with self._lock:
+            self._state = None
+
+catalogue = CurrencyCatalogue()
+
+def invalidate_catalogue():
+    """
+    Drop the catalogue now, and again once the surrounding transaction commits, so no process
+    keeps a copy it reloaded before the write became visible.
+    """
+    catalogue.invalidate()
+    transaction.on_commit(catalogue.invalidate)
+
+def upsert_currencies(currencies) -> dict:
+    """Create or update many {code, name, symbol} currencies in one transaction and one bulk statement."""
+    codes = [currency['code'] for currency in currencies]
+    with transaction.atomic():
+        existing = set(Currency.objects.filter(code__in=codes).values_list('code', flat=True))
+        Currency.objects.bulk_create(
+            [Currency(code=currency['code'], name=currency['name'], symbol=currency['symbol']) for currency in currencies],
+            update_conflicts=True,
+            unique_fields=['code'],
+            update_fields=['name', 'symbol'],
+        )
+        # bulk_create sends no post_save signals
+        invalidate_catalogue()
+    return {"created": len(set(codes) - existing), "updated": len(existing)}
@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import deque
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker over a rolling window of recent calls.
+
+    The breaker opens once at least EXCHANGE_BREAKER_MIN_CALLS calls in the last
+    EXCHANGE_BREAKER_WINDOW seconds failed at EXCHANGE_BREAKER_ERROR_RATE or more.
+    After EXCHANGE_BREAKER_RESET_TIMEOUT seconds a single probe call is let through
+    (half-open); its outcome closes the breaker or opens it again.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.state = CLOSED
+        self.opened_at = None
+        self._calls = deque()
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def window(self):
+        return getattr(settings, 'EXCHANGE_BREAKER_WINDOW', 60)
+
+    @property
+    def min_calls(self):
+        return getattr(settings, 'EXCHANGE_BREAKER_MIN_CALLS', 5)
+
+    @property
+    def error_rate_threshold(self):
+        return getattr(settings, 'EXCHANGE_BREAKER_ERROR_RATE', 0.5)
+
+    @property
+    def reset_timeout(self):
+        return getattr(settings, 'EXCHANGE_BREAKER_RESET_TIMEOUT', 30)
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def record(self, success: bool, latency: float):
+        with self._lock:
+            now = time.monotonic()
+            self._calls.append((now, success, latency))
+            self._prune(now)
+
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                if success:
+                    self._calls.clear()
+                    self._transition(CLOSED)
+                else:
+                    self._transition(OPEN)
+            elif self.state == CLOSED and len(self._calls) >= self.min_calls:
+                if self._error_rate() >= self.error_rate_threshold:
+                    self._transition(OPEN)
+
+    def release_probe(self):
+        """Give back the half-open probe slot taken by allow_request() for a call that never reached the provider."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    def latency_percentile(self, percentile: float):
+        """Latency in seconds at the given percentile (0-100) of the window, or None without data."""
+        with self._lock:
+            self._prune(time.monotonic())
+            latencies = sorted(latency for _, _, latency in self._calls)
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(round(percentile / 100 * (len(latencies) - 1))))
+        return latencies[index]
+
+    def snapshot(self) -> dict:
+        p95 = self.latency_percentile(95)
+        with self._lock:
+            return {
+                "state": self.state,
+                "calls": len(self._calls),
+                "error_rate": self._error_rate(),
+                "p95_latency_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            }
+
+    def _error_rate(self):
+        if not self._calls:
+            return 0.0
+        return sum(1 for _, success, _ in self._calls if not success) / len(self._calls)
+
+    def _prune(self, now):
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+
+    def _transition(self, state):
+        self.state = state
+        self.opened_at = time.monotonic() if state == OPEN else None
+        # Publish the state so the admin of any process can show it
+        cache.set(f"exchange:breaker:{self.name}", state, timeout=None)
+
+
+def call_succeeded(result) -> bool:
+    """
+    Whether a provider call's result counts as a success for its breaker. Providers answer
+    None, or a zero rate, when they fail; an empty timeseries or snapshot is a valid answer.
+    """
+    if isinstance(result, Decimal):
+        return result > 0
+    return result is not None
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name) -> CircuitBreaker:
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(name, CircuitBreaker(name))
+    return breaker
+
+def get_shared_state(name) -> str:
+    """Last state any process reported for the provider's breaker."""
+    return cache.get(f"exchange:breaker:{name}", CLOSED)
+
+def breaker_snapshots() -> dict:
+    return {name: breaker.snapshot() for name, breaker in list(_breakers.items())}
+
+def reset_breakers():
+    with _breakers_lock:
+        _breakers.clear()
+
+def order_by_latency(names: list) -> list:
+    """Reorder provider names by observed p95 latency; providers without data keep their place up front."""
+    return sorted(names, key=lambda name: get_breaker(name).latency_percentile(95) or 0)
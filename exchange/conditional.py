@@ -0,0 +1,55 @@
+import hashlib
+import time
+from datetime import date
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from .models import CurrencyExchangeRate
+
+def make_etag(*parts) -> str:
+    # Weak: the tag identifies the rates, not the exact bytes of a rendering
+    return 'W/"%s"' % hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+def range_etag(source_currency, target_currency, date_from, date_to, resolution='day'):
+    """
+    Validator of a rate range from one aggregate query over its stored rows. The latest write time
+    makes it change with every write, even corrections that leave the sum of the rates unchanged.
+    Returns None until every date of the range is stored, since the response is not settled before that.
+    """
+    stored = CurrencyExchangeRate.objects.for_pair(source_currency, target_currency).between(date_from, date_to) \
+        .aggregate(count=Count('pk'), total=Sum('rate_value'), updated_at=Max('updated_at'))
+    if stored["count"] != (date_to - date_from).days + 1:
+        return None
+    return make_etag(
+        source_currency, target_currency, date_from, date_to, resolution,
+        stored["count"], stored["total"], stored["updated_at"].isoformat(),
+    )
+
+def latest_etag(source_currency, target_currency, entry):
+    """Validator of a latest rate from its rate cache entry (rate, fetched_at)."""
+    rate, fetched_at = entry
+    return make_etag(source_currency, target_currency, 'latest', rate, fetched_at)
+
+def range_max_age(date_to) -> int:
+    """Ranges that ended before today never change; ranges reaching today may still gain rates."""
+    if date_to < date.today():
+        return getattr(settings, 'EXCHANGE_HISTORICAL_MAX_AGE', 86400)
+    return getattr(settings, 'EXCHANGE_LATEST_MAX_AGE', 60)
+
+def latest_max_age(fetched_at) -> int:
+    """Seconds left before the cached latest rate expires, capped at EXCHANGE_LATEST_MAX_AGE."""
+    remaining = fetched_at + getattr(settings, 'EXCHANGE_LATEST_RATE_TTL', 60) - time.time()
+    return max(0, min(int(remaining), getattr(settings, 'EXCHANGE_LATEST_MAX_AGE', 60)))
+
+def not_modified(request, etag, last_modified=None):
+    """A 304 response if the request's If-None-Match / If-Modified-Since match, otherwise None."""
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+def add_cache_headers(response, etag=None, last_modified=None, max_age=0):
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=max_age)
+    return response
@@ -0,0 +1,125 @@
+import threading
+import requests
+from datetime import date, datetime
+from decimal import Decimal
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .providers import CurrencyProviderInterface
+
+# CurrencyBeacon Provider
+class CurrencyBeaconProvider(CurrencyProviderInterface):
+    _session = None
+    _session_lock = threading.Lock()
+
+    @classmethod
+    def get_session(cls) -> requests.Session:
+        """Return the provider's pooled keep-alive session, creating it on first use."""
+        if cls._session is None:
+            with cls._session_lock:
+                if cls._session is None:
+                    retry = Retry(
+                        total=getattr(settings, 'EXCHANGE_HTTP_MAX_RETRIES', 2),
+                        backoff_factor=getattr(settings, 'EXCHANGE_HTTP_BACKOFF_FACTOR', 0.3),
+                        status_forcelist=(429, 500, 502, 503, 504),
+                        allowed_methods=frozenset(["GET"]),
+                        raise_on_status=False,
+                    )
+                    adapter = HTTPAdapter(
+                        pool_connections=getattr(settings, 'EXCHANGE_HTTP_POOL_SIZE', 10),
+                        pool_maxsize=getattr(settings, 'EXCHANGE_HTTP_POOL_SIZE', 10),
+                        max_retries=retry,
+                    )
+                    session = requests.Session()
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    cls._session = session
+        return cls._session
+
+    @classmethod
+    def close_session(cls):
+        """Close pooled connections; the next request opens a fresh session."""
+        with cls._session_lock:
+            if cls._session is not None:
+                cls._session.close()
+                cls._session = None
+
+    def request(self, path: str, params: dict) -> dict:
+        timeout = (
+            getattr(settings, 'EXCHANGE_HTTP_CONNECT_TIMEOUT', 3.05),
+            getattr(settings, 'EXCHANGE_HTTP_READ_TIMEOUT', 10),
+        )
+        response = self.get_session().get(
+            f"{settings.CURRENCY_BEACON_API_URL}/{path}",
+            params={"api_key": settings.CURRENCY_BEACON_API_KEY, **params},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def parse_timeseries(data: dict, target_currency: str) -> dict:
+        # Rates are keyed by day: {"2023-10-01": {"EUR": 0.94}, ...}
+        rates = {}
+        for day, day_rates in data.get("response", {}).items():
+            rate = day_rates.get(target_currency) if isinstance(day_rates, dict) else None
+            if rate:
+                rates[datetime.strptime(day, "%Y-%m-%d").date()] = Decimal(str(rate))
+        return rates
+
+    def get_exchange_rate(self, source_currency: str, target_currency: str, valuation_date: date = None) -> Decimal:
+        if valuation_date is None:
+            return self.get_latest_rate(source_currency, target_currency)
+        else:
+            return self.get_historical_rate(source_currency, target_currency, valuation_date)
+
+    def get_latest_rate(self, source_currency: str, target_currency: str) -> Decimal:
+        try:
+            data = self.request("latest", {"base": source_currency, "symbols": target_currency})
+            rate = data.get("rates", {}).get(target_currency)
+            return Decimal(str(rate)) if rate else Decimal("0.0")
+        except Exception as e:
+            print(f"Error fetching latest rate from CurrencyBeacon: {e}")
+            return Decimal("0.0")
+
+    def get_historical_rate(self, source_currency: str, target_currency: str, valuation_date: date) -> Decimal:
+        try:
+            data = self.request("historical", {
+                "base": source_currency,
+                "symbols": target_currency,
+                "date": valuation_date.strftime("%Y-%m-%d")
+            })
+            rate = data.get("rates", {}).get(target_currency)
+            return Decimal(str(rate)) if rate else Decimal("0.0")
+        except Exception as e:
+            print(f"Error fetching historical rate from CurrencyBeacon: {e}")
+            return Decimal("0.0")
+
+    def get_rate_snapshot(self, base_currency: str, symbols: list = None, valuation_date: date = None) -> dict:
+        # Always fetch every symbol: the payload is small and the cached snapshot serves later lookups
+        try:
+            if valuation_date is None:
+                data = self.request("latest", {"base": base_currency})
+            else:
+                data = self.request("historical", {"base": base_currency, "date": valuation_date.strftime("%Y-%m-%d")})
+            return {
+                code: Decimal(str(rate))
+                for code, rate in data.get("rates", {}).items()
+                if rate
+            }
+        except Exception as e:
+            print(f"Error fetching rate snapshot from CurrencyBeacon: {e}")
+            return None
+
+    def get_timeseries(self, source_currency: str, target_currency: str, start_date: date, end_date: date) -> dict:
+        try:
+            data = self.request("timeseries", {
+                "base": source_currency,
+                "symbols": target_currency,
+                "start_date": start_date.strftime("%Y-%m-%d"),
+                "end_date": end_date.strftime("%Y-%m-%d")
+            })
+            return self.parse_timeseries(data, target_currency)
+        except Exception as e:
+            print(f"Error fetching timeseries from CurrencyBeacon: {e}")
+            return None
@@ -0,0 +1,41 @@
+import csv
+import json
+from django.conf import settings
+from .models import CurrencyExchangeRate
+
+EXPORT_COLUMNS = ['source_currency', 'exchanged_currency', 'valuation_date', 'rate_value']
+
+class Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller."""
+    def write(self, value):
+        return value
+
+def iter_rates(pairs, date_from=None, date_to=None):
+    """
+    Yield (source, target, date, rate) tuples pair by pair, in date order.
+    Rows are streamed from the database in chunks without instantiating models.
+    """
+    chunk_size = getattr(settings, 'EXCHANGE_EXPORT_CHUNK_SIZE', 2000)
+    for source_currency, target_currency in pairs:
+        queryset = CurrencyExchangeRate.objects.for_pair(source_currency, target_currency)
+        if date_from:
+            queryset = queryset.filter(valuation_date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(valuation_date__lte=date_to)
+        for valuation_date, rate_value in queryset.series().iterator(chunk_size=chunk_size):
+            yield source_currency, target_currency, valuation_date, rate_value
+
+def iter_ndjson(rows):
+    for source_currency, target_currency, valuation_date, rate_value in rows:
+        yield json.dumps({
+            "source_currency": source_currency,
+            "exchanged_currency": target_currency,
+            "valuation_date": valuation_date.isoformat(),
+            "rate_value": str(rate_value),
+        }) + "\n"
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for source_currency, target_currency, valuation_date, rate_value in rows:
+        yield writer.writerow([source_currency, target_currency, valuation_date.isoformat(), rate_value])
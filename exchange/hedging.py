@@ -0,0 +1,60 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+
+class HedgeStats:
+    """Counters showing how often hedged requests fire and which call wins."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.hedges_fired = 0
+        self.primary_wins = 0
+        self.hedge_wins = 0
+
+    def increment(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedges_fired": self.hedges_fired,
+                "hedge_rate": self.hedges_fired / self.requests if self.requests else 0.0,
+                "primary_wins": self.primary_wins,
+                "hedge_wins": self.hedge_wins,
+            }
+
+hedge_stats = HedgeStats()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor() -> ThreadPoolExecutor:
+    """Thread pool running hedged provider calls, created on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'EXCHANGE_HEDGE_MAX_WORKERS', 16),
+                    thread_name_prefix='exchange-hedge',
+                )
+    return _executor
+
+def get_hedge_delay(breaker) -> float:
+    """
+    Seconds to wait for the primary provider before hedging: EXCHANGE_HEDGE_DELAY_MS when set,
+    otherwise the primary's observed p90 latency, falling back to EXCHANGE_HEDGE_DEFAULT_DELAY_MS.
+    """
+    delay_ms = getattr(settings, 'EXCHANGE_HEDGE_DELAY_MS', None)
+    if delay_ms is not None:
+        return delay_ms / 1000
+    p90 = breaker.latency_percentile(90)
+    if p90 is not None:
+        return p90
+    return getattr(settings, 'EXCHANGE_HEDGE_DEFAULT_DELAY_MS', 250) / 1000
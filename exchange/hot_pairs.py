@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.cache import cache
+
+HOT_PAIRS_KEY = 'exchange:hot_pairs'
+
+class HotPairTracker:
+    """
+    Counts latest-rate requests per pair so the prefetch task knows which pairs to keep warm.
+
+    Counts are collected per process and merged into the shared cache at most every
+    EXCHANGE_HOT_PAIRS_FLUSH_INTERVAL seconds, so recording a request costs no cache round trip.
+    Merges are not atomic; a lost increment only makes the ranking slightly less exact.
+    """
+
+    def __init__(self):
+        self._counts = Counter()
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'EXCHANGE_HOT_PAIRS_FLUSH_INTERVAL', 5)
+
+    def record(self, source_currency: str, target_currency: str):
+        with self._lock:
+            self._counts[f"{source_currency}:{target_currency}"] += 1
+            due = time.monotonic() - self._flushed_at >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._flushed_at = time.monotonic()
+        if counts:
+            shared = Counter(cache.get(HOT_PAIRS_KEY) or {})
+            shared.update(counts)
+            cache.set(HOT_PAIRS_KEY, dict(shared), timeout=None)
+
+    def top(self, count: int) -> list:
+        """The `count` most requested pairs as (source, target) tuples, busiest first."""
+        self.flush()
+        shared = Counter(cache.get(HOT_PAIRS_KEY) or {})
+        return [tuple(pair.split(':')) for pair, _ in shared.most_common(count)]
+
+    def decay(self):
+        """Scale every count by EXCHANGE_HOT_PAIRS_DECAY so the ranking follows recent traffic."""
+        factor = getattr(settings, 'EXCHANGE_HOT_PAIRS_DECAY', 0.5)
+        shared = cache.get(HOT_PAIRS_KEY) or {}
+        decayed = {pair: hits * factor for pair, hits in shared.items() if hits * factor >= 1}
+        cache.set(HOT_PAIRS_KEY, decayed, timeout=None)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+        cache.delete(HOT_PAIRS_KEY)
+
+hot_pairs = HotPairTracker()
@@ -0,0 +1,32 @@
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from mycurrency.celery import app
+from exchange.backfill import get_progress
+from exchange.tasks import backfill_rates
+
+class Command(BaseCommand):
+    help = "Backfill stored rates for many pairs, fanned out over the Celery workers. Dates already stored are skipped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pairs', required=True, help="Comma-separated SOURCE:TARGET pairs, e.g. USD:EUR,USD:GBP")
+        parser.add_argument('--from', dest='date_from', required=True, help="First date, YYYY-MM-DD")
+        parser.add_argument('--to', dest='date_to', required=True, help="Last date, YYYY-MM-DD")
+        parser.add_argument('--eager', action='store_true', help="Run every chunk in this process instead of queueing it")
+
+    def handle(self, *args, **options):
+        pairs = []
+        for pair in options['pairs'].split(','):
+            source_currency, _, target_currency = pair.strip().upper().partition(':')
+            if len(source_currency) != 3 or len(target_currency) != 3:
+                raise CommandError(f"'{pair}' is not a SOURCE:TARGET pair of currency codes.")
+            pairs.append((source_currency, target_currency))
+
+        if options['eager']:
+            app.conf.task_always_eager = True
+            backfill_id = backfill_rates(pairs, options['date_from'], options['date_to'])
+            self.stdout.write(f"Backfill finished: {get_progress(backfill_id)}")
+            return
+
+        backfill_id = uuid.uuid4().hex
+        backfill_rates.delay(pairs, options['date_from'], options['date_to'], backfill_id)
+        self.stdout.write(f"Backfill {backfill_id} queued; follow it at /api/backfills/{backfill_id}/")
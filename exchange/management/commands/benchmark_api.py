@@ -0,0 +1,115 @@
+import json
+import logging
+from datetime import date
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from exchange.benchmarks import scenarios
+from exchange.benchmarks.datasets import aggregate_generated, create_currencies, drop_generated, generate_rates
+from exchange.benchmarks.stub_provider import DEFAULT_SYMBOLS, StubCurrencyBeacon
+from exchange.cache import rate_cache
+
+SCENARIOS = ['convert-hot', 'rates-range', 'rates-monthly', 'admin-multi', 'backfill']
+
+class Command(BaseCommand):
+    help = (
+        "Run reproducible API scenarios in-process against a local stub of CurrencyBeacon and report "
+        "req/s, p50/p95/p99 latency and queries per request. Runs use a private in-memory cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', choices=SCENARIOS + ['all'], default='all')
+        parser.add_argument('--requests', type=int, default=500, help="Requests per scenario")
+        parser.add_argument('--concurrency', type=int, default=4, help="Concurrent client threads")
+        parser.add_argument('--latency-ms', type=float, default=20, help="Stub provider response time")
+        parser.add_argument('--jitter-ms', type=float, default=0, help="Extra random stub response time")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Share of stub responses that fail with 503")
+        parser.add_argument('--currencies', type=int, default=10, help="Generated currencies")
+        parser.add_argument('--days', type=int, default=3650, help="Days of generated history per pair")
+        parser.add_argument('--range-days', type=int, default=365, help="Range length of the rates-range scenario")
+        parser.add_argument('--backfill-pairs', type=int, default=10, help="Pairs loaded by the backfill scenario")
+        parser.add_argument('--backfill-days', type=int, default=730, help="Days per pair loaded by the backfill scenario")
+        parser.add_argument('--reuse', action='store_true', help="Use data left by an earlier --keep run instead of generating it")
+        parser.add_argument('--keep', action='store_true', help="Keep the generated data afterwards")
+        parser.add_argument('--output', help="Write the results to this JSON file")
+        parser.add_argument('--compare', help="JSON file of an earlier run to compare against")
+
+    def handle(self, *args, **options):
+        start_date = date(2000, 1, 1)
+        if not options['reuse']:
+            drop_generated()
+            rows = generate_rates(options['currencies'], options['days'], start_date)
+            self.stdout.write(f"Generated {rows} rows")
+        currencies = create_currencies(options['currencies'])
+        if not options['reuse']:
+            self.stdout.write(f"Built {aggregate_generated(currencies)} weekly/monthly aggregates")
+        codes = [currency.code for currency in currencies]
+
+        stub = StubCurrencyBeacon(
+            latency=options['latency_ms'] / 1000,
+            jitter=options['jitter_ms'] / 1000,
+            error_rate=options['error_rate'],
+            symbols=DEFAULT_SYMBOLS + codes,
+        )
+        names = SCENARIOS if options['scenario'] == 'all' else [options['scenario']]
+        # Failed requests are counted as errors; their tracebacks would drown the report
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        results = {}
+        # A private cache keeps stub rates out of any shared cache and makes runs independent
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}), \
+                stub, scenarios.stub_provider_chain(stub):
+            for name in names:
+                rate_cache.clear()
+                stub.requests.clear()
+                request, count = self.build_scenario(name, options, currencies, codes, start_date)
+                result = scenarios.run_requests(request, count, options['concurrency'])
+                result["provider_calls"] = sum(stub.requests.values())
+                results[name] = result
+                self.report(name, result)
+
+        if not options['keep']:
+            drop_generated()
+
+        if options['compare']:
+            with open(options['compare']) as previous_file:
+                self.compare(json.load(previous_file), results)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump({"options": {key: options[key] for key in ('requests', 'concurrency', 'latency_ms', 'error_rate', 'currencies', 'days')},
+                           "database": settings.DATABASES['default']['ENGINE'], "results": results}, output_file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def build_scenario(self, name, options, currencies, codes, start_date):
+        if name == 'convert-hot':
+            return scenarios.convert_hot_pairs(codes), options['requests']
+        if name == 'rates-range':
+            return scenarios.rates_long_range(codes, start_date, options['days'], options['range_days']), options['requests']
+        if name == 'rates-monthly':
+            # Monthly points over the whole generated history
+            return scenarios.rates_long_range(codes, start_date, options['days'], options['days'], resolution='month'), options['requests']
+        if name == 'admin-multi':
+            return scenarios.admin_multi_target(currencies, start_date, options['days']), options['requests']
+        # Backfill into the days after the generated history, so it never collides with it
+        backfill_start = date.fromordinal(start_date.toordinal() + options['days'])
+        return scenarios.backfill_chunks(codes, backfill_start, options['backfill_days'], options['backfill_pairs'])
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name:>12}: {result['count']} requests, {result['requests_per_second']:.1f} req/s, "
+            f"p50 {result['p50_ms']:.2f}ms, p95 {result['p95_ms']:.2f}ms, p99 {result['p99_ms']:.2f}ms, "
+            f"{result['queries_per_request']:.1f} queries/request, {result['provider_calls']} provider calls, "
+            f"{result['errors']} errors"
+        )
+
+    def compare(self, previous, results):
+        self.stdout.write("Compared with the earlier run:")
+        for name, result in results.items():
+            before = previous.get("results", {}).get(name)
+            if before is None:
+                continue
+            changes = ", ".join(
+                f"{key} {before[key]:.2f} -> {result[key]:.2f} ({(result[key] / before[key] - 1) * 100:+.1f}%)"
+                if before[key] else f"{key} {before[key]:.2f} -> {result[key]:.2f}"
+                for key in ('requests_per_second', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request')
+            )
+            self.stdout.write(f"{name:>12}: {changes}")
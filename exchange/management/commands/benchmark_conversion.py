@@ -0,0 +1,45 @@
+import random
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from exchange.money import convert, quantize
+from exchange.renderers import DecimalJSONRenderer
+
+class Command(BaseCommand):
+    help = "Compare the cost per conversion of the old float path with the exact Decimal path, with and without JSON rendering."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conversions', type=int, default=100000, help="Conversions timed per path")
+        parser.add_argument('--target', default='EUR', help="Target currency whose minor units are used for rounding")
+
+    def handle(self, *args, **options):
+        rng = random.Random(1)
+        amounts = [Decimal(rng.randrange(1, 10_000_000)) / 100 for _ in range(options['conversions'])]
+        rates = [Decimal(rng.randrange(1, 2_000_000)) / 1_000_000 for _ in range(options['conversions'])]
+        target = options['target']
+        float_renderer = JSONRenderer()
+        decimal_renderer = DecimalJSONRenderer()
+
+        def float_path(amount, rate):
+            # What CurrencyConversionAPIView did before: FloatField amount times float(rate)
+            amount = float(amount)
+            return {"amount": amount, "converted_amount": amount * float(rate), "rate": float(rate)}
+
+        def decimal_path(amount, rate):
+            return {"amount": quantize(amount, 'USD'), "converted_amount": convert(amount, rate, target), "rate": rate}
+
+        cases = [
+            ("float", float_path, None),
+            ("decimal", decimal_path, None),
+            ("float + render", float_path, float_renderer),
+            ("decimal + render", decimal_path, decimal_renderer),
+        ]
+        for label, path, renderer in cases:
+            started = time.perf_counter()
+            for amount, rate in zip(amounts, rates):
+                result = path(amount, rate)
+                if renderer is not None:
+                    renderer.render(result)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{label:>16}: {elapsed / len(amounts) * 1e9:8.0f} ns per conversion")
@@ -0,0 +1,59 @@
+import random
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from exchange.benchmarks import summarize
+from exchange.benchmarks.datasets import create_currencies, drop_generated, generate_rates
+from exchange.models import CurrencyExchangeRate
+
+class Command(BaseCommand):
+    help = (
+        "Time pair + date range lookups on CurrencyExchangeRate over generated data. "
+        "--currencies 33 --days 9500 generates about 10M rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--currencies', type=int, default=10, help="Generated currencies; every ordered pair gets a series")
+        parser.add_argument('--days', type=int, default=3650, help="Days of history per pair")
+        parser.add_argument('--range-days', type=int, default=365, help="Length of each queried range")
+        parser.add_argument('--queries', type=int, default=200, help="Number of range queries to time")
+        parser.add_argument('--reuse', action='store_true', help="Query data left by an earlier --keep run instead of generating it")
+        parser.add_argument('--keep', action='store_true', help="Keep the generated data afterwards")
+
+    def handle(self, *args, **options):
+        start_date = date(2000, 1, 1)
+        if not options['reuse']:
+            drop_generated()
+            started = time.monotonic()
+            rows = generate_rates(
+                options['currencies'], options['days'], start_date,
+                progress=lambda written: self.stdout.write(f"  {written} rows written", ending="\r"),
+            )
+            self.stdout.write(f"Generated {rows} rows in {time.monotonic() - started:.1f}s")
+
+        codes = [currency.code for currency in create_currencies(options['currencies'])]
+        self.stdout.write(f"CurrencyExchangeRate rows: {CurrencyExchangeRate.objects.count()}")
+
+        rng = random.Random(1)
+        latencies = []
+        for _ in range(options['queries']):
+            source_currency, target_currency = rng.sample(codes, 2)
+            date_from = start_date + timedelta(days=rng.randrange(max(1, options['days'] - options['range_days'])))
+            date_to = date_from + timedelta(days=options['range_days'] - 1)
+            queryset = CurrencyExchangeRate.objects.for_pair(source_currency, target_currency).between(date_from, date_to).series()
+
+            started = time.perf_counter()
+            list(queryset)
+            latencies.append(time.perf_counter() - started)
+
+        summary = summarize(latencies)
+        self.stdout.write(
+            f"{options['range_days']}-day range queries: {summary['count']} runs, "
+            f"mean {summary['mean_ms']:.2f}ms, p50 {summary['p50_ms']:.2f}ms, "
+            f"p95 {summary['p95_ms']:.2f}ms, p99 {summary['p99_ms']:.2f}ms"
+        )
+        self.stdout.write("Query plan:")
+        self.stdout.write(queryset.explain())
+
+        if not options['keep']:
+            drop_generated()
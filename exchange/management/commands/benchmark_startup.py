@@ -0,0 +1,68 @@
+import json
+from django.core.management.base import BaseCommand
+from exchange.benchmarks import percentile
+from exchange.benchmarks.startup import TARGETS, measure
+
+# Libraries only some requests need; a cold start should not pay for them
+LAZY_MODULES = ['requests', 'httpx', 'numpy']
+
+class Command(BaseCommand):
+    help = (
+        "Time cold starts of manage.py and of a Celery worker in fresh interpreters and report the "
+        "slowest imports. Use --output and --compare to track startup time across changes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=list(TARGETS) + ['all'], default='all')
+        parser.add_argument('--runs', type=int, default=5, help="Cold starts per target")
+        parser.add_argument('--top', type=int, default=10, help="Slowest modules listed per target")
+        parser.add_argument('--output', help="Write the results to this JSON file")
+        parser.add_argument('--compare', help="JSON file of an earlier run to compare against")
+
+    def handle(self, *args, **options):
+        targets = list(TARGETS) if options['target'] == 'all' else [options['target']]
+        results = {}
+        for target in targets:
+            wall_times, modules = measure(target, options['runs'])
+            project_us = sum(self_us for name, (self_us, _) in modules.items() if name.split('.')[0] in ('exchange', 'mycurrency'))
+            results[target] = {
+                "runs": len(wall_times),
+                "p50_ms": percentile(wall_times, 50) * 1000,
+                "min_ms": min(wall_times) * 1000,
+                "import_ms": sum(self_us for self_us, _ in modules.values()) / 1000,
+                "project_import_ms": project_us / 1000,
+                "modules": len(modules),
+                "lazy_modules_loaded": [name for name in LAZY_MODULES if name in modules],
+                "slowest": sorted(((name, self_us / 1000) for name, (self_us, _) in modules.items()), key=lambda item: -item[1])[:options['top']],
+            }
+            self.report(target, results[target])
+
+        if options['compare']:
+            with open(options['compare']) as previous_file:
+                self.compare(json.load(previous_file), results)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump({"results": results}, output_file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def report(self, target, result):
+        self.stdout.write(
+            f"{target:>7}: p50 {result['p50_ms']:.0f}ms, min {result['min_ms']:.0f}ms over {result['runs']} runs, "
+            f"{result['modules']} modules, imports {result['import_ms']:.0f}ms ({result['project_import_ms']:.1f}ms in project code), "
+            f"lazy modules loaded: {', '.join(result['lazy_modules_loaded']) or 'none'}"
+        )
+        for name, milliseconds in result['slowest']:
+            self.stdout.write(f"{'':>9}{milliseconds:8.1f}ms  {name}")
+
+    def compare(self, previous, results):
+        self.stdout.write("Compared with the earlier run:")
+        for target, result in results.items():
+            before = previous.get("results", {}).get(target)
+            if before is None:
+                continue
+            changes = ", ".join(
+                f"{key} {before[key]:.1f} -> {result[key]:.1f} ({(result[key] / before[key] - 1) * 100:+.1f}%)"
+                if before[key] else f"{key} {before[key]:.1f} -> {result[key]:.1f}"
+                for key in ('p50_ms', 'min_ms', 'import_ms', 'modules')
+            )
+            self.stdout.write(f"{target:>7}: {changes}")
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from exchange.aggregates import rebuild_aggregates
+from exchange.models import Currency, CurrencyExchangeRate
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the weekly and monthly rate aggregates from the stored daily rates. Needed once for rates "
+        "stored before the aggregates existed, or after daily rows were deleted; new rates keep them up to date."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pairs', help="Comma-separated SOURCE:TARGET pairs, e.g. USD:EUR,USD:GBP (default: every stored pair)")
+
+    def handle(self, *args, **options):
+        currencies = Currency.objects.in_bulk(field_name='code')
+        if options['pairs']:
+            pairs = []
+            for pair in options['pairs'].split(','):
+                source_currency, _, target_currency = pair.strip().upper().partition(':')
+                if source_currency not in currencies or target_currency not in currencies:
+                    raise CommandError(f"'{pair}' is not a SOURCE:TARGET pair of known currency codes.")
+                pairs.append((currencies[source_currency], currencies[target_currency]))
+        else:
+            by_pk = {currency.pk: currency for currency in currencies.values()}
+            pairs = [
+                (by_pk[source_id], by_pk[target_id])
+                for source_id, target_id in CurrencyExchangeRate.objects.values_list('source_currency', 'exchanged_currency').distinct()
+            ]
+
+        for source_currency, target_currency in pairs:
+            count = rebuild_aggregates(source_currency, target_currency)
+            self.stdout.write(f"{source_currency.code} to {target_currency.code}: {count} aggregates")
@@ -0,0 +1,138 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def escape_label_value(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in labels.items()) + '}'
+
+class Histogram:
+    """
+    Prometheus-style histogram kept in process memory. Each worker process exposes its own
+    series, which Prometheus sums across scrape targets.
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"buckets": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["buckets"][bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def collect(self) -> dict:
+        """{label values: {"buckets": non-cumulative counts with +Inf last, "sum", "count"}}."""
+        with self._lock:
+            return {key: {**series, "buckets": list(series["buckets"])} for key, series in self._series.items()}
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.collect().items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series["buckets"]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels({**labels, 'le': bound})} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(labels)} {series['sum']}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {series['count']}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+def render_samples(name, documentation, samples: list, metric_type='gauge') -> list:
+    """Exposition lines for a metric computed at scrape time from (labels, value) pairs."""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"]
+    for labels, value in samples:
+        lines.append(f"{name}{format_labels(labels)} {value}")
+    return lines
+
+request_seconds = Histogram(
+    'exchange_request_duration_seconds', "Time spent handling a request.", ('endpoint', 'method', 'status')
+)
+request_phase_seconds = Histogram(
+    'exchange_request_phase_duration_seconds', "Time a request spent in each phase (db, cache, factory, provider-<name>).",
+    ('endpoint', 'phase')
+)
+provider_call_seconds = Histogram(
+    'exchange_provider_call_duration_seconds', "Duration of provider calls.", ('provider', 'method', 'outcome')
+)
+cache_lookup_seconds = Histogram(
+    'exchange_cache_lookup_duration_seconds', "Duration of rate cache lookups.", ('result',)
+)
+
+HISTOGRAMS = [request_seconds, request_phase_seconds, provider_call_seconds, cache_lookup_seconds]
+
+def render_histograms() -> list:
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return lines
+
+def reset_metrics():
+    for histogram in HISTOGRAMS:
+        histogram.reset()
+
+class RequestTimings:
+    """Seconds and number of timed operations per phase for the request being handled."""
+
+    def __init__(self):
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    def add(self, phase, seconds):
+        with self._lock:
+            total, count = self.phases.get(phase, (0.0, 0))
+            self.phases[phase] = (total + seconds, count + 1)
+
+    def items(self):
+        with self._lock:
+            return list(self.phases.items())
+
+# Set by MetricsMiddleware for the duration of a request; copied into sync_to_async threads
+current_timings = ContextVar('exchange_request_timings', default=None)
+
+def record_phase(phase, seconds):
+    timings = current_timings.get()
+    if timings is not None:
+        timings.add(phase, seconds)
+
+@contextmanager
+def timed(phase):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter() - started)
+
+def observe_provider_call(name, method, outcome, seconds):
+    """Record a provider call (outcome: success, failure or rate_limited) in its histogram and the request's phases."""
+    provider_call_seconds.observe(seconds, provider=name, method=method, outcome=outcome)
+    record_phase(f"provider-{name}", seconds)
+
+def time_query(execute, sql, params, many, context):
+    """Database execute wrapper adding every query to the current request's db phase."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record_phase('db', time.perf_counter() - started)
@@ -0,0 +1,56 @@
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from .metrics import RequestTimings, current_timings, request_phase_seconds, request_seconds
+
+class MetricsMiddleware:
+    """
+    Times every request into the request histograms, split into the phases recorded while it ran
+    (db, cache, factory, provider-<name>). With EXCHANGE_SERVER_TIMING the phases are also sent
+    back in a Server-Timing header, so browser dev tools show where the time went.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings, time.perf_counter() - started)
+
+    def finish(self, request, response, timings, elapsed):
+        resolver_match = getattr(request, 'resolver_match', None)
+        endpoint = resolver_match.url_name or resolver_match.view_name if resolver_match else 'unmatched'
+        request_seconds.observe(elapsed, endpoint=endpoint, method=request.method, status=response.status_code)
+
+        phases = timings.items()
+        for phase, (seconds, _) in phases:
+            request_phase_seconds.observe(seconds, endpoint=endpoint, phase=phase)
+
+        if getattr(settings, 'EXCHANGE_SERVER_TIMING', False):
+            entries = [f'{phase};dur={seconds * 1000:.2f};desc="{count} calls"' for phase, (seconds, count) in phases]
+            entries.append(f"total;dur={elapsed * 1000:.2f}")
+            response['Server-Timing'] = ', '.join(entries)
+        return response
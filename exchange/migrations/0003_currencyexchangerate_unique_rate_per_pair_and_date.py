@@ -0,0 +1,34 @@
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def remove_duplicate_rates(apps, schema_editor):
+    # Keep the most recently stored row for every (pair, date) before adding the constraint
+    CurrencyExchangeRate = apps.get_model('exchange', 'CurrencyExchangeRate')
+    duplicates = (
+        CurrencyExchangeRate.objects
+        .values('source_currency', 'exchanged_currency', 'valuation_date')
+        .annotate(latest_id=Max('id'), rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        CurrencyExchangeRate.objects.filter(
+            source_currency=duplicate['source_currency'],
+            exchanged_currency=duplicate['exchanged_currency'],
+            valuation_date=duplicate['valuation_date'],
+        ).exclude(id=duplicate['latest_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchange', '0002_provider'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_rates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='currencyexchangerate',
+            constraint=models.UniqueConstraint(fields=('source_currency', 'exchanged_currency', 'valuation_date'), name='unique_rate_per_pair_and_date'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchange', '0004_currencyexchangerate_lookup_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRateSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base_currency', models.CharField(max_length=3)),
+                ('valuation_date', models.DateField()),
+                ('rates', models.JSONField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('base_currency', 'valuation_date'), name='unique_snapshot_per_base_and_date')],
+            },
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:01
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Copies of exchange.aggregates as of this migration, so later changes there can't alter it
+def period_start(resolution, day):
+    if resolution == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def fold(aggregate, day, rate):
+    if not aggregate.rate_count:
+        aggregate.first_date = aggregate.last_date = day
+        aggregate.open_rate = aggregate.high_rate = aggregate.low_rate = aggregate.close_rate = rate
+    else:
+        if day < aggregate.first_date:
+            aggregate.first_date, aggregate.open_rate = day, rate
+        if day > aggregate.last_date:
+            aggregate.last_date, aggregate.close_rate = day, rate
+        aggregate.high_rate = max(aggregate.high_rate, rate)
+        aggregate.low_rate = min(aggregate.low_rate, rate)
+    aggregate.rate_sum += rate
+    aggregate.rate_count += 1
+
+
+def build_aggregates(apps, schema_editor):
+    # store_rates() only maintains aggregates for rows written from now on, so aggregate the stored ones
+    CurrencyExchangeRate = apps.get_model('exchange', 'CurrencyExchangeRate')
+    RateAggregate = apps.get_model('exchange', 'RateAggregate')
+    pairs = list(CurrencyExchangeRate.objects.order_by().values_list('source_currency', 'exchanged_currency').distinct())
+    for source_currency_id, exchanged_currency_id in pairs:
+        daily_rows = (
+            CurrencyExchangeRate.objects
+            .filter(source_currency=source_currency_id, exchanged_currency=exchanged_currency_id)
+            .order_by('valuation_date')
+            .values_list('valuation_date', 'rate_value')
+            .iterator(chunk_size=10000)
+        )
+        aggregates = {}
+        for day, rate in daily_rows:
+            for resolution in ('week', 'month'):
+                start = period_start(resolution, day)
+                if (resolution, start) not in aggregates:
+                    aggregates[(resolution, start)] = RateAggregate(
+                        source_currency_id=source_currency_id, exchanged_currency_id=exchanged_currency_id,
+                        resolution=resolution, period_start=start,
+                    )
+                fold(aggregates[(resolution, start)], day, rate)
+        RateAggregate.objects.bulk_create(aggregates.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchange', '0005_dailyratesnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('first_date', models.DateField(null=True)),
+                ('last_date', models.DateField(null=True)),
+                ('open_rate', models.DecimalField(decimal_places=6, max_digits=18, null=True)),
+                ('high_rate', models.DecimalField(decimal_places=6, max_digits=18, null=True)),
+                ('low_rate', models.DecimalField(decimal_places=6, max_digits=18, null=True)),
+                ('close_rate', models.DecimalField(decimal_places=6, max_digits=18, null=True)),
+                ('rate_sum', models.DecimalField(decimal_places=6, default=0, max_digits=24)),
+                ('rate_count', models.PositiveIntegerField(default=0)),
+                ('exchanged_currency', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='exchange.currency')),
+                ('source_currency', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rate_aggregates', to='exchange.currency')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('source_currency', 'exchanged_currency', 'resolution', 'period_start'), name='unique_aggregate_per_pair_and_period')],
+            },
+        ),
+        migrations.RunPython(build_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchange', '0007_currencyexchangerate_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='currency',
+            name='name',
+            field=models.CharField(db_index=True, max_length=64),
+        ),
+    ]
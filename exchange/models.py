@@ -1,17 +1,101 @@
 from django.db import models
+from .rate_matrix import RateMatrix
+
+class PairQuerySet(models.QuerySet):
+    """Lookups of a currency pair's rows by code, shaped to use the pair's leading index columns."""
+
+    def for_pair(self, source_currency, target_currency):
+        # Scalar subqueries instead of joins, so both leading index columns are equality matches
+        return self.filter(
+            source_currency=models.Subquery(Currency.objects.filter(code=source_currency).values('pk')[:1]),
+            exchanged_currency=models.Subquery(Currency.objects.filter(code=target_currency).values('pk')[:1]),
+        )
+
+class CurrencyExchangeRateQuerySet(PairQuerySet):
+    """Lookups shaped to use the (source, exchanged, valuation_date) index."""
+
+    def between(self, date_from, date_to):
+        return self.filter(valuation_date__range=(date_from, date_to))
+
+    def series(self):
+        """(valuation_date, rate_value) tuples in date order, without instantiating models."""
+        return self.order_by('valuation_date').values_list('valuation_date', 'rate_value')
 
 class CurrencyExchangeRate(models.Model):
-    source_currency = models.ForeignKey('Currency', related_name='exchanges', on_delete=models.CASCADE)
+    # The composite unique index below leads with source_currency, so it doubles as its FK index
+    source_currency = models.ForeignKey('Currency', related_name='exchanges', on_delete=models.CASCADE, db_index=False)
     exchanged_currency = models.ForeignKey('Currency', on_delete=models.CASCADE)
     valuation_date = models.DateField(db_index=True)
-    rate_value = models.DecimalField(db_index=True, decimal_places=6, max_digits=18)
+    rate_value = models.DecimalField(decimal_places=6, max_digits=18)
+    # Set on every save and upsert, so range validators change with any write to their rows
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CurrencyExchangeRateQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # Serves pair + date range scans in date order as well as upserts
+            models.UniqueConstraint(
+                fields=['source_currency', 'exchanged_currency', 'valuation_date'],
+                name='unique_rate_per_pair_and_date',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.source_currency.code} to {self.exchanged_currency.code} on {self.valuation_date} - Rate: {self.rate_value}"
 
+class RateAggregateQuerySet(PairQuerySet):
+    def at(self, resolution):
+        return self.filter(resolution=resolution)
+
+    def between(self, date_from, date_to):
+        return self.filter(period_start__range=(date_from, date_to))
+
+class RateAggregate(models.Model):
+    """
+    Open, high, low, close and mean of a pair's daily rates over one week (from Monday) or
+    calendar month. store_rates folds new daily rows into these as they are written, so
+    long-range charts read one row per period instead of one per day.
+    """
+    WEEK = 'week'
+    MONTH = 'month'
+    RESOLUTION_CHOICES = [
+        (WEEK, 'Week'),
+        (MONTH, 'Month'),
+    ]
+
+    # The composite unique index below leads with source_currency, so it doubles as its FK index
+    source_currency = models.ForeignKey('Currency', related_name='rate_aggregates', on_delete=models.CASCADE, db_index=False)
+    exchanged_currency = models.ForeignKey('Currency', related_name='+', on_delete=models.CASCADE)
+    resolution = models.CharField(max_length=5, choices=RESOLUTION_CHOICES)
+    period_start = models.DateField()
+    # Dates of the open and close rates; empty until the first daily rate is folded in
+    first_date = models.DateField(null=True)
+    last_date = models.DateField(null=True)
+    open_rate = models.DecimalField(decimal_places=6, max_digits=18, null=True)
+    high_rate = models.DecimalField(decimal_places=6, max_digits=18, null=True)
+    low_rate = models.DecimalField(decimal_places=6, max_digits=18, null=True)
+    close_rate = models.DecimalField(decimal_places=6, max_digits=18, null=True)
+    # Sum and number of daily rates, kept instead of the mean so new days can be added to it
+    rate_sum = models.DecimalField(decimal_places=6, max_digits=24, default=0)
+    rate_count = models.PositiveIntegerField(default=0)
+
+    objects = RateAggregateQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source_currency', 'exchanged_currency', 'resolution', 'period_start'],
+                name='unique_aggregate_per_pair_and_period',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.source_currency.code} to {self.exchanged_currency.code} {self.resolution} of {self.period_start} ({self.rate_count} days)"
+
 class Currency(models.Model):   
     code = models.CharField(max_length=3, unique=True)
-    name = models.CharField(max_length=20, db_index=True)
+    name = models.CharField(max_length=64, db_index=True)
     symbol = models.CharField(max_length=10)
 
     def __str__(self):
@@ -28,4 +112,34 @@ class Provider(models.Model):
     priority = models.PositiveIntegerField(default=1)  # Lower numbers mean higher priority
 
     def __str__(self):
-        return f"{self.get_name_display()} - {'Active' if self.is_active else 'Inactive'} (Priority: {self.priority})"
\ No newline at end of file
+        return f"{self.get_name_display()} - {'Active' if self.is_active else 'Inactive'} (Priority: {self.priority})"
+
+class DailyRateSnapshotQuerySet(models.QuerySet):
+    def for_base(self, base_currency):
+        return self.filter(base_currency=base_currency)
+
+    def between(self, date_from, date_to):
+        return self.filter(valuation_date__range=(date_from, date_to))
+
+class DailyRateSnapshot(models.Model):
+    """
+    One base currency's rates against every other currency on a day, stored as a single row.
+    Any cross rate for that day is derived from it, so storage grows with N currencies per day
+    instead of N² pairs.
+    """
+    base_currency = models.CharField(max_length=3)
+    valuation_date = models.DateField()
+    rates = models.JSONField()  # {code: rate as a string, to keep Decimal precision}
+
+    objects = DailyRateSnapshotQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['base_currency', 'valuation_date'], name='unique_snapshot_per_base_and_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.base_currency} snapshot on {self.valuation_date} ({len(self.rates)} rates)"
+
+    def to_matrix(self) -> RateMatrix:
+        return RateMatrix(self.base_currency, self.rates, self.valuation_date)
\ No newline at end of file
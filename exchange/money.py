@@ -0,0 +1,48 @@
+from decimal import Context, Decimal, ROUND_HALF_EVEN
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+# ISO 4217 minor units for currencies that do not use two decimal places
+DEFAULT_MINOR_UNITS = {
+    'BHD': 3, 'BIF': 0, 'CLP': 0, 'DJF': 0, 'GNF': 0, 'IQD': 3, 'ISK': 0, 'JOD': 3,
+    'JPY': 0, 'KMF': 0, 'KRW': 0, 'KWD': 3, 'LYD': 3, 'OMR': 3, 'PYG': 0, 'RWF': 0,
+    'TND': 3, 'UGX': 0, 'UYI': 0, 'VND': 0, 'VUV': 0, 'XAF': 0, 'XOF': 0, 'XPF': 0,
+}
+
+# Wide enough that amount * rate is exact before it is rounded
+MONEY_CONTEXT = Context(prec=50, rounding=ROUND_HALF_EVEN)
+
+# Stored rates keep 6 decimal places (CurrencyExchangeRate.rate_value)
+RATE_EXPONENT = Decimal("0.000001")
+
+_exponents = {}
+
+def get_minor_units(code: str) -> int:
+    overrides = getattr(settings, 'EXCHANGE_CURRENCY_MINOR_UNITS', {})
+    if code in overrides:
+        return overrides[code]
+    return DEFAULT_MINOR_UNITS.get(code, getattr(settings, 'EXCHANGE_DEFAULT_MINOR_UNITS', 2))
+
+def get_exponent(code: str) -> Decimal:
+    """Quantization exponent of the currency, e.g. Decimal('0.01'); resolved once per code."""
+    exponent = _exponents.get(code)
+    if exponent is None:
+        exponent = _exponents[code] = Decimal(1).scaleb(-get_minor_units(code))
+    return exponent
+
+@receiver(setting_changed)
+def clear_exponents(setting, **kwargs):
+    if setting in ('EXCHANGE_CURRENCY_MINOR_UNITS', 'EXCHANGE_DEFAULT_MINOR_UNITS'):
+        _exponents.clear()
+
+def quantize(amount: Decimal, code: str) -> Decimal:
+    return amount.quantize(get_exponent(code), context=MONEY_CONTEXT)
+
+def convert(amount: Decimal, rate: Decimal, code: str) -> Decimal:
+    """Exact amount * rate, rounded half-even to the minor units of the target currency."""
+    return MONEY_CONTEXT.multiply(amount, rate).quantize(get_exponent(code), context=MONEY_CONTEXT)
+
+def quantize_rate(rate) -> Decimal:
+    """A rate rounded the way the database stores it: half-even to 6 decimal places."""
+    return Decimal(rate).quantize(RATE_EXPONENT, context=MONEY_CONTEXT)
@@ -0,0 +1,54 @@
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from .models import Provider
+
+PROVIDER_CHAIN_VERSION_KEY = 'exchange:provider_chain_version'
+
+class ProviderChain:
+    """
+    Process-level cache of the active provider names in priority order.
+
+    The Provider table is only read again when the shared version key changes, which
+    happens whenever a Provider row is saved or deleted. Each process checks the key at
+    most once every EXCHANGE_PROVIDER_CHAIN_CHECK_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self._names = None
+        self._version = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    @property
+    def check_interval(self):
+        return getattr(settings, 'EXCHANGE_PROVIDER_CHAIN_CHECK_INTERVAL', 1)
+
+    def get_names(self) -> list:
+        now = time.monotonic()
+        with self._lock:
+            if self._names is not None and now - self._checked_at < self.check_interval:
+                return self._names
+
+            version = cache.get(PROVIDER_CHAIN_VERSION_KEY)
+            if self._names is None or version != self._version:
+                self._names = list(
+                    Provider.objects.filter(is_active=True).order_by('priority').values_list('name', flat=True)
+                )
+                self._version = version
+            self._checked_at = now
+            return self._names
+
+    def invalidate(self):
+        """Bump the shared version so every process reloads the chain, this one immediately."""
+        cache.add(PROVIDER_CHAIN_VERSION_KEY, 0, timeout=None)
+        try:
+            cache.incr(PROVIDER_CHAIN_VERSION_KEY)
+        except ValueError:
+            # The key was evicted between add() and incr()
+            cache.set(PROVIDER_CHAIN_VERSION_KEY, 1, timeout=None)
+        with self._lock:
+            self._names = None
+
+provider_chain = ProviderChain()
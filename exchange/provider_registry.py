@@ -1,12 +1,36 @@
+from django.utils.module_loading import import_string
+
+# {name: provider class, or the dotted path it is imported from on first use}
 provider_registry = {}
+async_provider_registry = {}
+
+def resolve(registry, name, kind):
+    """Return the class registered under name, importing and caching it if it was registered by dotted path."""
+    provider_class = registry.get(name)
+    if provider_class is None:
+        raise ValueError(f"No {kind} registered under the name '{name}'")
+    if isinstance(provider_class, str):
+        try:
+            provider_class = registry[name] = import_string(provider_class)
+        except ImportError as e:
+            raise ValueError(f"Could not import {kind} '{name}' from '{provider_class}': {e}")
+    return provider_class
 
 def register_provider(name, provider_class):
-    """Register a provider class under a specific name."""
+    """
+    Register a provider class under a specific name. Passing the class's dotted path instead
+    defers importing its module (and its HTTP client library) until the provider is first used.
+    """
     provider_registry[name] = provider_class
 
 def get_provider(name):
     """Retrieve a provider class by name."""
-    provider_class = provider_registry.get(name)
-    if provider_class is None:
-        raise ValueError(f"No provider registered under the name '{name}'")
-    return provider_class
+    return resolve(provider_registry, name, 'provider')
+
+def register_async_provider(name, provider_class):
+    """Register the async implementation of a provider under the same name as its sync one; a dotted path is imported lazily."""
+    async_provider_registry[name] = provider_class
+
+def get_async_provider(name):
+    """Retrieve an async provider class by name."""
+    return resolve(async_provider_registry, name, 'async provider')
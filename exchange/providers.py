@@ -1,11 +1,24 @@
-import os
-import requests
 import random
+import threading
+import time
 from abc import ABC, abstractmethod
-from datetime import date
+from concurrent.futures import FIRST_COMPLETED, wait
+from contextvars import copy_context
+from datetime import date, timedelta
 from decimal import Decimal
+from django.conf import settings
+from .backfill import acquire_provider_slot
+from .cache import rate_cache
+from .circuit_breaker import call_succeeded, get_breaker, order_by_latency
+from .hedging import get_executor, get_hedge_delay, hedge_stats
+from .hot_pairs import hot_pairs
+from .metrics import observe_provider_call, timed
 from .provider_registry import register_provider, get_provider
-from .models import Provider
+from .rate_limiter import INTERACTIVE, rate_limiter
+from .rate_matrix import RateMatrix
+from .rates import get_stored_snapshot, store_snapshot
+from .singleflight import singleflight
+from .provider_chain import provider_chain
 
 # Abstract Interface for Currency Providers
 class CurrencyProviderInterface(ABC):
@@ -14,80 +27,287 @@ class CurrencyProviderInterface(ABC):
         """Retrieve the exchange rate from source to target currency for a specific date or latest."""
         pass
 
-# CurrencyBeacon Provider
-class CurrencyBeaconProvider(CurrencyProviderInterface):
-    API_URL = os.getenv("CURRENCY_BEACON_API_URL", "https://api.currencybeacon.com/v1")
-    API_KEY = os.getenv("CURRENCY_BEACON_API_KEY", "LNhV0SbxfG4L1HeXaNGyX3SeZ1RIA6db")
-
-    def get_exchange_rate(self, source_currency: str, target_currency: str, valuation_date: date = None) -> Decimal:
-        if valuation_date is None:
-            return self.get_latest_rate(source_currency, target_currency)
-        else:
-            return self.get_historical_rate(source_currency, target_currency, valuation_date)
-
-    def get_latest_rate(self, source_currency: str, target_currency: str) -> Decimal:
-        try:
-            response = requests.get(
-                f"{self.API_URL}/latest",
-                params={"api_key": self.API_KEY, "base": source_currency, "symbols": target_currency}
-            )
-            data = response.json()
-            rate = data.get("rates", {}).get(target_currency)
-            return Decimal(rate) if rate else Decimal("0.0")
-        except Exception as e:
-            print(f"Error fetching latest rate from CurrencyBeacon: {e}")
-            return Decimal("0.0")
-
-    def get_historical_rate(self, source_currency: str, target_currency: str, valuation_date: date) -> Decimal:
-        try:
-            response = requests.get(
-                f"{self.API_URL}/historical",
-                params={
-                    "api_key": self.API_KEY,
-                    "base": source_currency,
-                    "symbols": target_currency,
-                    "date": valuation_date.strftime("%Y-%m-%d")
-                }
-            )
-            data = response.json()
-            rate = data.get("rates", {}).get(target_currency)
-            return Decimal(rate) if rate else Decimal("0.0")
-        except Exception as e:
-            print(f"Error fetching historical rate from CurrencyBeacon: {e}")
-            return Decimal("0.0")
+    def get_timeseries(self, source_currency: str, target_currency: str, start_date: date, end_date: date) -> dict:
+        """
+        Retrieve {date: rate} for every date from start_date to end_date (inclusive), or None if the provider failed.
+        Providers with a native range endpoint should override this one-call-per-day fallback.
+        """
+        rates = {}
+        current_date = start_date
+        while current_date <= end_date:
+            rate = self.get_exchange_rate(source_currency, target_currency, current_date)
+            if rate > 0:
+                rates[current_date] = rate
+            current_date += timedelta(days=1)
+        return rates
 
-# Register CurrencyBeaconProvider
-register_provider('currencybeacon', CurrencyBeaconProvider)
+    def get_rate_snapshot(self, base_currency: str, symbols: list = None, valuation_date: date = None) -> dict:
+        """
+        Retrieve {code: rate} against base_currency for the given symbols, or every symbol the
+        provider knows when symbols is None, or None if the provider failed. Providers may return
+        more symbols than asked for. This fallback makes one call per symbol and needs an explicit symbol list.
+        """
+        rates = {}
+        for symbol in symbols or []:
+            if symbol == base_currency:
+                continue
+            rate = self.get_exchange_rate(base_currency, symbol, valuation_date)
+            if rate > 0:
+                rates[symbol] = rate
+        return rates
 
 # Mock Provider for Testing
 class MockCurrencyProvider(CurrencyProviderInterface):
     def get_exchange_rate(self, source_currency: str, target_currency: str, valuation_date: date = None) -> Decimal:
         return Decimal(random.uniform(0.5, 1.5))
 
-# Register MockCurrencyProvider
+# Register the built-in providers; their modules are imported on first use
+register_provider('currencybeacon', 'exchange.currencybeacon.CurrencyBeaconProvider')
 register_provider('mock', MockCurrencyProvider)
 
 # Provider Factory
 class ProviderFactory:
-    def __init__(self):
-        self.providers = self.load_providers()
+    # Provider instances are stateless apart from their pooled sessions, so one per process is reused
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, lane=INTERACTIVE, slots=None):
+        # Rate limiter lane: INTERACTIVE for request handling, BATCH for backfills and prefetching
+        self.lane = lane
+        # Backfills pass a dict here: {provider name: backfill concurrency slot held}. A slot is
+        # taken before a provider is first called, and providers whose slots are all busy are skipped.
+        self.slots = slots
+        with timed('factory'):
+            self.providers = self.load_providers()
 
     def load_providers(self):
-        provider_objects = Provider.objects.filter(is_active=True).order_by('priority')
         providers = []
 
-        for provider in provider_objects:
+        for name in provider_chain.get_names():
             try:
-                provider_class = get_provider(provider.name)
-                providers.append(provider_class())
+                providers.append((name, self.get_instance(name)))
             except ValueError as e:
                 print(f"Error: {e}")
 
         return providers
 
+    def available_providers(self):
+        """Yield (name, provider) in call order, skipping providers whose circuit breaker is open."""
+        providers = self.providers
+        if getattr(settings, 'EXCHANGE_PROVIDER_LATENCY_ORDERING', False):
+            instances = dict(providers)
+            providers = [(name, instances[name]) for name in order_by_latency(list(instances))]
+
+        for name, provider in providers:
+            if get_breaker(name).allow_request():
+                yield name, provider
+
+    def call_provider(self, name, provider, method, *args):
+        """
+        Call a provider method, recording its outcome and latency on the provider's circuit breaker.
+        Identical calls already in flight in this or another worker are joined instead of repeated.
+        """
+        key = singleflight.make_key(name, method, *args)
+        called = []
+
+        def call():
+            called.append(True)
+            return self._call_provider(name, provider, method, *args)
+
+        try:
+            return singleflight.do(key, call)
+        finally:
+            # Answered by another caller's flight: nothing was recorded, so give back a half-open probe
+            if not called:
+                get_breaker(name).release_probe()
+
+    def _call_provider(self, name, provider, method, *args):
+        started = time.monotonic()
+        if self.slots is not None and name not in self.slots:
+            slot = acquire_provider_slot(name)
+            if slot is None:
+                print(f"Backfill concurrency limit reached for provider '{name}'")
+                get_breaker(name).release_probe()
+                observe_provider_call(name, method, 'rate_limited', time.monotonic() - started)
+                return None
+            self.slots[name] = slot
+
+        if not rate_limiter.acquire(name, self.lane):
+            print(f"Rate limit reached for provider '{name}'")
+            # The provider wasn't called, so this tells nothing about its health
+            get_breaker(name).release_probe()
+            observe_provider_call(name, method, 'rate_limited', time.monotonic() - started)
+            return None
+
+        started = time.monotonic()
+        try:
+            result = getattr(provider, method)(*args)
+        except Exception as e:
+            print(f"Error calling provider '{name}': {e}")
+            result = None
+        latency = time.monotonic() - started
+        success = call_succeeded(result)
+        get_breaker(name).record(success, latency)
+        observe_provider_call(name, method, 'success' if success else 'failure', latency)
+        return result
+
+    @classmethod
+    def get_instance(cls, name):
+        instance = cls._instances.get(name)
+        if instance is None:
+            with cls._instances_lock:
+                instance = cls._instances.get(name)
+                if instance is None:
+                    instance = cls._instances[name] = get_provider(name)()
+        return instance
+
     def get_exchange_rate(self, source_currency: str, target_currency: str, valuation_date: date = None) -> Decimal:
-        for provider in self.providers:
-            rate = provider.get_exchange_rate(source_currency, target_currency, valuation_date)
-            if rate > 0:
+        if valuation_date is None:
+            hot_pairs.record(source_currency, target_currency)
+
+        cached_rate = rate_cache.get(source_currency, target_currency, valuation_date)
+        if cached_rate is not None:
+            return cached_rate
+        return self.fetch_exchange_rate(source_currency, target_currency, valuation_date)
+
+    def fetch_exchange_rate(self, source_currency: str, target_currency: str, valuation_date: date = None) -> Decimal:
+        """Ask the providers for a rate, bypassing the cache, and cache what they return."""
+        providers = self.available_providers()
+        if valuation_date is None and getattr(settings, 'EXCHANGE_HEDGING_ENABLED', False):
+            rate = self.get_hedged_rate(providers, source_currency, target_currency)
+            if rate:
+                rate_cache.set(source_currency, target_currency, rate)
+                return rate
+
+        for name, provider in providers:
+            rate = self.call_provider(name, provider, 'get_exchange_rate', source_currency, target_currency, valuation_date)
+            if rate and rate > 0:
+                rate_cache.set(source_currency, target_currency, rate, valuation_date)
                 return rate
         raise ValueError("No valid exchange rate found from available providers")
+
+    def get_hedged_rate(self, providers, source_currency: str, target_currency: str) -> Decimal:
+        """
+        Ask the first provider for the latest rate and, if it hasn't answered within the hedge
+        delay, the next one too. The first valid rate wins; the other call is cancelled if it
+        hasn't started, otherwise its result is discarded. Returns None if the calls fail,
+        leaving the remaining providers in `providers` to the caller.
+        """
+        primary = next(providers, None)
+        if primary is None:
+            return None
+
+        hedge_stats.increment('requests')
+        executor = get_executor()
+        # Each call runs in a copy of this context, so it is timed as part of the current request
+        # {future: (provider name, whether it is the hedge)}
+        futures = {
+            executor.submit(copy_context().run, self.call_provider, *primary, 'get_exchange_rate', source_currency, target_currency): (primary[0], False)
+        }
+        done, pending = wait(futures, timeout=get_hedge_delay(get_breaker(primary[0])))
+        if not done:
+            secondary = next(providers, None)
+            if secondary is not None:
+                hedge_stats.increment('hedges_fired')
+                futures[executor.submit(copy_context().run, self.call_provider, *secondary, 'get_exchange_rate', source_currency, target_currency)] = (secondary[0], True)
+                pending = set(futures)
+
+        while True:
+            for future in done:
+                rate = future.result()
+                if rate and rate > 0:
+                    for other in pending:
+                        # A call cancelled before it started may hold its provider's half-open probe
+                        if other.cancel():
+                            get_breaker(futures[other][0]).release_probe()
+                    hedge_stats.increment('hedge_wins' if futures[future][1] else 'primary_wins')
+                    return rate
+            if not pending:
+                return None
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+    def get_rate_matrix(self, symbols: list, base_currency: str = None, valuation_date: date = None, partial: bool = False) -> RateMatrix:
+        """
+        Return a RateMatrix covering symbols, built from one base-currency snapshot.
+        Cross rates between any of the symbols are derived from it without further provider calls.
+        With partial, the widest snapshot found is returned even if it misses some symbols
+        (check `code in matrix`); a ValueError is only raised when there is none at all.
+        """
+        base_currency = base_currency or getattr(settings, 'EXCHANGE_BASE_CURRENCY', 'USD')
+        found = None
+
+        cached_rates = rate_cache.get_snapshot(base_currency, valuation_date)
+        if cached_rates is not None:
+            matrix = RateMatrix(base_currency, cached_rates, valuation_date)
+            if matrix.covers(symbols):
+                return matrix
+            found = matrix
+
+        # Past days are immutable, so a stored daily snapshot answers them with one read
+        stored_rates = None
+        if valuation_date is not None:
+            stored_rates = get_stored_snapshot(base_currency, valuation_date)
+            if stored_rates is not None:
+                matrix = RateMatrix(base_currency, stored_rates, valuation_date)
+                if matrix.covers(symbols):
+                    rate_cache.set_snapshot(base_currency, stored_rates, valuation_date)
+                    return matrix
+                found = self.wider_matrix(found, matrix, symbols)
+
+        try:
+            return self.fetch_rate_matrix(symbols, base_currency, valuation_date, partial)
+        except ValueError:
+            if partial and found is not None:
+                return found
+            raise
+
+    @staticmethod
+    def wider_matrix(matrix, other, symbols):
+        """Whichever of two matrices (either may be None) covers more of symbols; the first on a tie."""
+        if other is None or (matrix is not None and sum(code in matrix for code in symbols) >= sum(code in other for code in symbols)):
+            return matrix
+        return other
+
+    def fetch_rate_matrix(self, symbols: list, base_currency: str, valuation_date: date = None, partial: bool = False) -> RateMatrix:
+        """
+        Ask the providers for a snapshot, bypassing the caches, and cache (and store, if historical) it.
+        With partial, the widest non-empty snapshot is used when no provider covers every symbol.
+        """
+        widest = None
+        for name, provider in self.available_providers():
+            rates = self.call_provider(name, provider, 'get_rate_snapshot', base_currency, symbols, valuation_date) or {}
+            matrix = RateMatrix(base_currency, rates, valuation_date)
+            if matrix.covers(symbols):
+                return self.keep_snapshot(matrix, rates)
+            if partial and rates:
+                widest = self.wider_matrix(widest, matrix, symbols)
+        if widest is not None:
+            return self.keep_snapshot(widest, {code: rate for code, rate in widest.rates.items() if code != base_currency})
+        raise ValueError("No valid rate snapshot found from available providers")
+
+    @staticmethod
+    def keep_snapshot(matrix, rates) -> RateMatrix:
+        if matrix.valuation_date is not None:
+            rates = store_snapshot(matrix.base_currency, matrix.valuation_date, rates)
+        rate_cache.set_snapshot(matrix.base_currency, rates, matrix.valuation_date)
+        return matrix
+
+    def get_timeseries(self, source_currency: str, target_currency: str, start_date: date, end_date: date) -> dict:
+        """Fetch {date: rate} for a range, asking lower-priority providers only for the dates still missing."""
+        rates = {}
+        missing_from, missing_to = start_date, end_date
+        for name, provider in self.available_providers():
+            fetched = self.call_provider(name, provider, 'get_timeseries', source_currency, target_currency, missing_from, missing_to) or {}
+            for valuation_date, rate in fetched.items():
+                if rate > 0 and start_date <= valuation_date <= end_date:
+                    rates.setdefault(valuation_date, rate)
+
+            missing = [
+                start_date + timedelta(days=offset)
+                for offset in range((end_date - start_date).days + 1)
+                if start_date + timedelta(days=offset) not in rates
+            ]
+            if not missing:
+                break
+            missing_from, missing_to = missing[0], missing[-1]
+        return rates
@@ -0,0 +1,127 @@
+import math
+import threading
+import time
+from datetime import date
+from django.conf import settings
+from django.core.cache import cache
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+
+class RateLimiter:
+    """
+    Token bucket and daily quota per provider, shared by every process through the Django cache.
+
+    Limits come from EXCHANGE_PROVIDER_RATE_LIMITS: {name: {"rate": tokens per second, "burst": bucket
+    size, "daily_quota": calls per day}}; providers without an entry are not limited.
+    Callers use one of two lanes. Interactive calls (views) may take any token and the whole daily quota.
+    Batch calls (backfills, prefetching) leave as many tokens in the bucket as interactive calls took recently, and stop
+    at EXCHANGE_RATE_LIMIT_BATCH_QUOTA_SHARE of the quota, so they back off as live traffic picks up.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.allowed = {INTERACTIVE: 0, BATCH: 0}
+        self.denied = {INTERACTIVE: 0, BATCH: 0}
+
+    def get_limits(self, name):
+        return getattr(settings, 'EXCHANGE_PROVIDER_RATE_LIMITS', {}).get(name)
+
+    @staticmethod
+    def quota_key(name, day=None):
+        return f"exchange:quota:{name}:{(day or date.today()).isoformat()}"
+
+    def acquire(self, name, lane=INTERACTIVE) -> bool:
+        """
+        Take a token for one call to the provider, waiting up to the lane's maximum wait for one.
+        Returns False if none became available in time or the lane's share of the daily quota is used up.
+        """
+        limits = self.get_limits(name)
+        if limits is None:
+            return True
+
+        max_wait = getattr(settings, 'EXCHANGE_RATE_LIMIT_BATCH_MAX_WAIT' if lane == BATCH else 'EXCHANGE_RATE_LIMIT_INTERACTIVE_MAX_WAIT', 0.5)
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self._try_acquire(name, lane, limits)
+            if wait == 0:
+                self._count(self.allowed, lane)
+                return True
+            if wait is None or time.monotonic() + wait > deadline:
+                self._count(self.denied, lane)
+                return False
+            time.sleep(wait)
+
+    def _try_acquire(self, name, lane, limits):
+        """0 when a token was taken, None when the quota is used up, otherwise seconds until one may be free."""
+        quota_key = self.quota_key(name)
+        daily_quota = limits.get('daily_quota')
+        if daily_quota is not None:
+            if lane == BATCH:
+                daily_quota *= getattr(settings, 'EXCHANGE_RATE_LIMIT_BATCH_QUOTA_SHARE', 0.8)
+            if cache.get(quota_key, 0) >= daily_quota:
+                return None
+
+        lock_key = f"exchange:ratelimit:{name}:lock"
+        if not cache.add(lock_key, 1, timeout=1):
+            # Another process is updating the bucket
+            return 0.005
+        try:
+            state = self._refill(name, limits, time.time())
+            # Batch calls leave room for the interactive calls expected in the near future
+            needed = 1 + (min(state["demand"], limits['burst'] - 1) if lane == BATCH else 0)
+            if state["tokens"] < needed:
+                cache.set(f"exchange:ratelimit:{name}", state, timeout=None)
+                return (needed - state["tokens"]) / limits['rate']
+
+            state["tokens"] -= 1
+            if lane == INTERACTIVE:
+                state["demand"] += 1
+            cache.set(f"exchange:ratelimit:{name}", state, timeout=None)
+        finally:
+            cache.delete(lock_key)
+
+        if daily_quota is not None:
+            cache.add(quota_key, 0, timeout=2 * 24 * 3600)
+            try:
+                cache.incr(quota_key)
+            except ValueError:
+                cache.set(quota_key, 1, timeout=2 * 24 * 3600)
+        return 0
+
+    def _refill(self, name, limits, now):
+        state = cache.get(f"exchange:ratelimit:{name}") or {"tokens": limits['burst'], "demand": 0.0, "updated_at": now}
+        elapsed = max(0.0, now - state["updated_at"])
+        window = getattr(settings, 'EXCHANGE_RATE_LIMIT_DEMAND_WINDOW', 60)
+        return {
+            "tokens": min(limits['burst'], state["tokens"] + elapsed * limits['rate']),
+            # Interactive demand decays exponentially over the demand window
+            "demand": state["demand"] * math.exp(-elapsed / window),
+            "updated_at": now,
+        }
+
+    def _count(self, counters, lane):
+        with self._lock:
+            counters[lane] += 1
+
+    def snapshot(self) -> dict:
+        """Tokens, recent interactive demand and remaining daily quota of every limited provider."""
+        providers = {}
+        for name, limits in getattr(settings, 'EXCHANGE_PROVIDER_RATE_LIMITS', {}).items():
+            state = self._refill(name, limits, time.time())
+            used = cache.get(self.quota_key(name), 0)
+            daily_quota = limits.get('daily_quota')
+            providers[name] = {
+                "tokens": round(state["tokens"], 2),
+                "interactive_demand": round(state["demand"], 2),
+                "quota_used": used,
+                "daily_quota": daily_quota,
+                "quota_remaining": max(0, daily_quota - used) if daily_quota is not None else None,
+            }
+        with self._lock:
+            return {"providers": providers, "allowed": dict(self.allowed), "denied": dict(self.denied)}
+
+rate_limiter = RateLimiter()
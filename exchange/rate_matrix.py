@@ -0,0 +1,31 @@
+from datetime import date
+from decimal import Decimal
+
+class RateMatrix:
+    """
+    Rates of many currencies against a single base currency, taken in one provider call.
+    Any cross rate is derived from it: A -> B = (base -> B) / (base -> A).
+    """
+
+    def __init__(self, base_currency: str, rates: dict, valuation_date: date = None):
+        self.base_currency = base_currency
+        self.valuation_date = valuation_date
+        self.rates = {code: Decimal(rate) for code, rate in rates.items()}
+        self.rates[base_currency] = Decimal(1)
+
+    def __contains__(self, currency_code):
+        return currency_code in self.rates
+
+    def covers(self, currency_codes) -> bool:
+        return all(code in self.rates for code in currency_codes)
+
+    def get_rate(self, source_currency: str, target_currency: str) -> Decimal:
+        if source_currency == target_currency:
+            return Decimal(1)
+        try:
+            return self.rates[target_currency] / self.rates[source_currency]
+        except KeyError as e:
+            raise ValueError(f"No rate for {e.args[0]} against {self.base_currency}")
+
+    def convert(self, amount: Decimal, source_currency: str, target_currency: str) -> Decimal:
+        return amount * self.get_rate(source_currency, target_currency)
@@ -0,0 +1,193 @@
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from .aggregates import update_aggregates
+from .models import Currency, CurrencyExchangeRate, DailyRateSnapshot
+from .money import quantize_rate
+
+
+def date_range(date_from, date_to):
+    """Yield every date from date_from to date_to (inclusive)."""
+    current_date = date_from
+    while current_date <= date_to:
+        yield current_date
+        current_date += timedelta(days=1)
+
+
+def chunked_ranges(date_from, date_to, chunk_days=None):
+    """Split date_from..date_to into consecutive (start, end) ranges of at most chunk_days days."""
+    chunk_days = chunk_days or getattr(settings, 'EXCHANGE_TIMESERIES_CHUNK_DAYS', 365)
+    chunk_start = date_from
+    while chunk_start <= date_to:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), date_to)
+        yield chunk_start, chunk_end
+        chunk_start = chunk_end + timedelta(days=1)
+
+
+def missing_ranges(stored_dates, date_from, date_to, chunk_days=None):
+    """
+    Chunked (start, end) ranges covering the dates from date_from to date_to that are not in stored_dates.
+    Used to resume backfills without refetching what is already stored.
+    """
+    run_start = None
+    for current_date in date_range(date_from, date_to):
+        if current_date in stored_dates:
+            if run_start is not None:
+                yield from chunked_ranges(run_start, current_date - timedelta(days=1), chunk_days)
+                run_start = None
+        elif run_start is None:
+            run_start = current_date
+    if run_start is not None:
+        yield from chunked_ranges(run_start, date_to, chunk_days)
+
+
+def get_stored_rates(source_currency, target_currency, date_from, date_to):
+    """Return {date: rate} for the rows already stored for a pair in one query."""
+    return dict(CurrencyExchangeRate.objects.for_pair(source_currency, target_currency).between(date_from, date_to).series())
+
+
+def store_rates(source_currency, target_currency, rates):
+    """
+    Upsert {date: rate} for a pair in a single bulk insert, and fold the rates into the pair's
+    weekly and monthly aggregates in the same transaction.
+    Currencies that are not in the Currency table can't be stored and are skipped.
+    """
+    if not rates:
+        return 0
+
+    currencies = {
+        currency.code: currency
+        for currency in Currency.objects.filter(code__in=[source_currency, target_currency])
+    }
+    if source_currency not in currencies or target_currency not in currencies:
+        return 0
+
+    with transaction.atomic():
+        previous = get_stored_rates(source_currency, target_currency, min(rates), max(rates))
+        CurrencyExchangeRate.objects.bulk_create(
+            [
+                CurrencyExchangeRate(
+                    source_currency=currencies[source_currency],
+                    exchanged_currency=currencies[target_currency],
+                    valuation_date=valuation_date,
+                    rate_value=rate,
+                )
+                for valuation_date, rate in rates.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['source_currency', 'exchanged_currency', 'valuation_date'],
+            update_fields=['rate_value', 'updated_at'],
+        )
+        update_aggregates(currencies[source_currency], currencies[target_currency], rates, previous)
+    return len(rates)
+
+
+def get_stored_snapshot(base_currency, valuation_date):
+    """Return the stored {code: rate} snapshot of a base currency on a day, or None."""
+    snapshot = DailyRateSnapshot.objects.for_base(base_currency).filter(valuation_date=valuation_date).first()
+    return snapshot.rates if snapshot else None
+
+
+def get_stored_snapshots(base_currency, date_from, date_to):
+    """Return {date: RateMatrix} for every stored snapshot of a base currency in a range, in one query."""
+    snapshots = DailyRateSnapshot.objects.for_base(base_currency).between(date_from, date_to)
+    return {snapshot.valuation_date: snapshot.to_matrix() for snapshot in snapshots}
+
+
+def store_snapshot(base_currency, valuation_date, rates):
+    """Upsert a base currency's snapshot for a day, keeping symbols stored earlier."""
+    stored_rates = get_stored_snapshot(base_currency, valuation_date) or {}
+    stored_rates.update({code: str(rate) for code, rate in rates.items()})
+    DailyRateSnapshot.objects.update_or_create(
+        base_currency=base_currency,
+        valuation_date=valuation_date,
+        defaults={'rates': stored_rates},
+    )
+    return stored_rates
+
+
+def derive_from_snapshots(source_currency, target_currency, dates):
+    """Derive {date: rate} for a pair from the stored snapshots covering the given dates."""
+    if not dates:
+        return {}
+    base_currency = getattr(settings, 'EXCHANGE_BASE_CURRENCY', 'USD')
+    rates = {}
+    for valuation_date, matrix in get_stored_snapshots(base_currency, min(dates), max(dates)).items():
+        if valuation_date in dates and matrix.covers([source_currency, target_currency]):
+            # At the stored precision, so this answer matches later reads of the stored row
+            rates[valuation_date] = quantize_rate(matrix.get_rate(source_currency, target_currency))
+    return rates
+
+
+def resolve_rates(provider, lookups):
+    """
+    Resolve many (source, target, date or None) lookups with as few provider calls as possible.
+
+    Lookups are grouped by date and each date is answered from one base-currency rate matrix;
+    only pairs with a code the matrix doesn't cover fall back to a single-pair lookup.
+    Returns {lookup: rate}, with a ValueError in place of the rate for lookups no provider could resolve.
+    """
+    lookups_by_date = {}
+    for lookup in set(lookups):
+        lookups_by_date.setdefault(lookup[2], []).append(lookup)
+
+    rates = {}
+    for valuation_date, date_lookups in lookups_by_date.items():
+        symbols = sorted({code for source_currency, target_currency, _ in date_lookups for code in (source_currency, target_currency)})
+        try:
+            # A snapshot missing a few codes still answers every pair it covers
+            matrix = provider.get_rate_matrix(symbols, valuation_date=valuation_date, partial=True)
+        except ValueError:
+            matrix = None
+
+        for lookup in date_lookups:
+            source_currency, target_currency, _ = lookup
+            try:
+                if matrix is not None and matrix.covers((source_currency, target_currency)):
+                    rates[lookup] = matrix.get_rate(source_currency, target_currency)
+                else:
+                    rates[lookup] = provider.get_exchange_rate(source_currency, target_currency, valuation_date)
+            except ValueError as e:
+                rates[lookup] = e
+    return rates
+
+
+def get_rate_series(provider, source_currency, target_currency, date_from, date_to):
+    """
+    Read-through lookup of daily rates for a date range.
+
+    Stored rows answer the range in one query and stored daily snapshots fill what
+    they can; only the remaining dates are fetched from the providers. Everything
+    not already stored as a pair row is written back together, so repeated range
+    queries are served from the database. Dates no provider could resolve are left out.
+    """
+    rates = get_stored_rates(source_currency, target_currency, date_from, date_to)
+
+    missing = [current_date for current_date in date_range(date_from, date_to) if current_date not in rates]
+    fetched = derive_from_snapshots(source_currency, target_currency, set(missing))
+    missing = [current_date for current_date in missing if current_date not in fetched]
+    if missing:
+        # One range fetch spanning the gaps instead of one provider call per day
+        timeseries = provider.get_timeseries(source_currency, target_currency, missing[0], missing[-1])
+        fetched.update({valuation_date: quantize_rate(rate) for valuation_date, rate in timeseries.items() if valuation_date not in rates})
+
+    store_rates(source_currency, target_currency, fetched)
+    rates.update(fetched)
+    return rates
+
+
+async def aget_rate_series(provider, source_currency, target_currency, date_from, date_to):
+    """Async counterpart of get_rate_series for an AsyncProviderFactory."""
+    rates = await sync_to_async(get_stored_rates)(source_currency, target_currency, date_from, date_to)
+
+    missing = [current_date for current_date in date_range(date_from, date_to) if current_date not in rates]
+    fetched = await sync_to_async(derive_from_snapshots)(source_currency, target_currency, set(missing))
+    missing = [current_date for current_date in missing if current_date not in fetched]
+    if missing:
+        timeseries = await provider.get_timeseries(source_currency, target_currency, missing[0], missing[-1])
+        fetched.update({valuation_date: quantize_rate(rate) for valuation_date, rate in timeseries.items() if valuation_date not in rates})
+
+    await sync_to_async(store_rates)(source_currency, target_currency, fetched)
+    rates.update(fetched)
+    return rates
@@ -0,0 +1,22 @@
+from decimal import Decimal
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+class DecimalJSONEncoder(JSONEncoder):
+    """DRF's encoder, but Decimals are written as their exact string instead of a float."""
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return str(obj)
+        return super().default(obj)
+
+class DecimalJSONRenderer(JSONRenderer):
+    encoder_class = DecimalJSONEncoder
+
+class FirstRendererNegotiation(DefaultContentNegotiation):
+    """
+    Always picks the view's first renderer. For views whose `format` query parameter is their
+    own (e.g. the rate export's ndjson/csv), which DRF would otherwise read as a renderer override.
+    """
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
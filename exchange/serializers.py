@@ -1,11 +1,44 @@
+from collections import Counter
+from decimal import Decimal
+from django.conf import settings
 from rest_framework import serializers
-from .models import Currency, CurrencyExchangeRate
+from .models import Currency, CurrencyExchangeRate, RateAggregate
 
 class CurrencySerializer(serializers.ModelSerializer):
     class Meta:
         model = Currency
         fields = ['code', 'name', 'symbol']
 
+class CurrencyListRequestSerializer(serializers.Serializer):
+    # Keyset pagination: the page starts after this code
+    after = serializers.CharField(required=False, max_length=3)
+    limit = serializers.IntegerField(required=False, min_value=1)
+
+    def validate_limit(self, value):
+        max_limit = getattr(settings, 'EXCHANGE_CURRENCY_PAGE_MAX_SIZE', 1000)
+        if value > max_limit:
+            raise serializers.ValidationError(f"A page can hold at most {max_limit} currencies.")
+        return value
+
+class CurrencyUpsertSerializer(serializers.Serializer):
+    # No unique check on code: an existing currency is updated
+    code = serializers.RegexField(r'^[A-Z]{3}$', error_messages={'invalid': "Use a three letter upper case ISO 4217 code."})
+    name = serializers.CharField(max_length=64)
+    symbol = serializers.CharField(max_length=10)
+
+class BulkCurrencyRequestSerializer(serializers.Serializer):
+    currencies = CurrencyUpsertSerializer(many=True, allow_empty=False)
+
+    def validate_currencies(self, value):
+        max_items = getattr(settings, 'EXCHANGE_CURRENCY_BULK_MAX_ITEMS', 1000)
+        if len(value) > max_items:
+            raise serializers.ValidationError(f"A request can hold at most {max_items} currencies.")
+        counts = Counter(currency['code'] for currency in value)
+        duplicates = sorted(code for code, count in counts.items() if count > 1)
+        if duplicates:
+            raise serializers.ValidationError(f"Duplicate codes: {', '.join(duplicates)}.")
+        return value
+
 class CurrencyExchangeRateSerializer(serializers.ModelSerializer):
     source_currency = serializers.CharField(source='source_currency.code')
     exchanged_currency = serializers.CharField(source='exchanged_currency.code')
@@ -19,6 +52,8 @@ class CurrencyRateRequestSerializer(serializers.Serializer):
     target_currency = serializers.CharField(required=True, max_length=3)
     date_from = serializers.DateField(required=False)
     date_to = serializers.DateField(required=False)
+    # 'week' and 'month' return one OHLC/mean point per period instead of one rate per day
+    resolution = serializers.ChoiceField(choices=['day', RateAggregate.WEEK, RateAggregate.MONTH], default='day')
 
     def validate(self, data):
         #source and target currencies should't be same
@@ -29,15 +64,88 @@ class CurrencyRateRequestSerializer(serializers.Serializer):
         date_to = data.get("date_to")
         if date_from and date_to and date_from > date_to:
             raise serializers.ValidationError("'date_from' must be before 'date_to'.")
+        if data['resolution'] != 'day' and not (date_from and date_to):
+            raise serializers.ValidationError("A resolution needs 'date_from' and 'date_to'.")
         
         return data
 
 class CurrencyConvertRequestSerializer(serializers.Serializer):
     source_currency = serializers.CharField(required=True, max_length=3)
     target_currency = serializers.CharField(required=True, max_length=3)
-    amount = serializers.FloatField(required=True, min_value=0.01)
+    amount = serializers.DecimalField(required=True, max_digits=24, decimal_places=6, min_value=Decimal("0.01"))
 
     def validate(self, data):
         if data['source_currency'] == data['target_currency']:
             raise serializers.ValidationError("Source and target currencies must be different.")
         return data
+
+class RateExportRequestSerializer(serializers.Serializer):
+    FORMAT_CHOICES = ['ndjson', 'csv']
+
+    pairs = serializers.CharField(required=True, help_text="Comma-separated SOURCE:TARGET pairs, e.g. USD:EUR,USD:GBP")
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    format = serializers.ChoiceField(choices=FORMAT_CHOICES, default='ndjson')
+
+    def validate_pairs(self, value):
+        pairs = []
+        for pair in value.split(','):
+            source_currency, _, target_currency = pair.strip().upper().partition(':')
+            if len(source_currency) != 3 or len(target_currency) != 3:
+                raise serializers.ValidationError(f"'{pair}' is not a SOURCE:TARGET pair of currency codes.")
+            pairs.append((source_currency, target_currency))
+        return pairs
+
+    def validate(self, data):
+        date_from = data.get("date_from")
+        date_to = data.get("date_to")
+        if date_from and date_to and date_from > date_to:
+            raise serializers.ValidationError("'date_from' must be before 'date_to'.")
+        return data
+
+class RateAnalyticsRequestSerializer(serializers.Serializer):
+    source_currency = serializers.CharField(required=True, max_length=3)
+    target_currency = serializers.CharField(required=True, max_length=3)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    windows = serializers.CharField(required=False, help_text="Comma-separated window lengths in days, e.g. 7,30,90")
+
+    def validate_windows(self, value):
+        try:
+            windows = sorted({int(window) for window in value.split(',') if window.strip()})
+        except ValueError:
+            raise serializers.ValidationError("Windows must be comma-separated whole numbers of days.")
+        if any(window < 2 for window in windows):
+            raise serializers.ValidationError("Windows must be at least 2 days long.")
+        return windows
+
+    def validate(self, data):
+        if data['source_currency'] == data['target_currency']:
+            raise serializers.ValidationError("Source and target currencies must be different.")
+
+        date_from = data.get("date_from")
+        date_to = data.get("date_to")
+        if date_from and date_to and date_from > date_to:
+            raise serializers.ValidationError("'date_from' must be before 'date_to'.")
+        return data
+
+class ConversionItemSerializer(serializers.Serializer):
+    source_currency = serializers.CharField(required=True, max_length=3)
+    target_currency = serializers.CharField(required=True, max_length=3)
+    amount = serializers.DecimalField(required=True, max_digits=24, decimal_places=6, min_value=Decimal("0.01"))
+    valuation_date = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if data['source_currency'] == data['target_currency']:
+            raise serializers.ValidationError("Source and target currencies must be different.")
+        return data
+
+class BatchConversionRequestSerializer(serializers.Serializer):
+    # Items are validated one by one in the view so a bad item only fails itself
+    items = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+    def validate_items(self, value):
+        max_items = getattr(settings, 'EXCHANGE_BATCH_MAX_ITEMS', 10000)
+        if len(value) > max_items:
+            raise serializers.ValidationError(f"A batch can hold at most {max_items} items.")
+        return value
@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .aggregates import recompute_periods
+from .catalogue import invalidate_catalogue
+from .metrics import time_query
+from .models import Currency, CurrencyExchangeRate, Provider
+from .provider_chain import provider_chain
+
+@receiver([post_save, post_delete], sender=Provider)
+def invalidate_provider_chain(sender, **kwargs):
+    """
+    Rebuild the cached provider chain in every process after a Provider change, now and again
+    once the surrounding transaction commits, so no process keeps a chain reloaded before then.
+    """
+    provider_chain.invalidate()
+    transaction.on_commit(provider_chain.invalidate)
+
+@receiver([post_save, post_delete], sender=Currency)
+def reload_currency_catalogue(sender, **kwargs):
+    """Reload the currency catalogue in every process after a Currency change."""
+    invalidate_catalogue()
+
+@receiver(pre_save, sender=CurrencyExchangeRate)
+def remember_stored_rate_key(sender, instance, **kwargs):
+    """Note the pair and date a daily rate had before an edit, so its old periods are recomputed too."""
+    instance._stored_key = None
+    if instance.pk:
+        instance._stored_key = sender.objects.filter(pk=instance.pk) \
+            .values_list('source_currency_id', 'exchanged_currency_id', 'valuation_date').first()
+
+@receiver([post_save, post_delete], sender=CurrencyExchangeRate)
+def recompute_rate_aggregates(sender, instance, **kwargs):
+    """
+    Recompute the aggregates of a daily rate saved or deleted directly, e.g. in the admin.
+    store_rates() writes with bulk_create, which sends no signals, and updates them itself.
+    """
+    keys = {(instance.source_currency_id, instance.exchanged_currency_id, instance.valuation_date)}
+    if getattr(instance, '_stored_key', None):
+        keys.add(instance._stored_key)
+    for source_currency_id, exchanged_currency_id, day in keys:
+        recompute_periods(source_currency_id, exchanged_currency_id, day)
+
+@receiver(connection_created)
+def time_database_queries(sender, connection, **kwargs):
+    """Time every query on new database connections for the request metrics."""
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
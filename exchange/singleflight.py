@@ -0,0 +1,107 @@
+import hashlib
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Collapses identical in-flight calls into one.
+
+    Within a process, callers asking for a key that is already being fetched wait for that
+    fetch and share its result. Across processes, the fetching process holds a lock in the
+    Django cache and publishes the result there, so other workers poll for it instead of
+    calling upstream themselves.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.leader_calls = 0
+        self.shared_in_process = 0
+        self.shared_across_processes = 0
+
+    def _increment(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    def do(self, key: str, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            self._increment('shared_in_process')
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_shared(key, fn)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def _do_shared(self, key, fn):
+        lock_key = f"exchange:singleflight:lock:{key}"
+        result_key = f"exchange:singleflight:result:{key}"
+
+        if cache.add(lock_key, 1, timeout=getattr(settings, 'EXCHANGE_SINGLEFLIGHT_LOCK_TIMEOUT', 15)):
+            try:
+                # Never hand waiters a result left over from an earlier flight
+                cache.delete(result_key)
+                self._increment('leader_calls')
+                result = fn()
+                if result is not None:
+                    cache.set(result_key, result, timeout=getattr(settings, 'EXCHANGE_SINGLEFLIGHT_RESULT_TTL', 5))
+                return result
+            finally:
+                cache.delete(lock_key)
+
+        # Another worker is fetching the same key: wait for its result
+        deadline = time.monotonic() + getattr(settings, 'EXCHANGE_SINGLEFLIGHT_WAIT_TIMEOUT', 15)
+        poll_interval = getattr(settings, 'EXCHANGE_SINGLEFLIGHT_POLL_INTERVAL', 0.05)
+        while time.monotonic() < deadline:
+            time.sleep(poll_interval)
+            result = cache.get(result_key)
+            if result is not None:
+                self._increment('shared_across_processes')
+                return result
+            if cache.get(lock_key) is None:
+                break
+
+        # The other worker gave up without a result, or took too long
+        self._increment('leader_calls')
+        return fn()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "leader_calls": self.leader_calls,
+                "shared_in_process": self.shared_in_process,
+                "shared_across_processes": self.shared_across_processes,
+            }
+
+singleflight = SingleFlight()
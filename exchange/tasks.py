@@ -1,42 +1,161 @@
-from celery import shared_task
+import time
+import uuid
+from celery import chord, shared_task
+from django.conf import settings
+from .backfill import acquire_provider_slot, finish_progress, record_chunk, release_provider_slot, start_progress
+from .cache import rate_cache
+from .hot_pairs import hot_pairs
 from .providers import ProviderFactory
+from .rate_limiter import BATCH
 from .models import Currency, CurrencyExchangeRate
-from datetime import datetime, timedelta
+from .rates import chunked_ranges, missing_ranges, store_rates
+from datetime import date, datetime
 
 @shared_task
 def load_historical_data(source_currency_code, target_currency_code, start_date, end_date):
     try:
-        # Fetch the Currency objects based on the provided codes
-        source_currency = Currency.objects.get(code=source_currency_code)
-        target_currency = Currency.objects.get(code=target_currency_code)
+        # Make sure both currencies exist before fetching anything
+        Currency.objects.get(code=source_currency_code)
+        Currency.objects.get(code=target_currency_code)
     except Currency.DoesNotExist as e:
         print(f"Currency not found: {e}")
         return
-    
-    provider = ProviderFactory()
-    current_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+
+    provider = ProviderFactory(lane=BATCH)
+    start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
     end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
 
-    while current_date <= end_date:
+    for chunk_start, chunk_end in chunked_ranges(start_date, end_date):
         try:
-            # Fetch rate for each date
-            rate = provider.get_exchange_rate(source_currency.code, target_currency.code, current_date)
-            
-            # Save rate to DB using the actual Currency IDs
-            if rate > 0:
-                CurrencyExchangeRate.objects.update_or_create(
-                    source_currency=source_currency,
-                    exchanged_currency=target_currency,
-                    valuation_date=current_date,
-                    defaults={'rate_value': rate}
-                )
-                print(f"Successfully stored rate for {current_date}: {rate}")
-            else:
-                print(f"No rate found for {current_date}. Skipping...")
+            # One timeseries call and one bulk upsert per chunk
+            rates = provider.get_timeseries(source_currency_code, target_currency_code, chunk_start, chunk_end)
+            stored = store_rates(source_currency_code, target_currency_code, rates)
+            print(f"Successfully stored {stored} rates from {chunk_start} to {chunk_end}")
         except Exception as e:
-            print(f"Failed to load rate for {current_date}: {e}")
+            print(f"Failed to load rates from {chunk_start} to {chunk_end}: {e}")
 
-        # Move to the next day
-        current_date += timedelta(days=1)
-    
     print(f"Historical data loaded from {start_date} to {end_date} for {source_currency_code} to {target_currency_code}")
+
+@shared_task
+def backfill_rates(pairs, start_date, end_date, backfill_id=None):
+    """
+    Backfill many pairs in parallel: every pair's missing dates are split into chunks and
+    loaded by one load_rate_chunk subtask each, fanned out over all workers with a chord.
+    Dates already stored are skipped, so rerunning an interrupted backfill resumes it.
+    Returns the backfill id used to look up its progress.
+    """
+    backfill_id = backfill_id or uuid.uuid4().hex
+    date_from = datetime.strptime(start_date, "%Y-%m-%d").date()
+    date_to = datetime.strptime(end_date, "%Y-%m-%d").date()
+    known_codes = set(Currency.objects.values_list('code', flat=True))
+
+    subtasks = []
+    skipped_days = 0
+    for source_currency_code, target_currency_code in pairs:
+        if source_currency_code not in known_codes or target_currency_code not in known_codes:
+            print(f"Currency not found, skipping {source_currency_code} to {target_currency_code}")
+            continue
+
+        stored_dates = set(
+            CurrencyExchangeRate.objects.for_pair(source_currency_code, target_currency_code)
+            .between(date_from, date_to).values_list('valuation_date', flat=True)
+        )
+        skipped_days += len(stored_dates)
+        for chunk_start, chunk_end in missing_ranges(stored_dates, date_from, date_to):
+            subtasks.append(load_rate_chunk.si(
+                backfill_id, source_currency_code, target_currency_code, chunk_start.isoformat(), chunk_end.isoformat()
+            ))
+
+    start_progress(backfill_id, pairs, date_from, date_to, len(subtasks), skipped_days)
+    print(f"Backfill {backfill_id}: {len(subtasks)} chunks queued, {skipped_days} stored days skipped")
+
+    if subtasks:
+        chord(subtasks)(finish_backfill.si(backfill_id))
+    else:
+        finish_progress(backfill_id)
+    return backfill_id
+
+@shared_task(bind=True, max_retries=None)
+def load_rate_chunk(self, backfill_id, source_currency_code, target_currency_code, start_date, end_date):
+    """
+    Fetch and store one chunk of a backfill, holding a concurrency slot of every provider it calls.
+    The primary provider's slot is taken up front; fallback providers' slots as they are reached.
+    """
+    slots = {}
+    provider = ProviderFactory(lane=BATCH, slots=slots)
+    if provider.providers:
+        name = provider.providers[0][0]
+        slot = acquire_provider_slot(name)
+        if slot is None:
+            # The provider is at its concurrency cap: try again shortly instead of blocking a worker
+            raise self.retry(countdown=getattr(settings, 'EXCHANGE_BACKFILL_RETRY_DELAY', 5))
+        slots[name] = slot
+
+    chunk_start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    chunk_end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    try:
+        rates = provider.get_timeseries(source_currency_code, target_currency_code, chunk_start, chunk_end)
+        if not rates:
+            # Every provider failed or was rate limited; a rerun of the backfill picks the chunk up again
+            raise ValueError("no rates returned")
+        stored = store_rates(source_currency_code, target_currency_code, rates)
+        record_chunk(backfill_id, stored=stored)
+        print(f"Successfully stored {stored} {source_currency_code} to {target_currency_code} rates from {start_date} to {end_date}")
+        return stored
+    except Exception as e:
+        record_chunk(backfill_id, failed=True)
+        print(f"Failed to load {source_currency_code} to {target_currency_code} rates from {start_date} to {end_date}: {e}")
+        return 0
+    finally:
+        for slot in slots.values():
+            release_provider_slot(slot)
+
+@shared_task
+def finish_backfill(backfill_id):
+    finish_progress(backfill_id)
+    print(f"Backfill {backfill_id} finished")
+
+@shared_task
+def refresh_hot_rates():
+    """
+    Run by celery beat: refetch the latest rate of the EXCHANGE_PREFETCH_TOP_N most requested pairs
+    whose cached rate expires within EXCHANGE_PREFETCH_MARGIN seconds, so requests keep hitting the cache.
+    With EXCHANGE_PREFETCH_SNAPSHOTS, all of them come from a single base-currency snapshot.
+    Refreshed rates are also stored as today's rows.
+    """
+    refresh_before = time.time() - (rate_cache.latest_ttl - getattr(settings, 'EXCHANGE_PREFETCH_MARGIN', 20))
+    stale_pairs = []
+    for source_currency_code, target_currency_code in hot_pairs.top(getattr(settings, 'EXCHANGE_PREFETCH_TOP_N', 50)):
+        entry = rate_cache.get_entry(source_currency_code, target_currency_code)
+        if entry is None or entry[1] <= refresh_before:
+            stale_pairs.append((source_currency_code, target_currency_code))
+    hot_pairs.decay()
+
+    if not stale_pairs:
+        return 0
+
+    # Background work: spend batch tokens, leaving interactive ones to user requests
+    provider = ProviderFactory(lane=BATCH)
+    rates = {}
+    if getattr(settings, 'EXCHANGE_PREFETCH_SNAPSHOTS', False):
+        symbols = sorted({code for pair in stale_pairs for code in pair})
+        try:
+            matrix = provider.fetch_rate_matrix(symbols, getattr(settings, 'EXCHANGE_BASE_CURRENCY', 'USD'))
+            for pair in stale_pairs:
+                rates[pair] = matrix.get_rate(*pair)
+                rate_cache.set(*pair, rates[pair])
+        except ValueError as e:
+            print(f"Failed to prefetch a rate snapshot: {e}")
+    else:
+        for pair in stale_pairs:
+            try:
+                rates[pair] = provider.fetch_exchange_rate(*pair)
+            except ValueError as e:
+                print(f"Failed to prefetch {pair[0]} to {pair[1]}: {e}")
+
+    today = date.today()
+    for (source_currency_code, target_currency_code), rate in rates.items():
+        store_rates(source_currency_code, target_currency_code, {today: rate})
+
+    print(f"Prefetched {len(rates)} of {len(stale_pairs)} hot pairs")
+    return len(rates)
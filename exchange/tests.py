@@ -1,11 +1,62 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.test import AsyncClient, TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
-from .models import Currency
+from .async_providers import AsyncMockCurrencyProvider, AsyncProviderFactory, close_async_providers
+from .benchmarks.stub_provider import StubCurrencyBeacon
+from .aggregates import rebuild_aggregates
+from .cache import rate_cache
+from .catalogue import catalogue
+from .circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, get_breaker, reset_breakers
+from mycurrency.celery import app as celery_app
+from . import money
+from .hedging import hedge_stats
+from .models import Currency, CurrencyExchangeRate, DailyRateSnapshot, Provider, RateAggregate
+from .provider_chain import PROVIDER_CHAIN_VERSION_KEY, ProviderChain, provider_chain
+from .provider_registry import get_async_provider, get_provider, provider_registry, register_provider
+from .currencybeacon import CurrencyBeaconProvider
+from .providers import MockCurrencyProvider, ProviderFactory
+from .rate_limiter import BATCH, INTERACTIVE, RateLimiter
+from .rate_matrix import RateMatrix
+from .rates import chunked_ranges, missing_ranges, store_rates
+from .singleflight import singleflight
+from .backfill import acquire_provider_slot, get_progress, release_provider_slot
+from .hot_pairs import hot_pairs
+from .metrics import Histogram, provider_call_seconds, request_seconds, reset_metrics
+from .tasks import backfill_rates, load_historical_data, refresh_hot_rates
+
+def use_stub_currencybeacon(test_case, **options):
+    """Serve CurrencyBeaconProvider from a local stub for the rest of the test; no request reaches the real API."""
+    stub = StubCurrencyBeacon(**options).start()
+    test_case.addCleanup(stub.stop)
+    api_url = override_settings(CURRENCY_BEACON_API_URL=stub.url)
+    api_url.enable()
+    test_case.addCleanup(api_url.disable)
+    CurrencyBeaconProvider.close_session()
+    test_case.addCleanup(CurrencyBeaconProvider.close_session)
+    return stub
 
 class CurrencyTests(TestCase):
     def setUp(self):
+        cache.clear()
+        rate_cache.clear()
+        reset_breakers()
+        provider_chain.invalidate()
+        self.stub = use_stub_currencybeacon(self)
+        Provider.objects.create(name='currencybeacon', is_active=True, priority=1)
         self.client = APIClient()
         self.currency_data = {
             "code": "USD",
@@ -48,3 +99,1142 @@ class CurrencyTests(TestCase):
     def test_currency_conversion(self):
         response = self.client.get(reverse('currency-convert') + '?source_currency=USD&target_currency=EUR&amount=100')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+class CurrencyRateRangeTests(TestCase):
+    def setUp(self):
+        reset_breakers()
+        provider_chain.invalidate()
+        self.client = APIClient()
+        self.usd = Currency.objects.create(code="USD", name="US Dollar", symbol="$")
+        self.eur = Currency.objects.create(code="EUR", name="Euro", symbol="€")
+        self.url = reverse('currency-rates') + '?source_currency=USD&target_currency=EUR&date_from=2023-10-01&date_to=2023-10-03'
+
+    def test_range_served_from_stored_rates(self):
+        for day in (1, 2, 3):
+            CurrencyExchangeRate.objects.create(
+                source_currency=self.usd, exchanged_currency=self.eur,
+                valuation_date=date(2023, 10, day), rate_value=Decimal("0.9") + Decimal(day) / 100
+            )
+        # No provider is configured, so every rate has to come from the table
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([rate["rate"] for rate in response.data["rates"]], [0.91, 0.92, 0.93])
+
+    def test_missing_dates_are_fetched_and_stored(self):
+        Provider.objects.create(name='mock', is_active=True, priority=1)
+        CurrencyExchangeRate.objects.create(
+            source_currency=self.usd, exchanged_currency=self.eur,
+            valuation_date=date(2023, 10, 2), rate_value=Decimal("0.92")
+        )
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data["rates"][1]["rate"], 0.92)
+        self.assertEqual(CurrencyExchangeRate.objects.count(), 3)
+
+        # The random mock rates were written back, so a repeat is read from the table
+        second = self.client.get(self.url)
+        self.assertEqual(CurrencyExchangeRate.objects.count(), 3)
+        stored = CurrencyExchangeRate.objects.get(valuation_date=date(2023, 10, 1)).rate_value
+        self.assertEqual(second.data["rates"][0]["rate"], float(stored))
+
+class HistoricalLoaderTests(TestCase):
+    def setUp(self):
+        reset_breakers()
+        Currency.objects.create(code="USD", name="US Dollar", symbol="$")
+        Currency.objects.create(code="EUR", name="Euro", symbol="€")
+        Provider.objects.create(name='mock', is_active=True, priority=1)
+
+    def test_chunked_ranges_cover_range(self):
+        chunks = list(chunked_ranges(date(2023, 1, 1), date(2023, 1, 10), chunk_days=4))
+        self.assertEqual(chunks, [
+            (date(2023, 1, 1), date(2023, 1, 4)),
+            (date(2023, 1, 5), date(2023, 1, 8)),
+            (date(2023, 1, 9), date(2023, 1, 10)),
+        ])
+
+    def test_reloading_range_upserts_rates(self):
+        load_historical_data('USD', 'EUR', '2023-10-01', '2023-10-10')
+        self.assertEqual(CurrencyExchangeRate.objects.count(), 10)
+        load_historical_data('USD', 'EUR', '2023-10-01', '2023-10-10')
+        self.assertEqual(CurrencyExchangeRate.objects.count(), 10)
+
+class RateCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_cache.clear()
+        reset_breakers()
+        Provider.objects.create(name='mock', is_active=True, priority=1)
+
+    def test_repeated_lookup_is_served_from_cache(self):
+        with mock.patch.object(MockCurrencyProvider, 'get_exchange_rate', return_value=Decimal("0.9")) as upstream:
+            self.assertEqual(ProviderFactory().get_exchange_rate('USD', 'EUR'), Decimal("0.9"))
+            self.assertEqual(ProviderFactory().get_exchange_rate('USD', 'EUR'), Decimal("0.9"))
+        self.assertEqual(upstream.call_count, 1)
+        self.assertEqual(rate_cache.stats()["local_hits"], 1)
+
+    def test_shared_tier_refills_local_tier(self):
+        rate_cache.set('USD', 'EUR', Decimal("0.9"), date(2023, 10, 1))
+        rate_cache.clear()
+        self.assertEqual(rate_cache.get('USD', 'EUR', date(2023, 10, 1)), Decimal("0.9"))
+        self.assertEqual(rate_cache.get('USD', 'EUR', date(2023, 10, 1)), Decimal("0.9"))
+        self.assertEqual(rate_cache.stats()["shared_hits"], 1)
+        self.assertEqual(rate_cache.stats()["local_hits"], 1)
+
+    @override_settings(EXCHANGE_LOCAL_CACHE_MAX_ENTRIES=2)
+    def test_local_tier_evicts_least_recently_used(self):
+        rate_cache.set('USD', 'EUR', Decimal("0.9"), date(2023, 10, 1))
+        rate_cache.set('USD', 'EUR', Decimal("0.8"), date(2023, 10, 2))
+        rate_cache.get('USD', 'EUR', date(2023, 10, 1))
+        rate_cache.set('USD', 'EUR', Decimal("0.7"), date(2023, 10, 3))
+        self.assertEqual(rate_cache.stats()["local_entries"], 2)
+        self.assertNotIn(rate_cache.make_key('USD', 'EUR', date(2023, 10, 2)), rate_cache._entries)
+
+    def test_stats_endpoint(self):
+        response = APIClient().get(reverse('exchange-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("hit_ratio", response.data["rate_cache"])
+
+@override_settings(EXCHANGE_HTTP_BACKOFF_FACTOR=0, EXCHANGE_HTTP_READ_TIMEOUT=0.5)
+class CurrencyBeaconSessionTests(TestCase):
+    def setUp(self):
+        self.stub = use_stub_currencybeacon(self, rates={'EUR': 0.91})
+
+    def test_session_is_shared_between_instances(self):
+        self.assertIs(CurrencyBeaconProvider.get_session(), CurrencyBeaconProvider.get_session())
+        self.assertEqual(CurrencyBeaconProvider().get_latest_rate('USD', 'EUR'), Decimal("0.91"))
+
+    def test_server_errors_are_retried(self):
+        self.stub.fail_next(503, 429)
+        self.assertEqual(CurrencyBeaconProvider().get_latest_rate('USD', 'EUR'), Decimal("0.91"))
+        self.assertEqual(self.stub.requests["latest"], 3)
+
+    @override_settings(EXCHANGE_HTTP_MAX_RETRIES=0)
+    def test_slow_upstream_is_bounded_by_read_timeout(self):
+        self.stub.latency = 2
+        started = time.monotonic()
+        self.assertEqual(CurrencyBeaconProvider().get_latest_rate('USD', 'EUR'), Decimal("0.0"))
+        self.assertLess(time.monotonic() - started, 1.5)
+
+    def test_stub_serves_consistent_timeseries(self):
+        rates = CurrencyBeaconProvider().get_timeseries('GBP', 'JPY', date(2023, 10, 1), date(2023, 10, 3))
+        self.assertEqual(list(rates), [date(2023, 10, 1), date(2023, 10, 2), date(2023, 10, 3)])
+        self.assertEqual(rates[date(2023, 10, 2)], CurrencyBeaconProvider().get_historical_rate('GBP', 'JPY', date(2023, 10, 2)))
+
+class RateMatrixTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_cache.clear()
+        reset_breakers()
+        Provider.objects.create(name='mock', is_active=True, priority=1)
+
+    def test_cross_rates_are_derived_from_base(self):
+        matrix = RateMatrix('USD', {'EUR': Decimal("0.5"), 'GBP': Decimal("0.25")})
+        self.assertEqual(matrix.get_rate('EUR', 'GBP'), Decimal("0.5"))
+        self.assertEqual(matrix.get_rate('GBP', 'USD'), Decimal("4"))
+        self.assertEqual(matrix.convert(Decimal("10"), 'EUR', 'USD'), Decimal("20"))
+        with self.assertRaises(ValueError):
+            matrix.get_rate('USD', 'JPY')
+
+    def test_many_targets_cost_one_snapshot(self):
+        snapshot = {'EUR': Decimal("0.5"), 'GBP': Decimal("0.25"), 'JPY': Decimal("150")}
+        with mock.patch.object(MockCurrencyProvider, 'get_rate_snapshot', return_value=snapshot) as upstream:
+            matrix = ProviderFactory().get_rate_matrix(['EUR', 'GBP', 'JPY'])
+            self.assertEqual(matrix.get_rate('EUR', 'JPY'), Decimal("300"))
+            ProviderFactory().get_rate_matrix(['GBP', 'JPY'])
+        self.assertEqual(upstream.call_count, 1)
+
+    def test_admin_converter_uses_one_snapshot(self):
+        usd = Currency.objects.create(code="USD", name="US Dollar", symbol="$")
+        eur = Currency.objects.create(code="EUR", name="Euro", symbol="€")
+        gbp = Currency.objects.create(code="GBP", name="Pound", symbol="£")
+        snapshot = {'EUR': Decimal("0.5"), 'GBP': Decimal("0.25")}
+        with mock.patch.object(MockCurrencyProvider, 'get_rate_snapshot', return_value=snapshot) as upstream:
+            response = self.client.post(reverse('currency_converter'), {
+                "source_currency": usd.pk, "amount": "10", "target_currencies": [eur.pk, gbp.pk]
+            })
+        self.assertEqual(upstream.call_count, 1)
+        results = {result["target"]: result["converted_amount"] for result in response.context["conversion_results"]}
+        self.assertEqual(results, {"EUR": Decimal("5.0"), "GBP": Decimal("2.50")})
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_cache.clear()
+        reset_breakers()
+        Currency.objects.create(code="USD", name="US Dollar", symbol="$")
+        Currency.objects.create(code="EUR", name="Euro", symbol="€")
+        Provider.objects.create(name='mock', is_active=True, priority=1)
+
+    async def test_range_days_are_fetched_concurrently(self):
+        async def slow_rate(self, source_currency, target_currency, valuation_date=None):
+            await asyncio.sleep(0.1)
+            return Decimal("0.9")
+
+        with mock.patch.object(AsyncMockCurrencyProvider, 'get_exchange_rate', slow_rate):
+            started = time.monotonic()
+            response = await AsyncClient().get(
+                reverse('currency-rates-async') + '?source_currency=USD&target_currency=EUR&date_from=2023-10-01&date_to=2023-10-10'
+            )
+            elapsed = time.monotonic() - started
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["rates"]), 10)
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual(await CurrencyExchangeRate.objects.acount(), 10)
+
+    async def test_provider_clients_are_reused_across_requests(self):
+        async with AsyncProviderFactory() as first:
+            pass
+        async with AsyncProviderFactory() as second:
+            pass
+        self.assertIs(first.providers[0][1], second.providers[0][1])
+
+        with mock.patch.object(AsyncMockCurrencyProvider, 'aclose') as aclose:
+            await close_async_providers()
+        aclose.assert_awaited_once()
+        async with AsyncProviderFactory() as third:
+            self.assertIsNot(third.providers[0][1], first.providers[0][1])
+
+    async def test_async_conversion(self):
+        with mock.patch.object(AsyncMockCurrencyProvider, 'get_exchange_rate', return_value=Decimal("0.5")):
+            response = await AsyncClient().get(reverse('currency-convert-async') + '?source_currency=USD&target_currency=EUR&amount=100')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["converted_amount"], "50.00")
+
+class ProviderChainTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_breakers()
+        self.provider = Provider.objects.create(name='mock', is_active=True, priority=1)
+
+    def test_chain_is_not_reloaded_per_request(self):
+        ProviderFactory()
+        with self.assertNumQueries(0):
+            providers = ProviderFactory().providers
+        self.assertEqual(providers[0][0], 'mock')
+        self.assertIsInstance(providers[0][1], MockCurrencyProvider)
+        self.assertIs(providers[0][1], ProviderFactory().providers[0][1])
+
+    def test_provider_changes_rebuild_chain(self):
+        self.assertEqual(len(ProviderFactory().providers), 1)
+        self.provider.is_active = False
+        self.provider.save()
+        self.assertEqual(ProviderFactory().providers, [])
+
+    def test_chain_reloaded_before_commit_is_dropped_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.provider.is_active = False
+            self.provider.save()
+            # Stands in for another process reloading before the change is visible to it
+            provider_chain._names = ['mock']
+        self.assertEqual(ProviderFactory().providers, [])
+
+    @override_settings(EXCHANGE_PROVIDER_CHAIN_CHECK_INTERVAL=0)
+    def test_version_bump_from_another_process_is_picked_up(self):
+        other_process_chain = ProviderChain()
+        self.assertEqual(other_process_chain.get_names(), ['mock'])
+        # Change the row without signals, then bump the shared version as another worker would
+        Provider.objects.filter(pk=self.provider.pk).update(is_active=False)
+        self.assertEqual(other_process_chain.get_names(), ['mock'])
+        cache.incr(PROVIDER_CHAIN_VERSION_KEY)
+        self.assertEqual(other_process_chain.get_names(), [])
+
+@override_settings(EXCHANGE_BREAKER_MIN_CALLS=3, EXCHANGE_BREAKER_ERROR_RATE=0.5)
+class CircuitBreakerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_cache.clear()
+        reset_breakers()
+
+    def test_breaker_opens_and_recovers_through_probe(self):
+        breaker = CircuitBreaker('currencybeacon')
+        for _ in range(3):
+            breaker.record(False, 0.1)
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.allow_request())
+
+        with override_settings(EXCHANGE_BREAKER_RESET_TIMEOUT=0):
+            self.assertTrue(breaker.allow_request())
+            self.assertEqual(breaker.state, HALF_OPEN)
+            # Only one probe at a time while half-open
+            self.assertFalse(breaker.allow_request())
+            breaker.record(True, 0.1)
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_empty_answers_are_not_failures(self):
+        Provider.objects.create(name='mock', is_active=True, priority=1)
+        with mock.patch.object(MockCurrencyProvider, 'get_timeseries', return_value={}):
+            for day in range(1, 6):
+                ProviderFactory().call_provider('mock', MockCurrencyProvider(), 'get_timeseries', 'USD', 'EUR', date(2023, 10, day), date(2023, 10, day))
+        self.assertEqual(get_breaker('mock').state, CLOSED)
+
+        # Failures still count: 6 of the 11 calls in the window
+        with mock.patch.object(MockCurrencyProvider, 'get_timeseries', return_value=None):
+            for day in range(1, 7):
+                ProviderFactory().call_provider('mock', MockCurrencyProvider(), 'get_timeseries', 'USD', 'EUR', date(2023, 10, day), date(2023, 10, day))
+        self.assertEqual(get_breaker('mock').state, OPEN)
+
+    def test_open_provider_is_skipped(self):
+        Provider.objects.create(name='currencybeacon', is_active=True, priority=1)
+        Provider.objects.create(name='mock', is_active=True, priority=2)
+        with mock.patch.object(CurrencyBeaconProvider, 'get_exchange_rate', return_value=Decimal("0.0")) as failing, \
+                mock.patch.object(MockCurrencyProvider, 'get_exchange_rate', return_value=Decimal("0.9")):
+            for day in range(1, 6):
+                self.assertEqual(ProviderFactory().get_exchange_rate('USD', 'EUR', date(2023, 10, day)), Decimal("0.9"))
+        self.assertEqual(failing.call_count, 3)
+        self.assertEqual(get_breaker('currencybeacon').state, OPEN)
+        self.assertEqual(
+            APIClient().get(reverse('exchange-stats')).data["circuit_breakers"]["currencybeacon"]["state"], OPEN
+        )
+
+    @override_settings(EXCHANGE_PROVIDER_LATENCY_ORDERING=True)
+    def test_latency_ordering(self):
+        Provider.objects.create(name='currencybeacon', is_active=True, priority=1)
+        Provider.objects.create(name='mock', is_active=True, priority=2)
+        for _ in range(2):
+            get_breaker('currencybeacon').record(True, 2.0)
+            get_breaker('mock').record(True, 0.1)
+        names = [name for name, _ in ProviderFactory().available_providers()]
+        self.assertEqual(names, ['mock', 'currencybeacon'])
+
+@override_settings(EXCHANGE_HEDGING_ENABLED=True, EXCHANGE_HEDGE_DELAY_MS=50)
+class HedgedRequestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_cache.clear()
+        reset_breakers()
+        hedge_stats.reset()
+        Provider.objects.create(name='currencybeacon', is_active=True, priority=1)
+        Provider.objects.create(name='mock', is_active=True, priority=2)
+
+    def test_slow_primary_is_hedged(self):
+        def slow_rate(source_currency, target_currency, valuation_date=None):
+            time.sleep(0.5)
+            return Decimal("0.8")
+
+        with mock.patch.object(CurrencyBeaconProvider, 'get_exchange_rate', side_effect=slow_rate), \
+                mock.patch.object(MockCurrencyProvider, 'get_exchange_rate', return_value=Decimal("0.9")):
+            started = time.monotonic()
+            # A pair of its own, so the abandoned slow call can't be joined by later tests via singleflight
+            rate = ProviderFactory().get_exchange_rate('USD', 'CHF')
+            elapsed = time.monotonic() - started
+
+        self.assertEqual(rate, Decimal("0.9"))
+        self.assertLess(elapsed, 0.4)
+        self.assertEqual(hedge_stats.stats()["hedges_fired"], 1)
+        self.assertEqual(hedge_stats.stats()["hedge_wins"], 1)
+
+    def test_fast_primary_is_not_hedged(self):
+        with mock.patch.object(CurrencyBeaconProvider, 'get_exchange_rate', return_value=Decimal("0.8")), \
+                mock.patch.object(MockCurrencyProvider, 'get_exchange_rate', return_value=Decimal("0.9")) as secondary:
+            self.assertEqual(ProviderFactory().get_exchange_rate('USD', 'EUR'), Decimal("0.8"))
+        secondary.assert_not_called()
+        self.assertEqual(hedge_stats.stats()["primary_wins"], 1)
+
+    def test_failed_primary_falls_back_to_chain(self):
+        with mock.patch.object(CurrencyBeaconProvider, 'get_exchange_rate', return_value=Decimal("0.0")), \
+                mock.patch.object(MockCurrencyProvider, 'get_exchange_rate', return_value=Decimal("0.9")):
+            self.assertEqual(ProviderFactory().get_exchange_rate('USD', 'EUR'), Decimal("0.9"))
+        self.assertEqual(hedge_stats.stats()["hedges_fired"], 0)
+
+    def test_cancelled_hedge_releases_half_open_probe(self):
+        def slow_rate(source_currency, target_currency, valuation_date=None):
+            time.sleep(0.2)
+            return Decimal("0.8")
+
+        pool = ThreadPoolExecutor(max_workers=1)
+        submitted = []
+        def submit(fn, *args):
+            submitted.append(fn)
+            # Only the primary starts; the hedge stays queued, as behind a busy pool
+            return pool.submit(fn, *args) if len(submitted) == 1 else Future()
+
+        breaker = get_breaker('mock')
+        breaker.state, breaker.opened_at = OPEN, time.monotonic() - 60
+        # The assertions below take the half-open probe of this process-wide breaker
+        self.addCleanup(reset_breakers)
+        with mock.patch('exchange.providers.get_executor', return_value=mock.Mock(submit=submit)), \
+                mock.patch.object(CurrencyBeaconProvider, 'get_exchange_rate', side_effect=slow_rate):
+            self.assertEqual(ProviderFactory().get_exchange_rate('USD', 'JPY'), Decimal("0.8"))
+        pool.shutdown()
+        self.assertEqual(hedge_stats.stats()["hedges_fired"], 1)
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertTrue(breaker.allow_request())
+
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_cache.clear()
+        reset_breakers()
+        singleflight.reset_stats()
+        Provider.objects.create(name='mock', is_active=True, priority=1)
+        # Resolve the chain up front so the worker threads below don't touch the database
+        ProviderFactory()
+
+    def test_concurrent_identical_lookups_share_one_call(self):
+        def slow_rate(source_currency, target_currency, valuation_date=None):
+            time.sleep(0.2)
+            return Decimal("0.9")
+
+        results = []
+        with mock.patch.object(MockCurrencyProvider, 'get_exchange_rate', side_effect=slow_rate) as upstream:
+            threads = [
+                threading.Thread(target=lambda: results.append(ProviderFactory().get_exchange_rate('USD', 'EUR')))
+                for _ in range(10)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(results, [Decimal("0.9")] * 10)
+        self.assertEqual(upstream.call_count, 1)
+
+    def test_result_of_another_worker_is_shared(self):
+        key = singleflight.make_key('mock', 'get_exchange_rate', 'USD', 'EUR', None)
+        # Another worker holds the lock and publishes its result shortly after
+        cache.add(f"exchange:singleflight:lock:{key}", 1)
+        threading.Timer(0.1, lambda: cache.set(f"exchange:singleflight:result:{key}", Decimal("0.7"))).start()
+
+        with mock.patch.object(MockCurrencyProvider, 'get_exchange_rate', return_value=Decimal("0.9")) as upstream:
+            self.assertEqual(ProviderFactory().get_exchange_rate('USD', 'EUR'), Decimal("0.7"))
+        upstream.assert_not_called()
+        self.assertEqual(singleflight.stats()["shared_across_processes"], 1)
+
+    def test_shared_result_releases_half_open_probe(self):
+        key = singleflight.make_key('mock', 'get_exchange_rate', 'USD', 'EUR', None)
+        cache.add(f"exchange:singleflight:lock:{key}", 1)
+        cache.set(f"exchange:singleflight:result:{key}", Decimal("0.7"))
+        breaker = get_breaker('mock')
+        breaker.state, breaker.opened_at = OPEN, time.monotonic() - 60
+        # The assertions below take the half-open probe of this process-wide breaker
+        self.addCleanup(reset_breakers)
+
+        self.assertEqual(ProviderFactory().get_exchange_rate('USD', 'EUR'), Decimal("0.7"))
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertTrue(breaker.allow_request())
+
+class CurrencyExchangeRateLookupTests(TestCase):
+    def setUp(self):
+        self.usd = Currency.objects.create(code="USD", name="US Dollar", symbol="$")
+        self.eur = Currency.objects.create(code="EUR", name="Euro", symbol="€")
+        for day in (3, 1, 2):
+            CurrencyExchangeRate.objects.create(
+                source_currency=self.usd, exchanged_currency=self.eur,
+                valuation_date=date(2023, 10, day), rate_value=Decimal(day)
+            )
+            CurrencyExchangeRate.objects.create(
+                source_currency=self.eur, exchanged_currency=self.usd,
+                valuation_date=date(2023, 10, day), rate_value=Decimal(-day)
+            )
+
+    def test_series_for_pair_and_range(self):
+        series = list(CurrencyExchangeRate.objects.for_pair('USD', 'EUR').between(date(2023, 10, 2), date(2023, 10, 3)).series())
+        self.assertEqual(series, [(date(2023, 10, 2), Decimal(2)), (date(2023, 10, 3), Decimal(3))])
+
+    def test_one_rate_per_pair_and_date(self):
+        with self.assertRaises(IntegrityError):
+            CurrencyExchangeRate.objects.create(
+                source_currency=self.usd, exchanged_currency=self.eur,
+                valuation_date=date(2023, 10, 1), rate_value=Decimal(1)
+            )
+
+class DailyRateSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_cache.clear()
+        reset_breakers()
+        provider_chain.invalidate()
+
+    def test_historical_matrix_is_stored_and_reused(self):
+        Provider.objects.create(name='mock', is_active=True, priority=1)
+        snapshot = {'EUR': Decimal("0.5"), 'GBP': Decimal("0.25")}
+        with mock.patch.object(MockCurrencyProvider, 'get_rate_snapshot', return_value=snapshot) as upstream:
+            ProviderFactory().get_rate_matrix(['EUR', 'GBP'], valuation_date=date(2023, 10, 1))
+            cache.clear()
+            rate_cache.clear()
+            with self.assertNumQueries(1):
+                matrix = ProviderFactory().get_rate_matrix(['EUR', 'GBP'], valuation_date=date(2023, 10, 1))
+        self.assertEqual(upstream.call_count, 1)
+        self.assertEqual(matrix.get_rate('GBP', 'EUR'), Decimal("2"))
+        self.assertEqual(DailyRateSnapshot.objects.get().rates, {'EUR': "0.5", 'GBP': "0.25"})
+
+    def test_range_is_derived_from_snapshots(self):
+        Currency.objects.create(code="EUR", name="Euro", symbol="€")
+        Currency.objects.create(code="GBP", name="Pound", symbol="£")
+        for day in (1, 2):
+            DailyRateSnapshot.objects.create(
+                base_currency='USD', valuation_date=date(2023, 10, day), rates={'EUR': "0.5", 'GBP': str(day)}
+            )
+        # No provider is configured, so the cross rates can only come from the snapshots
+        response = APIClient().get(
+            reverse('currency-rates') + '?source_currency=EUR&target_currency=GBP&date_from=2023-10-01&date_to=2023-10-02'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([rate["rate"] for rate in response.data["rates"]], [2.0, 4.0])
+        self.assertEqual(CurrencyExchangeRate.objects.count(), 2)
+
+    def test_derived_rates_match_the_stored_rows(self):
+        Currency.objects.create(code="EUR", name="Euro", symbol="€")
+        Currency.objects.create(code="GBP", name="Pound", symbol="£")
+        DailyRateSnapshot.objects.create(base_currency='USD', valuation_date=date(2023, 10, 1), rates={'EUR': "0.3", 'GBP': "1"})
+        url = reverse('currency-rates') + '?source_currency=EUR&target_currency=GBP&date_from=2023-10-01&date_to=2023-10-01'
+        derived = APIClient().get(url).data["rates"]
+        self.assertEqual(derived, APIClient().get(url).data["rates"])
+        self.assertEqual(CurrencyExchangeRate.objects.get().rate_value, Decimal("3.333333"))
+
+class RateExportTests(TestCase):
+    def setUp(self):
+        usd = Currency.objects.create(code="USD", name="US Dollar", symbol="$")
+        eur = Currency.objects.create(code="EUR", name="Euro", symbol="€")
+        gbp = Currency.objects.create(code="GBP", name="Pound", symbol="£")
+        for day in (1, 2, 3):
+            for target, rate in ((eur, "0.9"), (gbp, "0.8")):
+                CurrencyExchangeRate.objects.create(
+                    source_currency=usd, exchanged_currency=target,
+                    valuation_date=date(2023, 10, day), rate_value=Decimal(rate)
+                )
+
+    def test_ndjson_export(self):
+        response = self.client.get(reverse('currency-rates-export') + '?pairs=USD:EUR,usd:gbp&date_from=2023-10-02')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[0], {
+            "source_currency": "USD", "exchanged_currency": "EUR", "valuation_date": "2023-10-02", "rate_value": "0.900000"
+        })
+        self.assertEqual(lines[-1]["exchanged_currency"], "GBP")
+
+    def test_csv_export(self):
+        response = self.client.get(reverse('currency-rates-export') + '?pairs=USD:EUR&format=csv')
+        rows = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(rows[0], "source_currency,exchanged_currency,valuation_date,rate_value")
+        self.assertEqual(rows[1:], [f"USD,EUR,2023-10-0{day},0.900000" for day in (1, 2, 3)])
+
+    def test_invalid_pairs(self):
+        response = self.client.get(reverse('currency-rates-export') + '?pairs=USDEUR&format=csv')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("pairs", response.json())
+
+class BatchConversionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_cache.clear()
+        reset_breakers()
+        Provider.objects.create(name='mock', is_active=True, priority=1)
+
+    def test_batch_resolves_each_date_once(self):
+        snapshot = {'EUR': Decimal("0.5"), 'GBP': Decimal("0.25")}
+        items = [
+            {"source_currency": "USD", "target_currency": "EUR", "amount": "10"},
+            {"source_currency": "EUR", "target_currency": "GBP", "amount": "3.33"},
+            {"source_currency": "USD", "target_currency": "USD", "amount": "1"},
+            {"source_currency": "GBP", "target_currency": "USD", "amount": "1", "valuation_date": "2023-10-01"},
+            {"source_currency": "USD", "target_currency": "EUR", "amount": "20"},
+        ]
+        with mock.patch.object(MockCurrencyProvider, 'get_rate_snapshot', return_value=snapshot) as upstream:
+            response = APIClient().post(reverse('currency-convert-batch'), {"items": items}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(upstream.call_count, 2)
+        results = response.data["results"]
+        converted = [result.get("converted_amount") for result in results]
+        self.assertEqual(converted, [Decimal("5.00"), Decimal("1.66"), None, Decimal("4.00"), Decimal("10.00")])
+        self.assertEqual(response.json()["results"][0]["converted_amount"], "5.00")
+        self.assertIn("non_field_errors", results[2]["error"])
+
+    def test_unresolvable_pair_is_an_item_error(self):
+        with mock.patch.object(MockCurrencyProvider, 'get_exchange_rate', return_value=Decimal("0.0")):
+            response = APIClient().post(reverse('currency-convert-batch'), {"items": [
+                {"source_currency": "USD", "target_currency": "XXX", "amount": "10"},
+            ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("error", response.data["results"][0])
+
+    def test_invalid_amount_is_an_item_error(self):
+        with mock.patch.object(MockCurrencyProvider, 'get_rate_snapshot', return_value={'EUR': Decimal("0.5")}):
+            response = APIClient().post(reverse('currency-convert-batch'), {"items": [
+                {"source_currency": "USD", "target_currency": "EUR", "amount": "abc"},
+                {"source_currency": "USD", "target_currency": "EUR", "amount": "10"},
+            ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertIn("amount", results[0]["error"])
+        self.assertEqual(results[1]["converted_amount"], Decimal("5.00"))
+
+    def test_uncovered_code_only_costs_its_own_lookup(self):
+        snapshot = {'EUR': Decimal("0.5"), 'GBP': Decimal("0.25")}
+        with mock.patch.object(MockCurrencyProvider, 'get_rate_snapshot', return_value=snapshot) as upstream, \
+                mock.patch.object(MockCurrencyProvider, 'get_exchange_rate', return_value=Decimal("0.0")) as single:
+            response = APIClient().post(reverse('currency-convert-batch'), {"items": [
+                {"source_currency": "USD", "target_currency": "EUR", "amount": "10"},
+                {"source_currency": "EUR", "target_currency": "GBP", "amount": "10"},
+                {"source_currency": "USD", "target_currency": "XXX", "amount": "10"},
+            ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual([result.get("converted_amount") for result in results[:2]], [Decimal("5.00"), Decimal("5.00")])
+        self.assertIn("error", results[2])
+        upstream.assert_called_once()
+        self.assertEqual([call.args[:2] for call in single.call_args_list], [('USD', 'XXX')])
+
+    def test_empty_batch_is_rejected(self):
+        response = APIClient().post(reverse('currency-convert-batch'), {"items": []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class RateAnalyticsTests(TestCase):
+    def setUp(self):
+        usd = Currency.objects.create(code="USD", name="US Dollar", symbol="$")
+        eur = Currency.objects.create(code="EUR", name="Euro", symbol="€")
+        self.rates = ["1.0", "1.1", "1.0", "1.2", "1.5"]
+        for day, rate in enumerate(self.rates, start=1):
+            CurrencyExchangeRate.objects.create(
+                source_currency=usd, exchanged_currency=eur,
+                valuation_date=date(2023, 10, day), rate_value=Decimal(rate)
+            )
+
+    def test_statistics_use_one_query(self):
+        with self.assertNumQueries(1):
+            response = APIClient().get(reverse('currency-rates-analytics'), {
+                "source_currency": "USD", "target_currency": "EUR", "windows": "2,3,10"
+            })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
+        self.assertEqual(data["count"], 5)
+        self.assertEqual((data["min"], data["max"]), (1.0, 1.5))
+        self.assertAlmostEqual(data["mean"], 1.16)
+        self.assertAlmostEqual(data["change"], 0.5)
+        self.assertAlmostEqual(data["windows"]["3"]["moving_average"], (1.0 + 1.2 + 1.5) / 3)
+        self.assertIsNone(data["windows"]["10"]["moving_average"])
+        self.assertGreater(data["annualized_volatility"], data["volatility"])
+
+    def test_date_filters_and_missing_series(self):
+        response = APIClient().get(reverse('currency-rates-analytics'), {
+            "source_currency": "USD", "target_currency": "EUR", "date_from": "2023-10-04"
+        })
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(response.data["date_from"], "2023-10-04")
+
+        response = APIClient().get(reverse('currency-rates-analytics'), {"source_currency": "EUR", "target_currency": "USD"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class DecimalConversionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_cache.clear()
+        reset_breakers()
+        provider_chain.invalidate()
+        Provider.objects.create(name='mock', is_active=True, priority=1)
+
+    def test_conversion_is_exact_and_rendered_as_strings(self):
+        with mock.patch.object(MockCurrencyProvider, 'get_exchange_rate', return_value=Decimal("0.1")):
+            response = APIClient().get(reverse('currency-convert'), {
+                "source_currency": "USD", "target_currency": "EUR", "amount": "0.3"
+            })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {
+            "source_currency": "USD", "target_currency": "EUR", "amount": "0.30", "converted_amount": "0.03", "rate": "0.1"
+        })
+
+    def test_converted_amount_is_the_echoed_amount(self):
+        with mock.patch.object(MockCurrencyProvider, 'get_exchange_rate', return_value=Decimal("2")):
+            response = APIClient().get(reverse('currency-convert'), {
+                "source_currency": "JPY", "target_currency": "EUR", "amount": "100.5"
+            })
+        # 100.5 JPY is 100 yen (no minor units, half-even), and 100 yen is what gets converted
+        self.assertEqual((response.json()["amount"], response.json()["converted_amount"]), ("100", "200.00"))
+
+    @override_settings(EXCHANGE_CURRENCY_MINOR_UNITS={'EUR': 4})
+    def test_minor_units(self):
+        self.assertEqual(money.convert(Decimal("1000"), Decimal("0.123456"), "JPY"), Decimal("123"))
+        self.assertEqual(money.convert(Decimal("10.005"), Decimal("1"), "KWD"), Decimal("10.005"))
+        self.assertEqual(money.convert(Decimal("0.125"), Decimal("1"), "USD"), Decimal("0.12"))
+        self.assertEqual(money.convert(Decimal("1"), Decimal("0.123456"), "EUR"), Decimal("0.1235"))
+
+class BackfillTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_breakers()
+        provider_chain.invalidate()
+        usd = Currency.objects.create(code="USD", name="US Dollar", symbol="$")
+        eur = Currency.objects.create(code="EUR", name="Euro", symbol="€")
+        Currency.objects.create(code="GBP", name="Pound", symbol="£")
+        Provider.objects.create(name='mock', is_active=True, priority=1)
+        CurrencyExchangeRate.objects.create(
+            source_currency=usd, exchanged_currency=eur, valuation_date=date(2023, 10, 5), rate_value=Decimal("0.9")
+        )
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', False)
+
+    def test_missing_ranges_skip_stored_dates(self):
+        stored = {date(2023, 10, 3), date(2023, 10, 4), date(2023, 10, 8)}
+        self.assertEqual(list(missing_ranges(stored, date(2023, 10, 1), date(2023, 10, 10), chunk_days=3)), [
+            (date(2023, 10, 1), date(2023, 10, 2)),
+            (date(2023, 10, 5), date(2023, 10, 7)),
+            (date(2023, 10, 9), date(2023, 10, 10)),
+        ])
+
+    @override_settings(EXCHANGE_TIMESERIES_CHUNK_DAYS=3)
+    def test_backfill_fans_out_and_resumes(self):
+        with mock.patch.object(MockCurrencyProvider, 'get_timeseries', wraps=MockCurrencyProvider().get_timeseries) as upstream:
+            backfill_id = backfill_rates([["USD", "EUR"], ["USD", "GBP"], ["USD", "XXX"]], '2023-10-01', '2023-10-10')
+
+        # USD:EUR skips the stored 5th: 1-4 and 6-10 in chunks of 3 days; USD:GBP is 4 chunks
+        self.assertEqual(upstream.call_count, 8)
+        self.assertEqual(CurrencyExchangeRate.objects.count(), 20)
+        progress = get_progress(backfill_id)
+        self.assertEqual(progress["status"], "finished")
+        self.assertEqual((progress["total_chunks"], progress["done_chunks"], progress["failed_chunks"]), (8, 8, 0))
+        self.assertEqual((progress["skipped_days"], progress["stored_rates"]), (1, 19))
+        response = APIClient().get(reverse('backfill-progress', args=[backfill_id]))
+        self.assertEqual(response.data["percent"], 100.0)
+
+        # Everything is stored now, so running it again fetches nothing
+        with mock.patch.object(MockCurrencyProvider, 'get_timeseries') as upstream:
+            backfill_id = backfill_rates([["USD", "EUR"], ["USD", "GBP"]], '2023-10-01', '2023-10-10')
+        upstream.assert_not_called()
+        self.assertEqual(get_progress(backfill_id)["total_chunks"], 0)
+
+    @override_settings(EXCHANGE_BACKFILL_PROVIDER_CONCURRENCY={'mock': 2})
+    def test_provider_slots_are_capped(self):
+        slots = [acquire_provider_slot('mock'), acquire_provider_slot('mock')]
+        self.assertIsNone(acquire_provider_slot('mock'))
+        release_provider_slot(slots[0])
+        self.assertIsNotNone(acquire_provider_slot('mock'))
+
+    @override_settings(EXCHANGE_BACKFILL_PROVIDER_CONCURRENCY={'mock': 1})
+    def test_fallback_provider_slots_are_capped(self):
+        Provider.objects.create(name='currencybeacon', is_active=True, priority=0)
+        held = acquire_provider_slot('mock')
+        with mock.patch.object(CurrencyBeaconProvider, 'get_timeseries', return_value=None), \
+                mock.patch.object(MockCurrencyProvider, 'get_timeseries', return_value={date(2023, 10, 1): Decimal("0.8")}) as fallback:
+            backfill_rates([["USD", "GBP"]], '2023-10-01', '2023-10-01')
+            fallback.assert_not_called()
+
+            release_provider_slot(held)
+            backfill_id = backfill_rates([["USD", "GBP"]], '2023-10-01', '2023-10-01')
+            fallback.assert_called_once()
+        self.assertEqual(get_progress(backfill_id)["stored_rates"], 1)
+        # Both providers' slots were given back
+        self.assertIsNotNone(acquire_provider_slot('mock'))
+        self.assertIsNotNone(acquire_provider_slot('currencybeacon'))
+
+class HotRatePrefetchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_cache.clear()
+        reset_breakers()
+        provider_chain.invalidate()
+        hot_pairs.reset()
+        for code in ("USD", "EUR", "GBP", "JPY"):
+            Currency.objects.create(code=code, name=code, symbol=code)
+        Provider.objects.create(name='mock', is_active=True, priority=1)
+
+    def request_pairs(self):
+        with mock.patch.object(MockCurrencyProvider, 'get_exchange_rate', return_value=Decimal("0.9")):
+            for pair, hits in ((('USD', 'EUR'), 3), (('USD', 'GBP'), 2), (('EUR', 'JPY'), 1)):
+                for _ in range(hits):
+                    ProviderFactory().get_exchange_rate(*pair)
+
+    def test_requests_are_ranked(self):
+        self.request_pairs()
+        self.assertEqual(hot_pairs.top(2), [('USD', 'EUR'), ('USD', 'GBP')])
+        hot_pairs.decay()
+        self.assertEqual(hot_pairs.top(5), [('USD', 'EUR'), ('USD', 'GBP')])
+
+    @override_settings(EXCHANGE_PREFETCH_TOP_N=2)
+    def test_refresh_only_touches_hot_pairs_near_expiry(self):
+        self.request_pairs()
+        # Freshly cached rates are left alone
+        with mock.patch.object(MockCurrencyProvider, 'get_exchange_rate', return_value=Decimal("0.8")) as upstream:
+            self.assertEqual(refresh_hot_rates(), 0)
+        upstream.assert_not_called()
+
+        # 45s later the 60s rates are within the 20s margin
+        with mock.patch('exchange.tasks.time.time', return_value=time.time() + 45):
+            with mock.patch.object(MockCurrencyProvider, 'get_exchange_rate', return_value=Decimal("0.8")) as upstream:
+                self.assertEqual(refresh_hot_rates(), 2)
+            self.assertEqual(upstream.call_count, 2)
+        self.assertEqual(rate_cache.get('USD', 'GBP'), Decimal("0.8"))
+        self.assertEqual(CurrencyExchangeRate.objects.filter(valuation_date=date.today()).count(), 2)
+
+    @override_settings(EXCHANGE_PREFETCH_SNAPSHOTS=True)
+    def test_refresh_with_one_snapshot(self):
+        self.request_pairs()
+        snapshot = {'EUR': Decimal("0.5"), 'GBP': Decimal("0.25"), 'JPY': Decimal("150")}
+        with mock.patch('exchange.tasks.time.time', return_value=time.time() + 45), \
+                mock.patch.object(MockCurrencyProvider, 'get_rate_snapshot', return_value=snapshot) as upstream, \
+                mock.patch('exchange.providers.rate_limiter.acquire', return_value=True) as acquire:
+            self.assertEqual(refresh_hot_rates(), 3)
+        upstream.assert_called_once()
+        acquire.assert_called_once_with('mock', BATCH)
+        self.assertEqual(rate_cache.get('EUR', 'JPY'), Decimal("300"))
+
+@override_settings(
+    EXCHANGE_PROVIDER_RATE_LIMITS={'mock': {'rate': 1, 'burst': 4, 'daily_quota': 10}},
+    EXCHANGE_RATE_LIMIT_INTERACTIVE_MAX_WAIT=0,
+    EXCHANGE_RATE_LIMIT_BATCH_MAX_WAIT=0,
+)
+class RateLimiterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_cache.clear()
+        self.limiter = RateLimiter()
+
+    def test_bucket_refills_over_time(self):
+        now = time.time()
+        with mock.patch('exchange.rate_limiter.time.time', return_value=now):
+            self.assertEqual([self.limiter.acquire('mock', BATCH) for _ in range(5)], [True] * 4 + [False])
+        with mock.patch('exchange.rate_limiter.time.time', return_value=now + 2):
+            self.assertEqual([self.limiter.acquire('mock', BATCH) for _ in range(3)], [True, True, False])
+        self.assertTrue(self.limiter.acquire('unlimited', BATCH))
+
+    def test_batch_yields_to_interactive_demand(self):
+        now = time.time()
+        with mock.patch('exchange.rate_limiter.time.time', return_value=now):
+            self.assertTrue(self.limiter.acquire('mock', INTERACTIVE))
+            self.assertTrue(self.limiter.acquire('mock', INTERACTIVE))
+            # Two tokens left, but the two recent interactive calls keep batch work from taking them
+            self.assertFalse(self.limiter.acquire('mock', BATCH))
+            self.assertTrue(self.limiter.acquire('mock', INTERACTIVE))
+
+    def test_daily_quota(self):
+        cache.set(RateLimiter.quota_key('mock'), 8)
+        self.assertFalse(self.limiter.acquire('mock', BATCH))
+        self.assertTrue(self.limiter.acquire('mock', INTERACTIVE))
+        self.assertTrue(self.limiter.acquire('mock', INTERACTIVE))
+        self.assertFalse(self.limiter.acquire('mock', INTERACTIVE))
+
+        snapshot = self.limiter.snapshot()
+        self.assertEqual(snapshot["providers"]["mock"]["quota_remaining"], 0)
+        self.assertEqual(snapshot["denied"], {INTERACTIVE: 1, BATCH: 1})
+
+    def test_rate_limited_provider_is_skipped(self):
+        reset_breakers()
+        provider_chain.invalidate()
+        Provider.objects.create(name='mock', is_active=True, priority=1)
+        cache.set(RateLimiter.quota_key('mock'), 10)
+        with mock.patch.object(MockCurrencyProvider, 'get_exchange_rate') as upstream:
+            with self.assertRaises(ValueError):
+                ProviderFactory().get_exchange_rate('USD', 'EUR')
+        upstream.assert_not_called()
+
+    def test_rate_limited_probe_is_released(self):
+        reset_breakers()
+        breaker = get_breaker('mock')
+        breaker.state, breaker.opened_at = OPEN, time.monotonic() - 60
+        # The assertions below take the half-open probe of this process-wide breaker
+        self.addCleanup(reset_breakers)
+        cache.set(RateLimiter.quota_key('mock'), 10)
+        # Take the half-open probe, as available_providers() would
+        self.assertTrue(breaker.allow_request())
+        self.assertIsNone(ProviderFactory().call_provider('mock', MockCurrencyProvider(), 'get_exchange_rate', 'USD', 'EUR'))
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertTrue(breaker.allow_request())
+
+    async def test_async_rate_limited_probe_is_released(self):
+        reset_breakers()
+        breaker = get_breaker('mock')
+        breaker.state, breaker.opened_at = OPEN, time.monotonic() - 60
+        # The assertions below take the half-open probe of this process-wide breaker
+        self.addCleanup(reset_breakers)
+        await sync_to_async(cache.set)(RateLimiter.quota_key('mock'), 10)
+        # Take the half-open probe, as available_providers() would
+        self.assertTrue(breaker.allow_request())
+        self.assertIsNone(await AsyncProviderFactory().call_provider('mock', AsyncMockCurrencyProvider(), 'get_exchange_rate', 'USD', 'EUR'))
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertTrue(breaker.allow_request())
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_cache.clear()
+        reset_breakers()
+        provider_chain.invalidate()
+        reset_metrics()
+        Provider.objects.create(name='mock', is_active=True, priority=1)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('test_seconds', "Test.", ('kind',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, kind='a')
+        self.assertEqual(histogram.render()[2:], [
+            'test_seconds_bucket{kind="a",le="0.1"} 1',
+            'test_seconds_bucket{kind="a",le="1.0"} 2',
+            'test_seconds_bucket{kind="a",le="+Inf"} 3',
+            'test_seconds_sum{kind="a"} 5.55',
+            'test_seconds_count{kind="a"} 3',
+        ])
+
+    @override_settings(EXCHANGE_SERVER_TIMING=True)
+    def test_requests_are_timed_by_phase(self):
+        with mock.patch.object(MockCurrencyProvider, 'get_exchange_rate', return_value=Decimal("0.9")):
+            response = APIClient().get(reverse('currency-convert'), {"source_currency": "USD", "target_currency": "EUR", "amount": "10"})
+
+        phases = {entry.split(';')[0] for entry in response['Server-Timing'].split(', ')}
+        self.assertTrue({'factory', 'cache', 'provider-mock', 'db', 'total'} <= phases)
+        self.assertIn(('currency-convert', 'GET', '200'), request_seconds.collect())
+        self.assertIn(('mock', 'get_exchange_rate', 'success'), provider_call_seconds.collect())
+
+    @override_settings(EXCHANGE_SERVER_TIMING=True, EXCHANGE_HEDGING_ENABLED=True)
+    def test_hedged_provider_calls_are_timed(self):
+        with mock.patch.object(MockCurrencyProvider, 'get_exchange_rate', return_value=Decimal("0.9")):
+            response = APIClient().get(reverse('currency-convert'), {"source_currency": "USD", "target_currency": "EUR", "amount": "10"})
+
+        phases = {entry.split(';')[0] for entry in response['Server-Timing'].split(', ')}
+        self.assertIn('provider-mock', phases)
+
+    def test_metrics_endpoint(self):
+        APIClient().get(reverse('currency-list-create'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header('Server-Timing'))
+        body = response.content.decode()
+        self.assertIn('exchange_request_duration_seconds_count{endpoint="currency-list-create",method="GET",status="200"} 1', body)
+        self.assertIn('# TYPE exchange_rate_cache_lookups_total counter', body)
+
+class ConditionalRateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_cache.clear()
+        reset_breakers()
+        provider_chain.invalidate()
+        self.usd = Currency.objects.create(code="USD", name="US Dollar", symbol="$")
+        self.eur = Currency.objects.create(code="EUR", name="Euro", symbol="€")
+        for day in (1, 2, 3):
+            CurrencyExchangeRate.objects.create(
+                source_currency=self.usd, exchanged_currency=self.eur,
+                valuation_date=date(2023, 10, day), rate_value=Decimal("0.9") + Decimal(day) / 100
+            )
+        self.params = {"source_currency": "USD", "target_currency": "EUR", "date_from": "2023-10-01", "date_to": "2023-10-03"}
+
+    def test_closed_range_is_revalidated_without_provider_work(self):
+        first = APIClient().get(reverse('currency-rates'), self.params)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertIn('max-age=86400', first['Cache-Control'])
+
+        with mock.patch('exchange.views.get_rate_series') as get_rate_series, self.assertNumQueries(1):
+            second = APIClient().get(reverse('currency-rates'), self.params, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(second['ETag'], first['ETag'])
+        get_rate_series.assert_not_called()
+
+        # A corrected rate changes the validator
+        CurrencyExchangeRate.objects.filter(valuation_date=date(2023, 10, 2)).update(rate_value=Decimal("0.95"))
+        third = APIClient().get(reverse('currency-rates'), self.params, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(third.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(third['ETag'], first['ETag'])
+
+    def test_corrections_that_keep_the_sum_change_the_validator(self):
+        first = APIClient().get(reverse('currency-rates'), self.params)
+        # Swap two days' rates: same count and sum
+        store_rates('USD', 'EUR', {date(2023, 10, 1): Decimal("0.92"), date(2023, 10, 2): Decimal("0.91")})
+        second = APIClient().get(reverse('currency-rates'), self.params, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual([rate["rate"] for rate in second.data["rates"]][:2], [0.92, 0.91])
+
+    def test_incomplete_range_is_validated_once_stored(self):
+        Provider.objects.create(name='mock', is_active=True, priority=1)
+        params = {**self.params, "date_to": "2023-10-04"}
+        first = APIClient().get(reverse('currency-rates'), params)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(CurrencyExchangeRate.objects.count(), 4)
+        second = APIClient().get(reverse('currency-rates'), params, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_latest_rate_validated_by_its_cache_entry(self):
+        Provider.objects.create(name='mock', is_active=True, priority=1)
+        first = APIClient().get(reverse('currency-rates'), {"source_currency": "USD", "target_currency": "EUR"})
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertTrue(first.has_header('Last-Modified'))
+        max_age = int(first['Cache-Control'].split('max-age=')[1].split(',')[0])
+        self.assertTrue(0 < max_age <= 60)
+
+        second = APIClient().get(reverse('currency-rates'), {"source_currency": "USD", "target_currency": "EUR"}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # A refreshed rate is a new representation
+        rate_cache.set('USD', 'EUR', Decimal("0.5"))
+        third = APIClient().get(reverse('currency-rates'), {"source_currency": "USD", "target_currency": "EUR"}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(third.status_code, status.HTTP_200_OK)
+        self.assertEqual(third.data["rate"], 0.5)
+
+    async def test_async_range_is_revalidated(self):
+        first = await AsyncClient().get(reverse('currency-rates-async'), self.params)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        second = await AsyncClient().get(reverse('currency-rates-async'), self.params, headers={"If-None-Match": first['ETag']})
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+
+class ProviderRegistryTests(TestCase):
+    def test_dotted_path_is_imported_on_first_use(self):
+        register_provider('lazy', 'exchange.providers.MockCurrencyProvider')
+        self.addCleanup(provider_registry.pop, 'lazy')
+        self.assertIsInstance(provider_registry['lazy'], str)
+        self.assertIs(get_provider('lazy'), MockCurrencyProvider)
+        # Resolved once, then reused
+        self.assertIs(provider_registry['lazy'], MockCurrencyProvider)
+
+    def test_unimportable_provider_is_skipped_by_the_factory(self):
+        register_provider('broken', 'exchange.no_such_module.Provider')
+        self.addCleanup(provider_registry.pop, 'broken')
+        with self.assertRaises(ValueError):
+            get_provider('broken')
+        with mock.patch.object(provider_chain, 'get_names', return_value=['broken', 'mock']):
+            self.assertEqual([name for name, _ in ProviderFactory().providers], ['mock'])
+
+    def test_builtin_providers_resolve(self):
+        self.assertIs(get_provider('currencybeacon'), CurrencyBeaconProvider)
+        self.assertEqual(get_async_provider('currencybeacon').__name__, 'AsyncCurrencyBeaconProvider')
+
+class CurrencyCatalogueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalogue.invalidate()
+        for code, name, symbol in (("USD", "US Dollar", "$"), ("EUR", "Euro", "€"), ("GBP", "Pound", "£"), ("JPY", "Yen", "¥")):
+            Currency.objects.create(code=code, name=name, symbol=symbol)
+
+    def test_list_is_keyset_paginated_from_memory(self):
+        first = APIClient().get(reverse('currency-list-create'), {"limit": 2})
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual([currency["code"] for currency in first.json()["results"]], ["EUR", "GBP"])
+
+        with self.assertNumQueries(0):
+            second = APIClient().get(first.json()["next"])
+        self.assertEqual(second.json(), {
+            "results": [{"code": "JPY", "name": "Yen", "symbol": "¥"}, {"code": "USD", "name": "US Dollar", "symbol": "$"}],
+            "next": None,
+        })
+
+    def test_writes_reload_the_catalogue(self):
+        self.assertEqual(APIClient().get(reverse('currency-detail-update-delete', kwargs={'code': 'GBP'})).data["name"], "Pound")
+        Currency.objects.filter(code="GBP").get().delete()
+        response = APIClient().get(reverse('currency-detail-update-delete', kwargs={'code': 'GBP'}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_upsert_in_one_transaction(self):
+        with self.assertNumQueries(4):
+            response = APIClient().put(reverse('currency-list-create'), {"currencies": [
+                {"code": "EUR", "name": "Euro (EUR)", "symbol": "€"},
+                {"code": "CHF", "name": "Swiss Franc", "symbol": "Fr"},
+            ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"created": 1, "updated": 1})
+        self.assertEqual(catalogue.get("EUR").name, "Euro (EUR)")
+        self.assertEqual(catalogue.get("CHF").symbol, "Fr")
+
+        response = APIClient().put(reverse('currency-list-create'), {"currencies": [
+            {"code": "SEK", "name": "Krona", "symbol": "kr"},
+            {"code": "nok", "name": "Krone", "symbol": "kr"},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Currency.objects.filter(code="SEK").exists())
+
+    def test_bulk_upsert_takes_full_iso_names(self):
+        response = APIClient().put(reverse('currency-list-create'), {"currencies": [
+            {"code": "AED", "name": "United Arab Emirates dirham", "symbol": "د.إ"},
+            {"code": "BAM", "name": "Bosnia and Herzegovina convertible mark", "symbol": "KM"},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(catalogue.get("BAM").name, "Bosnia and Herzegovina convertible mark")
+
+    def test_admin_form_choices_come_from_the_catalogue(self):
+        self.client.get(reverse('currency_converter'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('currency_converter'))
+        self.assertContains(response, "JPY - Yen")
+
+class RateAggregateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        provider_chain.invalidate()
+        self.usd = Currency.objects.create(code="USD", name="US Dollar", symbol="$")
+        self.eur = Currency.objects.create(code="EUR", name="Euro", symbol="€")
+        self.rates = {
+            day: Decimal("0.9") + Decimal((day.toordinal() * 7919) % 1000) / 100000
+            for day in (date(2023, 1, 1) + timedelta(days=offset) for offset in range(90))
+        }
+
+    def aggregates(self):
+        return {
+            (aggregate.resolution, aggregate.period_start): tuple(getattr(aggregate, field) for field in ('open_rate', 'high_rate', 'low_rate', 'close_rate', 'rate_sum', 'rate_count'))
+            for aggregate in RateAggregate.objects.all()
+        }
+
+    def test_aggregates_are_maintained_incrementally(self):
+        # Out of order chunks splitting periods, then a corrected rate
+        days = sorted(self.rates)
+        store_rates('USD', 'EUR', {day: self.rates[day] for day in days[40:]})
+        store_rates('USD', 'EUR', {day: self.rates[day] for day in days[:40]})
+        store_rates('USD', 'EUR', {days[10]: Decimal("1.5"), days[11]: self.rates[days[11]]})
+        incremental = self.aggregates()
+
+        rebuild_aggregates(self.usd, self.eur)
+        self.assertEqual(incremental, self.aggregates())
+        self.assertEqual(incremental[(RateAggregate.MONTH, date(2023, 1, 1))][1], Decimal("1.5"))
+        # 2023-01-01 is a Sunday, so its week started on Monday 2022-12-26
+        self.assertEqual(incremental[(RateAggregate.WEEK, date(2022, 12, 26))][5], 1)
+
+    def test_monthly_resolution_reads_one_row_per_period(self):
+        store_rates('USD', 'EUR', self.rates)
+        # Provider chain, range validator, January's days in the range, then one row per full month
+        with self.assertNumQueries(4):
+            response = APIClient().get(reverse('currency-rates'), {
+                "source_currency": "USD", "target_currency": "EUR", "date_from": "2023-01-15", "date_to": "2023-03-31", "resolution": "month",
+            })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        points = response.data["rates"]
+        self.assertEqual([(point["period_start"], point["days"]) for point in points], [
+            (date(2023, 1, 1), 17), (date(2023, 2, 1), 28), (date(2023, 3, 1), 31),
+        ])
+
+        # The partly covered January only reflects days in the range
+        january = [self.rates[day] for day in sorted(self.rates) if date(2023, 1, 15) <= day <= date(2023, 1, 31)]
+        self.assertEqual(points[0]["open"], float(january[0]))
+        self.assertEqual(points[0]["close"], float(january[-1]))
+        self.assertEqual(points[0]["high"], float(max(january)))
+        self.assertAlmostEqual(points[0]["mean"], float(sum(january) / len(january)), places=6)
+
+    def test_rows_saved_or_deleted_directly_update_the_aggregates(self):
+        store_rates('USD', 'EUR', self.rates)
+        rows = CurrencyExchangeRate.objects.order_by('valuation_date')
+        edited = rows[20]
+        edited.rate_value = Decimal("1.5")
+        edited.save()
+        moved = rows[40]
+        moved.valuation_date = date(2023, 6, 1)
+        moved.save()
+        rows[60].delete()
+        CurrencyExchangeRate.objects.filter(valuation_date__gte=date(2023, 3, 6), valuation_date__lte=date(2023, 3, 12)).delete()
+        direct = self.aggregates()
+
+        rebuild_aggregates(self.usd, self.eur)
+        self.assertEqual(direct, self.aggregates())
+        self.assertEqual(direct[(RateAggregate.MONTH, date(2023, 1, 1))][1], Decimal("1.5"))
+        self.assertEqual(direct[(RateAggregate.MONTH, date(2023, 6, 1))][5], 1)
+        self.assertNotIn((RateAggregate.WEEK, date(2023, 3, 6)), direct)
+
+    def test_rates_stored_before_the_table_are_aggregated_by_the_migration(self):
+        CurrencyExchangeRate.objects.bulk_create([
+            CurrencyExchangeRate(source_currency=self.usd, exchanged_currency=self.eur, valuation_date=day, rate_value=rate)
+            for day, rate in self.rates.items()
+        ])
+        import_module('exchange.migrations.0006_rateaggregate').build_aggregates(apps, None)
+        migrated = self.aggregates()
+
+        rebuild_aggregates(self.usd, self.eur)
+        self.assertEqual(migrated, self.aggregates())
+        self.assertEqual(migrated[(RateAggregate.MONTH, date(2023, 2, 1))][5], 28)
+
+    def test_aggregates_use_the_stored_rounding(self):
+        # Rounded half-even to 0.923456 by the DecimalField
+        store_rates('USD', 'EUR', {date(2023, 1, 2): Decimal("0.9234565")})
+        stored = CurrencyExchangeRate.objects.get().rate_value
+        self.assertEqual(stored, Decimal("0.923456"))
+        month = RateAggregate.objects.get(resolution=RateAggregate.MONTH)
+        self.assertEqual((month.open_rate, month.rate_sum), (stored, stored))
+
+    def test_resolution_needs_a_range(self):
+        response = APIClient().get(reverse('currency-rates'), {"source_currency": "USD", "target_currency": "EUR", "resolution": "week"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
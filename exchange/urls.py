@@ -1,11 +1,29 @@
 from django.urls import path
-from .views import CurrencyAPIView, CurrencyExchangeRateAPIView, CurrencyConversionAPIView
+from .views import (
+    CurrencyAPIView,
+    CurrencyExchangeRateAPIView,
+    CurrencyConversionAPIView,
+    CurrencyBatchConversionAPIView,
+    AsyncCurrencyExchangeRateView,
+    AsyncCurrencyConversionView,
+    RateExportView,
+    RateAnalyticsAPIView,
+    BackfillProgressAPIView,
+    ExchangeStatsAPIView
+)
 from .admin_views import currency_converter_view
 
 urlpatterns = [
     path('currencies/', CurrencyAPIView.as_view(), name='currency-list-create'),
     path('currencies/<str:code>/', CurrencyAPIView.as_view(), name='currency-detail-update-delete'),
     path('rates/', CurrencyExchangeRateAPIView.as_view(), name='currency-rates'),
+    path('rates/export/', RateExportView.as_view(), name='currency-rates-export'),
+    path('rates/analytics/', RateAnalyticsAPIView.as_view(), name='currency-rates-analytics'),
     path('convert/', CurrencyConversionAPIView.as_view(), name='currency-convert'),
+    path('convert/batch/', CurrencyBatchConversionAPIView.as_view(), name='currency-convert-batch'),
+    path('async/rates/', AsyncCurrencyExchangeRateView.as_view(), name='currency-rates-async'),
+    path('async/convert/', AsyncCurrencyConversionView.as_view(), name='currency-convert-async'),
+    path('backfills/<str:backfill_id>/', BackfillProgressAPIView.as_view(), name='backfill-progress'),
+    path('stats/', ExchangeStatsAPIView.as_view(), name='exchange-stats'),
     path('admin/currency-converter/', currency_converter_view, name='currency_converter'),
 ]
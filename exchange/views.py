@@ -1,14 +1,40 @@
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views import View
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.generics import get_object_or_404
-from datetime import timedelta
+from rest_framework.utils.urls import replace_query_param
+from .aggregates import get_aggregated_series
+from .async_providers import AsyncProviderFactory
+from .backfill import get_progress
+from .cache import rate_cache
+from .catalogue import catalogue, upsert_currencies
+from .circuit_breaker import breaker_snapshots
+from .conditional import add_cache_headers, latest_etag, latest_max_age, not_modified, range_etag, range_max_age
+from .exports import iter_csv, iter_ndjson, iter_rates
+from .hedging import hedge_stats
+from .rate_limiter import rate_limiter
+from .singleflight import singleflight
+from .metrics import render_histograms, render_samples
 from .models import Currency
+from .money import convert, quantize
 from .providers import ProviderFactory
+from .rates import aget_rate_series, date_range, get_rate_series, resolve_rates
+from .renderers import FirstRendererNegotiation
 from .serializers import (
     CurrencySerializer,
+    CurrencyListRequestSerializer,
+    BulkCurrencyRequestSerializer,
     CurrencyRateRequestSerializer,
-    CurrencyConvertRequestSerializer
+    CurrencyConvertRequestSerializer,
+    RateExportRequestSerializer,
+    RateAnalyticsRequestSerializer,
+    ConversionItemSerializer,
+    BatchConversionRequestSerializer
 )
 
 # Unified Currency CRUD API
@@ -17,21 +43,29 @@ class CurrencyAPIView(APIView):
     Handles full CRUD operations for Currency:
     - GET (list all or retrieve one)
     - POST (create)
-    - PUT (update)
+    - PUT (update one, or create/update many on the collection)
     - DELETE (remove)
+    Reads are served from the in-memory currency catalogue.
     """
 
     def get(self, request, code=None):
         if code:
             # Retrieve a specific currency by code
-            currency = get_object_or_404(Currency, code=code)
+            currency = catalogue.get(code)
+            if currency is None:
+                raise Http404("No Currency matches the given query.")
             serializer = CurrencySerializer(currency)
             return Response(serializer.data)
         else:
-            # List all currencies
-            currencies = Currency.objects.all()
-            serializer = CurrencySerializer(currencies, many=True)
-            return Response(serializer.data)
+            # List currencies one keyset page at a time, from JSON rendered when the catalogue loaded
+            serializer = CurrencyListRequestSerializer(data=request.query_params)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+            currencies, next_after = catalogue.page(serializer.validated_data.get("after"), serializer.validated_data.get("limit"))
+            next_url = replace_query_param(request.build_absolute_uri(), 'after', next_after) if next_after else None
+            payload = f'{{"results":[{",".join(currencies)}],"next":{json.dumps(next_url)}}}'
+            return HttpResponse(payload, content_type='application/json')
 
     def post(self, request):
         # Create a new currency
@@ -41,7 +75,10 @@ class CurrencyAPIView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    def put(self, request, code):
+    def put(self, request, code=None):
+        if code is None:
+            return self.bulk_upsert(request)
+
         # Update an existing currency
         currency = get_object_or_404(Currency, code=code)
         serializer = CurrencySerializer(currency, data=request.data)
@@ -56,6 +93,13 @@ class CurrencyAPIView(APIView):
         currency.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def bulk_upsert(self, request):
+        # Create or update many currencies (e.g. all of ISO 4217) in one transaction
+        serializer = BulkCurrencyRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(upsert_currencies(serializer.validated_data["currencies"]))
+
 # Currency Exchange Rate API
 class CurrencyExchangeRateAPIView(APIView):
     """
@@ -72,6 +116,7 @@ class CurrencyExchangeRateAPIView(APIView):
         target_currency = validated_data.get("target_currency")
         date_from = validated_data.get("date_from")
         date_to = validated_data.get("date_to")
+        resolution = validated_data.get("resolution")
 
         provider = ProviderFactory()
 
@@ -80,11 +125,35 @@ class CurrencyExchangeRateAPIView(APIView):
             if date_from > date_to:
                 return Response({"error": "'date_from' must be before 'date_to'."}, status=status.HTTP_400_BAD_REQUEST)
 
-            current_date = date_from
+            # A fully stored range is validated before any provider work
+            etag = range_etag(source_currency, target_currency, date_from, date_to, resolution)
+            max_age = range_max_age(date_to)
+            if etag and (response := not_modified(request, etag)):
+                return add_cache_headers(response, etag, max_age=max_age)
+
+            if resolution != 'day':
+                # Missing days are loaded first; storing them updates the aggregates the periods are read from
+                if etag is None:
+                    series = get_rate_series(provider, source_currency, target_currency, date_from, date_to)
+                    missing_date = next((current_date for current_date in date_range(date_from, date_to) if current_date not in series), None)
+                    if missing_date:
+                        return Response({"error": f"Could not retrieve rate for {missing_date}."}, status=status.HTTP_404_NOT_FOUND)
+
+                response = Response({
+                    "source_currency": source_currency,
+                    "target_currency": target_currency,
+                    "resolution": resolution,
+                    "rates": get_aggregated_series(source_currency, target_currency, date_from, date_to, resolution)
+                })
+                return add_cache_headers(response, etag or range_etag(source_currency, target_currency, date_from, date_to, resolution), max_age=max_age)
+
+            # Stored rows answer the range; only missing dates hit the providers
+            series = get_rate_series(provider, source_currency, target_currency, date_from, date_to)
+
             rates = []
-            while current_date <= date_to:
-                rate = provider.get_exchange_rate(source_currency, target_currency, current_date)
-                
+            for current_date in date_range(date_from, date_to):
+                rate = series.get(current_date)
+
                 # Validate and handle missing rate
                 if rate is None:
                     return Response({"error": f"Could not retrieve rate for {current_date}."}, status=status.HTTP_404_NOT_FOUND)
@@ -93,29 +162,37 @@ class CurrencyExchangeRateAPIView(APIView):
                     "date": current_date,
                     "rate": float(rate)
                 })
-                current_date += timedelta(days=1)
 
-            return Response({
+            response = Response({
                 "source_currency": source_currency,
                 "target_currency": target_currency,
                 "rates": rates
             })
+            # The fetched rates were stored, so the range can now be validated
+            return add_cache_headers(response, etag or range_etag(source_currency, target_currency, date_from, date_to), max_age=max_age)
 
-        # Fetch single latest rate if no date range is specified
+        # Fetch single latest rate if no date range is specified; a cached rate costs no provider work
         latest_rate = provider.get_exchange_rate(source_currency, target_currency)
         if latest_rate is None:
             return Response({"error": "Could not retrieve the latest exchange rate."}, status=status.HTTP_404_NOT_FOUND)
 
-        return Response({
+        response = Response({
             "source_currency": source_currency,
             "target_currency": target_currency,
             "rate": float(latest_rate)
         })
+        # The rate cache entry the rate came from validates it and bounds how long it may be cached
+        entry = rate_cache.peek_entry(source_currency, target_currency)
+        if entry is None:
+            return response
+        etag, fetched_at = latest_etag(source_currency, target_currency, entry), entry[1]
+        return add_cache_headers(not_modified(request, etag, fetched_at) or response, etag, fetched_at, latest_max_age(fetched_at))
 
 # Currency Conversion API
 class CurrencyConversionAPIView(APIView):
     """
     Handles currency conversion using the latest available exchange rates.
+    Amounts stay Decimal end to end and are rounded to the target currency's minor units.
     """
     def get(self, request):
         # Validate query parameters
@@ -126,7 +203,8 @@ class CurrencyConversionAPIView(APIView):
         validated_data = serializer.validated_data
         source_currency = validated_data.get("source_currency")
         target_currency = validated_data.get("target_currency")
-        amount = validated_data.get("amount")
+        # Rounded to the source currency once, so the echoed amount is the one converted
+        amount = quantize(validated_data.get("amount"), source_currency)
 
         provider = ProviderFactory()
         rate = provider.get_exchange_rate(source_currency, target_currency)
@@ -135,12 +213,275 @@ class CurrencyConversionAPIView(APIView):
         if rate is None:
             return Response({"error": "Could not retrieve the exchange rate for conversion."}, status=status.HTTP_404_NOT_FOUND)
 
-        converted_amount = amount * float(rate)
-
         return Response({
             "source_currency": source_currency,
             "target_currency": target_currency,
             "amount": amount,
-            "converted_amount": converted_amount,
-            "rate": float(rate)
+            "converted_amount": convert(amount, rate, target_currency),
+            "rate": rate
+        })
+
+# Batch Currency Conversion API
+class CurrencyBatchConversionAPIView(APIView):
+    """
+    Converts many (source, target, amount[, valuation_date]) items in one request.
+    Each distinct rate is resolved once; results come back in input order, with an
+    "error" entry for items that are invalid or have no rate.
+    """
+    def post(self, request):
+        serializer = BatchConversionRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # (valid, validated data or errors) per item, in input order
+        items = []
+        for item in serializer.validated_data["items"]:
+            item_serializer = ConversionItemSerializer(data=item)
+            valid = item_serializer.is_valid()
+            items.append((valid, item_serializer.validated_data if valid else item_serializer.errors))
+
+        lookups = [
+            (item["source_currency"], item["target_currency"], item.get("valuation_date"))
+            for valid, item in items if valid
+        ]
+        rates = resolve_rates(ProviderFactory(), lookups) if lookups else {}
+
+        results = []
+        for valid, item in items:
+            if not valid:
+                results.append({"error": item})
+                continue
+
+            rate = rates[(item["source_currency"], item["target_currency"], item.get("valuation_date"))]
+            if isinstance(rate, ValueError):
+                results.append({"error": "Could not retrieve the exchange rate for conversion."})
+                continue
+
+            amount = quantize(item["amount"], item["source_currency"])
+            results.append({
+                "source_currency": item["source_currency"],
+                "target_currency": item["target_currency"],
+                "valuation_date": item.get("valuation_date"),
+                "amount": amount,
+                "converted_amount": convert(amount, rate, item["target_currency"]),
+                "rate": rate
+            })
+
+        return Response({"results": results})
+
+# Async Currency Exchange Rate API
+class AsyncCurrencyExchangeRateView(View):
+    """
+    Async version of CurrencyExchangeRateAPIView for ASGI deployments.
+    Dates missing from the database are fetched from the providers concurrently.
+
+    A plain Django view because DRF's APIView only runs sync handlers. It therefore skips DRF
+    authentication, permissions and parsers; the API configures none beyond DRF's defaults
+    (AllowAny) and this GET reads no body, so it behaves like its sync counterpart.
+    """
+    async def get(self, request):
+        serializer = CurrencyRateRequestSerializer(data=request.GET)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        validated_data = serializer.validated_data
+        source_currency = validated_data.get("source_currency")
+        target_currency = validated_data.get("target_currency")
+        date_from = validated_data.get("date_from")
+        date_to = validated_data.get("date_to")
+        resolution = validated_data.get("resolution")
+
+        if date_from and date_to:
+            # A fully stored range is validated before any provider work
+            etag = await sync_to_async(range_etag)(source_currency, target_currency, date_from, date_to, resolution)
+            max_age = range_max_age(date_to)
+            if etag and (response := not_modified(request, etag)):
+                return add_cache_headers(response, etag, max_age=max_age)
+
+        async with AsyncProviderFactory() as provider:
+            if date_from and date_to and resolution != 'day':
+                # Missing days are loaded first; storing them updates the aggregates the periods are read from
+                if etag is None:
+                    series = await aget_rate_series(provider, source_currency, target_currency, date_from, date_to)
+                    missing_date = next((current_date for current_date in date_range(date_from, date_to) if current_date not in series), None)
+                    if missing_date:
+                        return JsonResponse({"error": f"Could not retrieve rate for {missing_date}."}, status=status.HTTP_404_NOT_FOUND)
+
+                response = JsonResponse({
+                    "source_currency": source_currency,
+                    "target_currency": target_currency,
+                    "resolution": resolution,
+                    "rates": await sync_to_async(get_aggregated_series)(source_currency, target_currency, date_from, date_to, resolution)
+                })
+                etag = etag or await sync_to_async(range_etag)(source_currency, target_currency, date_from, date_to, resolution)
+                return add_cache_headers(response, etag, max_age=max_age)
+
+            if date_from and date_to:
+                series = await aget_rate_series(provider, source_currency, target_currency, date_from, date_to)
+
+                rates = []
+                for current_date in date_range(date_from, date_to):
+                    rate = series.get(current_date)
+                    if rate is None:
+                        return JsonResponse({"error": f"Could not retrieve rate for {current_date}."}, status=status.HTTP_404_NOT_FOUND)
+                    rates.append({
+                        "date": current_date,
+                        "rate": float(rate)
+                    })
+
+                response = JsonResponse({
+                    "source_currency": source_currency,
+                    "target_currency": target_currency,
+                    "rates": rates
+                })
+                etag = etag or await sync_to_async(range_etag)(source_currency, target_currency, date_from, date_to, resolution)
+                return add_cache_headers(response, etag, max_age=max_age)
+
+            try:
+                latest_rate = await provider.get_exchange_rate(source_currency, target_currency)
+            except ValueError:
+                return JsonResponse({"error": "Could not retrieve the latest exchange rate."}, status=status.HTTP_404_NOT_FOUND)
+
+        response = JsonResponse({
+            "source_currency": source_currency,
+            "target_currency": target_currency,
+            "rate": float(latest_rate)
         })
+        entry = await sync_to_async(rate_cache.peek_entry)(source_currency, target_currency)
+        if entry is None:
+            return response
+        etag, fetched_at = latest_etag(source_currency, target_currency, entry), entry[1]
+        return add_cache_headers(not_modified(request, etag, fetched_at) or response, etag, fetched_at, latest_max_age(fetched_at))
+
+# Async Currency Conversion API
+class AsyncCurrencyConversionView(View):
+    """
+    Async version of CurrencyConversionAPIView for ASGI deployments.
+    A plain Django view for the same reason as AsyncCurrencyExchangeRateView.
+    """
+    async def get(self, request):
+        serializer = CurrencyConvertRequestSerializer(data=request.GET)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        validated_data = serializer.validated_data
+        source_currency = validated_data.get("source_currency")
+        target_currency = validated_data.get("target_currency")
+        # Rounded to the source currency once, so the echoed amount is the one converted
+        amount = quantize(validated_data.get("amount"), source_currency)
+
+        async with AsyncProviderFactory() as provider:
+            try:
+                rate = await provider.get_exchange_rate(source_currency, target_currency)
+            except ValueError:
+                return JsonResponse({"error": "Could not retrieve the exchange rate for conversion."}, status=status.HTTP_404_NOT_FOUND)
+
+        # JsonResponse's encoder writes Decimals as strings, like DecimalJSONRenderer
+        return JsonResponse({
+            "source_currency": source_currency,
+            "target_currency": target_currency,
+            "amount": amount,
+            "converted_amount": convert(amount, rate, target_currency),
+            "rate": rate
+        })
+
+# Exchange Rate Export
+class RateExportView(APIView):
+    """
+    Streams stored exchange rates for many pairs as NDJSON or CSV.
+    Rows are read in chunks and written out as they arrive, so memory stays flat for any export size.
+    """
+    # `format` selects the export format, not a DRF renderer; errors are rendered as JSON
+    content_negotiation_class = FirstRendererNegotiation
+
+    def get(self, request):
+        serializer = RateExportRequestSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        validated_data = serializer.validated_data
+        rows = iter_rates(validated_data["pairs"], validated_data.get("date_from"), validated_data.get("date_to"))
+
+        if validated_data["format"] == "csv":
+            response = StreamingHttpResponse(iter_csv(rows), content_type="text/csv")
+            response["Content-Disposition"] = 'attachment; filename="rates.csv"'
+            return response
+        return StreamingHttpResponse(iter_ndjson(rows), content_type="application/x-ndjson")
+
+# Exchange Rate Analytics API
+class RateAnalyticsAPIView(APIView):
+    """
+    Computes statistics over a pair's stored rate history on the server and returns only the aggregates.
+    """
+    def get(self, request):
+        # numpy is imported on the first analytics request rather than at worker start
+        from .analytics import load_series, series_statistics
+
+        serializer = RateAnalyticsRequestSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        validated_data = serializer.validated_data
+        source_currency = validated_data.get("source_currency")
+        target_currency = validated_data.get("target_currency")
+        windows = validated_data.get("windows") or getattr(settings, 'EXCHANGE_ANALYTICS_DEFAULT_WINDOWS', [7, 30, 90])
+
+        dates, rates = load_series(source_currency, target_currency, validated_data.get("date_from"), validated_data.get("date_to"))
+        if not rates.size:
+            return Response({"error": "No stored rates for this pair and period."}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            "source_currency": source_currency,
+            "target_currency": target_currency,
+            **series_statistics(dates, rates, windows)
+        })
+
+# Backfill Progress API
+class BackfillProgressAPIView(APIView):
+    """
+    Reports how far a backfill started with the backfill_rates task has got.
+    """
+    def get(self, request, backfill_id):
+        progress = get_progress(backfill_id)
+        if progress is None:
+            return Response({"error": "Unknown or expired backfill."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(progress)
+
+# Exchange Stats API
+class ExchangeStatsAPIView(APIView):
+    """
+    Exposes runtime counters of the exchange app, such as rate cache hits and misses.
+    """
+    def get(self, request):
+        return Response({
+            "rate_cache": rate_cache.stats(),
+            "circuit_breakers": breaker_snapshots(),
+            "hedging": hedge_stats.stats(),
+            "singleflight": singleflight.stats(),
+            "rate_limits": rate_limiter.snapshot()
+        })
+
+# Prometheus Metrics
+class MetricsView(View):
+    """
+    Exposes the request, provider and cache histograms of this process, plus rate cache and
+    quota figures, in the Prometheus text format. A plain Django view: scrapers get text, not the API's JSON.
+    """
+    def get(self, request):
+        cache_stats = rate_cache.stats()
+        limits = rate_limiter.snapshot()["providers"]
+        lines = render_histograms()
+        lines += render_samples(
+            'exchange_rate_cache_lookups_total', "Rate cache lookups by result.",
+            [({"result": result}, cache_stats[counter]) for result, counter in (('local_hit', 'local_hits'), ('shared_hit', 'shared_hits'), ('miss', 'misses'))],
+            metric_type='counter'
+        )
+        lines += render_samples(
+            'exchange_provider_tokens', "Tokens left in each provider's rate limit bucket.",
+            [({"provider": name}, state["tokens"]) for name, state in limits.items()]
+        )
+        lines += render_samples(
+            'exchange_provider_quota_remaining', "Provider calls left in today's quota.",
+            [({"provider": name}, state["quota_remaining"]) for name, state in limits.items() if state["quota_remaining"] is not None]
+        )
+        return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
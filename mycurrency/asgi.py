@@ -13,4 +13,21 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mycurrency.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from exchange.async_providers import close_async_providers  # noqa: E402 (needs the apps loaded)
+
+
+async def application(scope, receive, send):
+    """Django's handler, plus lifespan events so pooled provider clients are closed on shutdown."""
+    if scope['type'] != 'lifespan':
+        return await django_application(scope, receive, send)
+
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_async_providers()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
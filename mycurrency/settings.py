@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
+import json
 import os
 from dotenv import load_dotenv
 
@@ -47,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'exchange.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -87,6 +89,24 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Set REDIS_CACHE_URL to share cached rates across workers
+
+if os.getenv('REDIS_CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_CACHE_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -131,7 +151,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'exchange.renderers.DecimalJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -145,4 +165,128 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Kolkata'
 
-CELERY_RESULT_BACKEND = 'django-db'
\ No newline at end of file
+CELERY_RESULT_BACKEND = 'django-db'
+
+#EXCHANGE_SETTINGS
+# Longest date range requested from a provider's timeseries endpoint in one call
+EXCHANGE_TIMESERIES_CHUNK_DAYS = int(os.getenv('EXCHANGE_TIMESERIES_CHUNK_DAYS', 365))
+
+# Seconds a "latest" rate stays cached; historical rates are cached until evicted
+EXCHANGE_LATEST_RATE_TTL = int(os.getenv('EXCHANGE_LATEST_RATE_TTL', 60))
+# In-process tier in front of the shared cache
+EXCHANGE_LOCAL_CACHE_TTL = int(os.getenv('EXCHANGE_LOCAL_CACHE_TTL', 5))
+EXCHANGE_LOCAL_CACHE_MAX_ENTRIES = int(os.getenv('EXCHANGE_LOCAL_CACHE_MAX_ENTRIES', 1024))
+
+# Outbound HTTP to rate providers: keep-alive pool per provider, timeouts in seconds,
+# and retries with exponential backoff on 429/5xx
+EXCHANGE_HTTP_POOL_SIZE = int(os.getenv('EXCHANGE_HTTP_POOL_SIZE', 10))
+EXCHANGE_HTTP_CONNECT_TIMEOUT = float(os.getenv('EXCHANGE_HTTP_CONNECT_TIMEOUT', 3.05))
+EXCHANGE_HTTP_READ_TIMEOUT = float(os.getenv('EXCHANGE_HTTP_READ_TIMEOUT', 10))
+EXCHANGE_HTTP_MAX_RETRIES = int(os.getenv('EXCHANGE_HTTP_MAX_RETRIES', 2))
+EXCHANGE_HTTP_BACKOFF_FACTOR = float(os.getenv('EXCHANGE_HTTP_BACKOFF_FACTOR', 0.3))
+
+# Base currency of rate snapshots; cross rates between other currencies are derived from it
+EXCHANGE_BASE_CURRENCY = os.getenv('EXCHANGE_BASE_CURRENCY', 'USD')
+
+# Most provider calls one async request keeps in flight at once
+EXCHANGE_ASYNC_CONCURRENCY = int(os.getenv('EXCHANGE_ASYNC_CONCURRENCY', 10))
+# Seconds between checks of the shared provider chain version after a Provider change
+EXCHANGE_PROVIDER_CHAIN_CHECK_INTERVAL = float(os.getenv('EXCHANGE_PROVIDER_CHAIN_CHECK_INTERVAL', 1))
+
+# Circuit breaker per provider: open once at least MIN_CALLS calls in the last WINDOW seconds
+# failed at ERROR_RATE or more, and let a probe through after RESET_TIMEOUT seconds
+EXCHANGE_BREAKER_WINDOW = float(os.getenv('EXCHANGE_BREAKER_WINDOW', 60))
+EXCHANGE_BREAKER_MIN_CALLS = int(os.getenv('EXCHANGE_BREAKER_MIN_CALLS', 5))
+EXCHANGE_BREAKER_ERROR_RATE = float(os.getenv('EXCHANGE_BREAKER_ERROR_RATE', 0.5))
+EXCHANGE_BREAKER_RESET_TIMEOUT = float(os.getenv('EXCHANGE_BREAKER_RESET_TIMEOUT', 30))
+# Try providers in order of observed p95 latency instead of configured priority
+EXCHANGE_PROVIDER_LATENCY_ORDERING = os.getenv('EXCHANGE_PROVIDER_LATENCY_ORDERING', 'False') == 'True'
+
+# Hedged latest-rate lookups: if the first provider hasn't answered after the hedge delay
+# (EXCHANGE_HEDGE_DELAY_MS, or its observed p90 latency when unset), the next provider is asked too
+EXCHANGE_HEDGING_ENABLED = os.getenv('EXCHANGE_HEDGING_ENABLED', 'False') == 'True'
+EXCHANGE_HEDGE_DELAY_MS = float(os.getenv('EXCHANGE_HEDGE_DELAY_MS')) if os.getenv('EXCHANGE_HEDGE_DELAY_MS') else None
+EXCHANGE_HEDGE_DEFAULT_DELAY_MS = float(os.getenv('EXCHANGE_HEDGE_DEFAULT_DELAY_MS', 250))
+EXCHANGE_HEDGE_MAX_WORKERS = int(os.getenv('EXCHANGE_HEDGE_MAX_WORKERS', 16))
+
+# Single-flight: identical provider calls in flight are joined, across workers through a cache lock.
+# The lock outlives a provider call including retries; waiters poll for the shared result
+EXCHANGE_SINGLEFLIGHT_LOCK_TIMEOUT = float(os.getenv('EXCHANGE_SINGLEFLIGHT_LOCK_TIMEOUT', 15))
+EXCHANGE_SINGLEFLIGHT_WAIT_TIMEOUT = float(os.getenv('EXCHANGE_SINGLEFLIGHT_WAIT_TIMEOUT', 15))
+EXCHANGE_SINGLEFLIGHT_POLL_INTERVAL = float(os.getenv('EXCHANGE_SINGLEFLIGHT_POLL_INTERVAL', 0.05))
+EXCHANGE_SINGLEFLIGHT_RESULT_TTL = float(os.getenv('EXCHANGE_SINGLEFLIGHT_RESULT_TTL', 5))
+
+# Rows fetched per database round trip by the streaming rate export
+EXCHANGE_EXPORT_CHUNK_SIZE = int(os.getenv('EXCHANGE_EXPORT_CHUNK_SIZE', 2000))
+
+# Most items accepted by one batch conversion request
+EXCHANGE_BATCH_MAX_ITEMS = int(os.getenv('EXCHANGE_BATCH_MAX_ITEMS', 10000))
+
+# Moving average / volatility windows (days) used by the analytics endpoint when none are requested
+EXCHANGE_ANALYTICS_DEFAULT_WINDOWS = [int(window) for window in os.getenv('EXCHANGE_ANALYTICS_DEFAULT_WINDOWS', '7,30,90').split(',')]
+# Periods per year used to annualize daily volatility
+EXCHANGE_ANALYTICS_ANNUALIZATION_DAYS = int(os.getenv('EXCHANGE_ANALYTICS_ANNUALIZATION_DAYS', 365))
+
+# Decimal places used when rounding converted amounts: a default plus CODE:units overrides, e.g. "JPY:0,KWD:3"
+EXCHANGE_DEFAULT_MINOR_UNITS = int(os.getenv('EXCHANGE_DEFAULT_MINOR_UNITS', 2))
+EXCHANGE_CURRENCY_MINOR_UNITS = {
+    code.strip().upper(): int(units)
+    for code, _, units in (item.partition(':') for item in os.getenv('EXCHANGE_CURRENCY_MINOR_UNITS', '').split(',') if item.strip())
+}
+
+# Concurrent backfill chunks allowed per provider across all workers, as "name:limit" pairs plus an optional "default:limit"
+EXCHANGE_BACKFILL_PROVIDER_CONCURRENCY = {
+    name.strip(): int(limit)
+    for name, _, limit in (item.partition(':') for item in os.getenv('EXCHANGE_BACKFILL_PROVIDER_CONCURRENCY', 'default:4').split(',') if item.strip())
+}
+# Seconds before a backfill chunk that found its provider busy is retried
+EXCHANGE_BACKFILL_RETRY_DELAY = int(os.getenv('EXCHANGE_BACKFILL_RETRY_DELAY', 5))
+# Seconds after which a provider slot held by a crashed worker is freed
+EXCHANGE_BACKFILL_SLOT_TIMEOUT = int(os.getenv('EXCHANGE_BACKFILL_SLOT_TIMEOUT', 300))
+# Seconds backfill progress is kept
+EXCHANGE_BACKFILL_PROGRESS_TTL = int(os.getenv('EXCHANGE_BACKFILL_PROGRESS_TTL', 7 * 24 * 3600))
+
+# Hot pair prefetch: celery beat refreshes the most requested latest rates before they expire
+EXCHANGE_HOT_PAIRS_FLUSH_INTERVAL = int(os.getenv('EXCHANGE_HOT_PAIRS_FLUSH_INTERVAL', 5))
+EXCHANGE_HOT_PAIRS_DECAY = float(os.getenv('EXCHANGE_HOT_PAIRS_DECAY', 0.5))
+EXCHANGE_PREFETCH_TOP_N = int(os.getenv('EXCHANGE_PREFETCH_TOP_N', 50))
+EXCHANGE_PREFETCH_INTERVAL = int(os.getenv('EXCHANGE_PREFETCH_INTERVAL', 10))
+# Rates expiring within this many seconds are refreshed; keep it above EXCHANGE_PREFETCH_INTERVAL
+EXCHANGE_PREFETCH_MARGIN = int(os.getenv('EXCHANGE_PREFETCH_MARGIN', 20))
+EXCHANGE_PREFETCH_SNAPSHOTS = os.getenv('EXCHANGE_PREFETCH_SNAPSHOTS', 'False') == 'True'
+
+CELERY_BEAT_SCHEDULE = {
+    'refresh-hot-rates': {
+        'task': 'exchange.tasks.refresh_hot_rates',
+        'schedule': EXCHANGE_PREFETCH_INTERVAL,
+    },
+}
+
+# Per-provider token buckets and daily quotas as JSON, e.g. {"currencybeacon": {"rate": 5, "burst": 10, "daily_quota": 5000}}
+EXCHANGE_PROVIDER_RATE_LIMITS = json.loads(os.getenv('EXCHANGE_PROVIDER_RATE_LIMITS', '{}'))
+# Seconds a call may wait for a token: interactive requests stay snappy, backfills wait longer
+EXCHANGE_RATE_LIMIT_INTERACTIVE_MAX_WAIT = float(os.getenv('EXCHANGE_RATE_LIMIT_INTERACTIVE_MAX_WAIT', 0.5))
+EXCHANGE_RATE_LIMIT_BATCH_MAX_WAIT = float(os.getenv('EXCHANGE_RATE_LIMIT_BATCH_MAX_WAIT', 10))
+# Share of the daily quota batch work may use; the rest is kept for interactive calls
+EXCHANGE_RATE_LIMIT_BATCH_QUOTA_SHARE = float(os.getenv('EXCHANGE_RATE_LIMIT_BATCH_QUOTA_SHARE', 0.8))
+# Seconds over which recent interactive demand, which batch calls leave room for, decays
+EXCHANGE_RATE_LIMIT_DEMAND_WINDOW = int(os.getenv('EXCHANGE_RATE_LIMIT_DEMAND_WINDOW', 60))
+
+# Send per-request phase timings (db, cache, factory, provider-<name>) in a Server-Timing header
+EXCHANGE_SERVER_TIMING = os.getenv('EXCHANGE_SERVER_TIMING', 'False') == 'True'
+
+# Cache-Control max-age (seconds) of rate ranges that ended before today, and of latest rates and ranges reaching today
+EXCHANGE_HISTORICAL_MAX_AGE = int(os.getenv('EXCHANGE_HISTORICAL_MAX_AGE', 86400))
+EXCHANGE_LATEST_MAX_AGE = int(os.getenv('EXCHANGE_LATEST_MAX_AGE', 60))
+
+# CurrencyBeacon API endpoint and key, read by the provider when it makes a request
+CURRENCY_BEACON_API_URL = os.getenv('CURRENCY_BEACON_API_URL', 'https://api.currencybeacon.com/v1')
+CURRENCY_BEACON_API_KEY = os.getenv('CURRENCY_BEACON_API_KEY', 'LNhV0SbxfG4L1HeXaNGyX3SeZ1RIA6db')
+
+# Seconds between checks of the shared currency catalogue version; each process reloads the Currency table when it changes
+EXCHANGE_CURRENCY_CATALOGUE_CHECK_INTERVAL = float(os.getenv('EXCHANGE_CURRENCY_CATALOGUE_CHECK_INTERVAL', 1))
+# Currencies per page of the currency list, by default and at most
+EXCHANGE_CURRENCY_PAGE_SIZE = int(os.getenv('EXCHANGE_CURRENCY_PAGE_SIZE', 200))
+EXCHANGE_CURRENCY_PAGE_MAX_SIZE = int(os.getenv('EXCHANGE_CURRENCY_PAGE_MAX_SIZE', 1000))
+# Most currencies accepted by one bulk create/update request
+EXCHANGE_CURRENCY_BULK_MAX_ITEMS = int(os.getenv('EXCHANGE_CURRENCY_BULK_MAX_ITEMS', 1000))
@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.urls import path, include
+from exchange.views import MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('exchange.urls')),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
@@ -44,12 +44,8 @@ def setup_currencies():
 
 def load_historical_data():
     print("Loading historical data...")
-    # Run a Django shell command to load historical data
-    command = (
-        'python manage.py shell -c "'
-        'from exchange.tasks import load_historical_data; '
-        'load_historical_data(\'USD\', \'EUR\', \'2023-10-01\', \'2023-10-10\')"'
-    )
+    # No worker is running yet, so the backfill runs in this process
+    command = "python manage.py backfill_rates --pairs USD:EUR --from 2023-10-01 --to 2023-10-10 --eager"
     run_command(command)
 
 def run_server():